@@ -41,6 +41,36 @@ class RobotArm(NLinkArm):
 
         return x_list, y_list, z_list
 
+    def get_points_batch(self, joint_angles):
+        """
+        forward kinematics for many joint vectors at once
+
+        joint_angles: (N, n_links) array of joint angles
+        return: (N, n_links + 1, 3) array of the base and link end points
+        """
+        theta = np.atleast_2d(np.asarray(joint_angles, dtype=float))
+        alpha, a, d = np.array([link.dh_params_[1:4]
+                                for link in self.link_list], dtype=float).T
+
+        st, ct = np.sin(theta), np.cos(theta)
+        sa, ca = np.broadcast_to(np.sin(alpha), theta.shape), \
+            np.broadcast_to(np.cos(alpha), theta.shape)
+        zeros, ones = np.zeros_like(theta), np.ones_like(theta)
+        # (N, n_links, 4, 4) DH transformation matrices
+        link_trans = np.stack([
+            np.stack([ct, -st * ca, st * sa, a * ct], axis=-1),
+            np.stack([st, ct * ca, -ct * sa, a * st], axis=-1),
+            np.stack([zeros, sa, ca, zeros + d], axis=-1),
+            np.stack([zeros, zeros, zeros, ones], axis=-1)], axis=-2)
+
+        trans = np.broadcast_to(np.identity(4), (len(theta), 4, 4))
+        points = [trans[:, 0:3, 3]]
+        for i in range(len(self.link_list)):
+            trans = np.einsum("nij,njk->nik", trans, link_trans[:, i])
+            points.append(trans[:, 0:3, 3])
+
+        return np.stack(points, axis=1)
+
 
 class RRTStar:
     """
@@ -132,13 +162,13 @@ class RRTStar:
             return None
 
         # search nearest cost in near_inds
+        t_nodes = [self.steer(self.node_list[i], new_node) for i in near_inds]
+        safe_list = self.check_collision_nodes(t_nodes, self.robot,
+                                               self.obstacle_list)
         costs = []
-        for i in near_inds:
+        for i, safe in zip(near_inds, safe_list):
             near_node = self.node_list[i]
-            t_node = self.steer(near_node, new_node)
-            if t_node and self.check_collision(t_node,
-                                               self.robot,
-                                               self.obstacle_list):
+            if safe:
                 costs.append(self.calc_new_cost(near_node, new_node))
             else:
                 costs.append(float("inf"))  # the cost of collision node
@@ -190,16 +220,17 @@ class RRTStar:
         return near_inds
 
     def rewire(self, new_node, near_inds):
-        for i in near_inds:
+        edge_nodes = [self.steer(new_node, self.node_list[i])
+                      for i in near_inds]
+        safe_list = self.check_collision_nodes(edge_nodes, self.robot,
+                                               self.obstacle_list)
+        for i, edge_node, no_collision in zip(near_inds, edge_nodes,
+                                              safe_list):
             near_node = self.node_list[i]
-            edge_node = self.steer(new_node, near_node)
             if not edge_node:
                 continue
             edge_node.cost = self.calc_new_cost(new_node, near_node)
 
-            no_collision = self.check_collision(edge_node,
-                                                self.robot,
-                                                self.obstacle_list)
             improved_cost = near_node.cost > edge_node.cost
 
             if no_collision and improved_cost:
@@ -244,19 +275,21 @@ class RRTStar:
         new_node = self.Node(list(from_node.x))
         d, phi, theta = self.calc_distance_and_angle(new_node, to_node)
 
-        new_node.path_x = [list(new_node.x)]
-
         if extend_length > d:
             extend_length = d
 
         n_expand = math.floor(extend_length / self.path_resolution)
 
         start, end = np.array(from_node.x), np.array(to_node.x)
-        v = end - start
-        u = v / (np.sqrt(np.sum(v ** 2)))
-        for _ in range(n_expand):
-            new_node.x += u * self.path_resolution
-            new_node.path_x.append(list(new_node.x))
+        path = start[np.newaxis, :]
+        if n_expand > 0:
+            v = end - start
+            u = v / (np.sqrt(np.sum(v ** 2)))
+            steps = np.tile(u * self.path_resolution, (n_expand, 1))
+            path = np.cumsum(np.vstack((path, steps)), axis=0)
+            new_node.x = path[-1]
+
+        new_node.path_x = path.tolist()
 
         d, _, _ = self.calc_distance_and_angle(new_node, to_node)
         if d <= self.path_resolution:
@@ -329,21 +362,61 @@ class RRTStar:
         if node is None:
             return False
 
-        for (ox, oy, oz, size) in obstacleList:
-            for x in node.path_x:
-                x_list, y_list, z_list = robot.get_points(x)
-                dx_list = [ox - x_point for x_point in x_list]
-                dy_list = [oy - y_point for y_point in y_list]
-                dz_list = [oz - z_point for z_point in z_list]
-                d_list = [dx * dx + dy * dy + dz * dz
-                          for (dx, dy, dz) in zip(dx_list,
-                                                  dy_list,
-                                                  dz_list)]
-
-                if min(d_list) <= size ** 2:
-                    return False  # collision
-
-        return True  # safe
+        return bool(np.all(RRTStar.check_collision_batch(
+            node.path_x, robot, obstacleList)))
+
+    @staticmethod
+    def check_collision_nodes(nodes, robot, obstacleList):
+        """
+        check_collision for many nodes with one bulk collision check
+
+        return: list of bool, True if the node is safe
+        """
+        safe_list = [False] * len(nodes)
+        inds = [i for (i, node) in enumerate(nodes) if node is not None]
+        if not inds:
+            return safe_list
+
+        paths = [nodes[i].path_x for i in inds]
+        safe = RRTStar.check_collision_batch(np.concatenate(paths), robot,
+                                             obstacleList)
+        starts = np.cumsum([0] + [len(path) for path in paths[:-1]])
+        for i, node_safe in zip(inds, np.logical_and.reduceat(safe, starts)):
+            safe_list[i] = bool(node_safe)
+
+        return safe_list
+
+    @staticmethod
+    def check_collision_batch(joint_angles, robot, obstacleList,
+                              link_radius=0.0):
+        """
+        check many joint vectors against sphere obstacles at once
+
+        Each link is a capsule: the segment between its end points with
+        radius link_radius.
+
+        joint_angles: (N, n_links) array of joint angles
+        obstacleList: obstacle Positions [[x,y,z,size],...]
+        return: (N,) bool array, True if the configuration is safe
+        """
+        points = robot.get_points_batch(joint_angles)
+        if len(obstacleList) == 0:
+            return np.ones(len(points), dtype=bool)
+        obstacles = np.asarray(obstacleList, dtype=float)
+
+        # (N, links, obstacles, 3)
+        p0 = points[:, :-1, np.newaxis, :]
+        seg = (points[:, 1:] - points[:, :-1])[:, :, np.newaxis, :]
+        to_center = obstacles[:, 0:3] - p0
+
+        seg_len2 = np.sum(seg ** 2, axis=-1)
+        t = np.sum(to_center * seg, axis=-1) / np.where(seg_len2 > 0.0,
+                                                        seg_len2, 1.0)
+        t = np.clip(t, 0.0, 1.0)[..., np.newaxis]
+        d2 = np.sum((to_center - t * seg) ** 2, axis=-1)
+
+        collision = d2 <= (obstacles[:, 3] + link_radius) ** 2
+        return ~np.any(collision, axis=(1, 2))
 
 
 def main():
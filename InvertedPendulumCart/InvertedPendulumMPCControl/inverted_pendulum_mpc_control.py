@@ -9,6 +9,7 @@ import time
 import cvxpy
 import matplotlib.pyplot as plt
 import numpy as np
+import scipy.linalg as scipy_linalg
 
 # Model parameters
 
@@ -27,7 +28,11 @@ delta_t = 0.1  # time tick
 animation = True
 
 
-def main():
+def main(backend="cvxpy"):
+    """
+    :param backend: "cvxpy" for mpc_control or "condensed" for
+        mpc_control_condensed
+    """
     x0 = np.array([
         [0.0],
         [0.0],
@@ -37,11 +42,19 @@ def main():
 
     x = np.copy(x0)
 
+    if backend == "condensed":
+        A, B = get_model_matrix()
+        controller = CondensedMPC(A, B, Q, R, T)
+
     for i in range(50):
 
         # calc control input
-        opt_x, opt_delta_x, opt_theta, opt_delta_theta, opt_input = \
-            mpc_control(x)
+        if backend == "condensed":
+            opt_x, opt_delta_x, opt_theta, opt_delta_theta, opt_input = \
+                mpc_control_condensed(x, controller)
+        else:
+            opt_x, opt_delta_x, opt_theta, opt_delta_theta, opt_input = \
+                mpc_control(x)
 
         # get input
         u = opt_input[0]
@@ -66,7 +79,7 @@ def simulation(x, u):
     return x
 
 
-def mpc_control(x0):
+def mpc_control(x0, u_min=None, u_max=None):
     x = cvxpy.Variable((nx, T + 1))
     u = cvxpy.Variable((nu, T))
 
@@ -77,9 +90,13 @@ def mpc_control(x0):
     for t in range(T):
         cost += cvxpy.quad_form(x[:, t + 1], Q)
         cost += cvxpy.quad_form(u[:, t], R)
-        constr += [x[:, t + 1] == A * x[:, t] + B * u[:, t]]
+        constr += [x[:, t + 1] == A @ x[:, t] + B @ u[:, t]]
 
     constr += [x[:, 0] == x0[:, 0]]
+    if u_min is not None:
+        constr += [u >= u_min]
+    if u_max is not None:
+        constr += [u <= u_max]
     prob = cvxpy.Problem(cvxpy.Minimize(cost), constr)
 
     start = time.time()
@@ -100,6 +117,157 @@ def mpc_control(x0):
     return ox, dx, theta, d_theta, ou
 
 
+class CondensedMPC:
+    """
+    MPC of a linear time invariant model as a dense QP over the inputs only
+
+    The states are condensed out of the horizon once: x = Phi x0 + Gamma u.
+    The Hessian and its Cholesky factorization are precomputed, so each
+    solve only updates the linear term with x0. Box constraints on u are
+    handled by a primal active-set method, which is only entered when the
+    unconstrained solution violates them.
+    """
+
+    def __init__(self, A, B, Q, R, horizon, u_min=-np.inf, u_max=np.inf,
+                 max_iter=100, tol=1e-9):
+        n_x, n_u = B.shape
+        self.horizon = horizon
+        self.n_u = n_u
+        self.max_iter = max_iter
+        self.tol = tol
+
+        # x[t + 1] = A^(t + 1) x0 + sum_k A^(t - k) B u[k]
+        powers = [np.eye(n_x)]
+        for _ in range(horizon):
+            powers.append(A @ powers[-1])
+        self.Phi = np.vstack(powers[1:])
+        self.Gamma = np.zeros((horizon * n_x, horizon * n_u))
+        for t in range(horizon):
+            for k in range(t + 1):
+                self.Gamma[t * n_x:(t + 1) * n_x, k * n_u:(k + 1) * n_u] = \
+                    powers[t - k] @ B
+
+        Q_bar = np.kron(np.eye(horizon), Q)
+        R_bar = np.kron(np.eye(horizon), R)
+
+        # cost = u' H u + 2 x0' F' u + const
+        self.H = self.Gamma.T @ Q_bar @ self.Gamma + R_bar
+        self.F = self.Gamma.T @ Q_bar @ self.Phi
+        self.L = np.linalg.cholesky(self.H)
+        # unconstrained solution u = K x0
+        self.K = -scipy_linalg.cho_solve((self.L, True), self.F)
+
+        self.u_min = np.broadcast_to(np.asarray(u_min, dtype=float),
+                                     (horizon * n_u,))
+        self.u_max = np.broadcast_to(np.asarray(u_max, dtype=float),
+                                     (horizon * n_u,))
+
+    def solve(self, x0):
+        """
+        :param x0: (nx,) initial state
+        :return: (horizon, nu) optimal inputs
+        """
+        u = self.K @ x0
+        if np.all(u >= self.u_min) and np.all(u <= self.u_max):
+            return u.reshape(self.horizon, self.n_u)
+
+        return self.solve_active_set(self.F @ x0, np.clip(
+            u, self.u_min, self.u_max)).reshape(self.horizon, self.n_u)
+
+    def solve_active_set(self, f, u):
+        """
+        primal active-set method for min u' H u + 2 f' u, u_min <= u <= u_max
+
+        :param f: linear term
+        :param u: feasible initial guess
+        """
+        at_lower = u <= self.u_min
+        at_upper = u >= self.u_max
+        for _ in range(self.max_iter):
+            grad = self.H @ u + f
+            free = ~(at_lower | at_upper)
+
+            # Newton step on the free inputs
+            step = np.zeros_like(u)
+            if np.any(free):
+                step[free] = -np.linalg.solve(self.H[np.ix_(free, free)],
+                                              grad[free])
+
+            if np.max(np.abs(step), initial=0.0) <= self.tol:
+                # release the bound with the most negative multiplier
+                multiplier = np.where(at_lower, grad,
+                                      np.where(at_upper, -grad, np.inf))
+                i = np.argmin(multiplier)
+                if multiplier[i] >= -self.tol:
+                    break
+                at_lower[i] = at_upper[i] = False
+                continue
+
+            # step until the first blocking bound
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.where(step < 0.0, (self.u_min - u) / step,
+                                 np.where(step > 0.0, (self.u_max - u) / step,
+                                          np.inf))
+            i = np.argmin(ratio)
+            alpha = min(1.0, ratio[i])
+            u = u + alpha * step
+            if alpha < 1.0:
+                u[i] = self.u_min[i] if step[i] < 0.0 else self.u_max[i]
+                at_lower[i] = step[i] < 0.0
+                at_upper[i] = step[i] > 0.0
+
+        return u
+
+    def predict(self, x0, u):
+        """
+        :return: (horizon + 1, nx) states from x0 with the inputs u
+        """
+        x = self.Phi @ x0 + self.Gamma @ u.ravel()
+        return np.vstack((x0, x.reshape(self.horizon, -1)))
+
+
+def mpc_control_condensed(x0, controller):
+    """
+    mpc_control solved with a CondensedMPC
+    """
+    start = time.time()
+    ou = controller.solve(x0[:, 0])
+    elapsed_time = time.time() - start
+    print("calc time:{0} [sec]".format(elapsed_time))
+
+    x = controller.predict(x0[:, 0], ou)
+
+    return x[:, 0], x[:, 1], x[:, 2], x[:, 3], ou[:, 0]
+
+
+def benchmark(n_solves=100, u_max=None):
+    """
+    compare the solve time of mpc_control and mpc_control_condensed
+
+    :return: mean solve time [s] of each backend
+    """
+    A, B = get_model_matrix()
+    x0 = np.array([[0.0], [0.0], [0.3], [0.0]])
+    if u_max is None:
+        u_min = None
+        controller = CondensedMPC(A, B, Q, R, T)
+    else:
+        u_min = -u_max
+        controller = CondensedMPC(A, B, Q, R, T, u_min=u_min, u_max=u_max)
+
+    result = {}
+    for name, solve in [
+            ("cvxpy", lambda: mpc_control(x0, u_min, u_max)),
+            ("condensed", lambda: controller.solve(x0[:, 0]))]:
+        start = time.perf_counter()
+        for _ in range(n_solves):
+            solve()
+        result[name] = (time.perf_counter() - start) / n_solves
+        print("{0}: {1:.3e} [sec/solve]".format(name, result[name]))
+
+    return result
+
+
 def get_numpy_array_from_matrix(x):
     """
     get build-in list from matrix
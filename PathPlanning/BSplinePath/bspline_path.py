@@ -5,11 +5,15 @@ Path Planner with B-Spline
 author: Atsushi Sakai (@Atsushi_twi)
 
 """
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 import numpy as np
 import matplotlib.pyplot as plt
 import scipy.interpolate as scipy_interpolate
 
+BATCH_CHUNK_SIZE = 1024  # number of paths evaluated together
+
 
 def approximate_b_spline_path(x: list, y: list, n_path_points: int,
                               degree: int = 3) -> tuple:
@@ -58,6 +62,121 @@ def interpolate_b_spline_path(x: list, y: list, n_path_points: int,
     return spl_i_x(travel), spl_i_y(travel)
 
 
+@lru_cache(maxsize=32)
+def calc_b_spline_basis(n_points: int, n_path_points: int, degree: int = 3,
+                        interpolate: bool = False) -> tuple:
+    """
+    B-Spline basis matrices of the paths of n_points way points
+
+    A path of approximate_b_spline_path or interpolate_b_spline_path is
+    linear in its way points, and its parameterization only depends on the
+    number of way points. So every path is a product of these matrices and
+    its way points.
+
+    :param n_points: number of way points
+    :param n_path_points: number of path points
+    :param degree: B-Spline degree
+    :param interpolate: interpolation basis if True, else approximation basis
+    :return: (n_path_points, n_points) read only matrices of the position,
+        the first and the second derivatives
+    """
+    t = np.arange(n_points, dtype=float)
+    travel = np.linspace(0.0, n_points - 1, n_path_points)
+    if interpolate:
+        spl = scipy_interpolate.make_interp_spline(t, np.eye(n_points),
+                                                   k=degree)
+    else:
+        knots = scipy_interpolate.splrep(t, np.zeros(n_points), k=degree)[0]
+        spl = scipy_interpolate.BSpline(knots, np.eye(n_points), degree)
+
+    basis = (spl(travel), spl.derivative(1)(travel),
+             spl.derivative(2)(travel))
+    for b in basis:
+        b.flags.writeable = False
+
+    return basis
+
+
+def approximate_b_spline_path_batch(points, n_path_points: int,
+                                    degree: int = 3, **kwargs):
+    """
+    approximate many way point lists with B-Spline paths
+
+    :param points: (n_paths, n_points, 2) array of way points
+    :param n_path_points: number of path points
+    :param degree: (Optional) B Spline curve degree
+    :param kwargs: see calc_b_spline_path_batch
+    :return: (n_paths, n_path_points, 4) array of [x, y, yaw, curvature]
+    """
+    return calc_b_spline_path_batch(points, n_path_points, degree,
+                                    interpolate=False, **kwargs)
+
+
+def interpolate_b_spline_path_batch(points, n_path_points: int,
+                                    degree: int = 3, **kwargs):
+    """
+    interpolate many way point lists with B-Spline paths
+
+    :param points: (n_paths, n_points, 2) array of way points
+    :param n_path_points: number of path points
+    :param degree: B-Spline degree
+    :param kwargs: see calc_b_spline_path_batch
+    :return: (n_paths, n_path_points, 4) array of [x, y, yaw, curvature]
+    """
+    return calc_b_spline_path_batch(points, n_path_points, degree,
+                                    interpolate=True, **kwargs)
+
+
+def calc_b_spline_path_batch(points, n_path_points: int, degree: int = 3,
+                             interpolate: bool = False,
+                             chunk_size: int = BATCH_CHUNK_SIZE, out=None,
+                             max_workers=None):
+    """
+    evaluate B-Spline paths with their heading and curvature for many way
+    point lists sharing one parameterization
+
+    The paths are evaluated in chunks of chunk_size paths on a thread pool,
+    and each chunk is written to out as soon as it is done.
+
+    :param points: (n_paths, n_points, 2) array of way points
+    :param n_path_points: number of path points
+    :param degree: B-Spline degree
+    :param interpolate: interpolate the way points if True, else approximate
+    :param chunk_size: number of paths evaluated together
+    :param out: (Optional) (n_paths, n_path_points, 4) array to write the
+        result to, e.g. a memory-mapped .npy file from
+        np.lib.format.open_memmap
+    :param max_workers: (Optional) number of threads
+    :return: (n_paths, n_path_points, 4) array of [x, y, yaw, curvature]
+    """
+    points = np.asarray(points, dtype=float)
+    n_paths, n_points, _ = points.shape
+    basis, d_basis, dd_basis = calc_b_spline_basis(n_points, n_path_points,
+                                                   degree, interpolate)
+    if out is None:
+        out = np.empty((n_paths, n_path_points, 4))
+
+    def evaluate_chunk(start):
+        chunk = points[start:start + chunk_size]
+        # (paths, path points, [x, y])
+        xy = basis @ chunk
+        dxy = d_basis @ chunk
+        ddxy = dd_basis @ chunk
+        dx, dy = dxy[..., 0], dxy[..., 1]
+
+        out[start:start + len(chunk), :, 0:2] = xy
+        out[start:start + len(chunk), :, 2] = np.arctan2(dy, dx)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[start:start + len(chunk), :, 3] = \
+                (dx * ddxy[..., 1] - dy * ddxy[..., 0]) \
+                / (dx ** 2 + dy ** 2) ** 1.5
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(evaluate_chunk, range(0, n_paths, chunk_size)))
+
+    return out
+
+
 def main():
     print(__file__ + " start!!")
     # way points
@@ -6,6 +6,8 @@ author: Atsushi Sakai(@Atsushi_twi)
 
 """
 
+from functools import lru_cache
+
 import matplotlib.pyplot as plt
 import numpy as np
 import scipy.special
@@ -46,11 +48,64 @@ def calc_bezier_path(control_points, n_points=100):
     :param n_points: (int) number of points in the trajectory
     :return: (numpy array)
     """
-    traj = []
-    for t in np.linspace(0, 1, n_points):
-        traj.append(bezier(t, control_points))
+    n = len(control_points) - 1
+    return bernstein_basis(n, n_points) @ control_points
+
+
+@lru_cache(maxsize=32)
+def bernstein_basis(n, n_points):
+    """
+    Bernstein basis matrix for n_points samples of t in [0, 1].
+
+    The matrix is cached per (n, n_points), so it must not be modified.
 
-    return np.array(traj)
+    :param n: (int) polynom degree
+    :param n_points: (int) number of samples
+    :return: (numpy array) shape (n_points, n + 1)
+    """
+    t = np.linspace(0, 1, n_points)[:, np.newaxis]
+    i = np.arange(n + 1)
+    basis = scipy.special.comb(n, i) * t ** i * (1 - t) ** (n - i)
+    basis.flags.writeable = False
+    return basis
+
+
+def calc_bezier_path_batch(control_points, n_points=100, n_derivatives=0):
+    """
+    Compute bezier paths and their derivatives for many curves at once.
+
+    :param control_points: (numpy array) shape (n_curves, n + 1, dim),
+        all curves must have the same degree n
+    :param n_points: (int) number of points in each trajectory
+    :param n_derivatives: (int) number of derivatives to compute
+    :return: ([numpy array]) n_derivatives + 1 arrays of shape
+        (n_curves, n_points, dim), the path first and then its derivatives
+        with respect to t
+    """
+    w = np.asarray(control_points, dtype=float)
+    results = []
+    for _ in range(n_derivatives + 1):
+        n = w.shape[-2] - 1
+        if n < 0:  # derivatives beyond the degree of the curves are zero
+            results.append(np.zeros_like(results[-1]))
+            continue
+        results.append(np.einsum("pi,cid->cpd", bernstein_basis(n, n_points),
+                                 w))
+        # control points of the derivative curve
+        w = n * np.diff(w, axis=-2)
+    return results
+
+
+def calc_bezier_curvature_batch(control_points, n_points=100):
+    """
+    Compute the curvature of many 2D bezier curves at once.
+
+    :param control_points: (numpy array) shape (n_curves, n + 1, 2)
+    :param n_points: (int) number of points in each trajectory
+    :return: (numpy array) shape (n_curves, n_points)
+    """
+    _, d, dd = calc_bezier_path_batch(control_points, n_points, 2)
+    return curvature(d[..., 0], d[..., 1], dd[..., 0], dd[..., 1])
 
 
 def bernstein_poly(n, i, t):
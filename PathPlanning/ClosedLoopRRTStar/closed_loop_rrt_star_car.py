@@ -70,34 +70,51 @@ class ClosedLoopRRTStar(RRTStarReedsShepp):
 
         print("Start search feasible path")
 
-        best_time = float("inf")
-
-        fx, fy, fyaw, fv, ft, fa, fd = None, None, None, None, None, None, None
-
-        # pure pursuit tracking
-        for ind in path_indexs:
-            path = self.generate_final_course(ind)
-
-            flag, x, y, yaw, v, t, a, d = self.check_tracking_path_is_feasible(
-                path)
-
-            if flag and best_time >= t[-1]:
-                print("feasible path is found")
-                best_time = t[-1]
-                fx, fy, fyaw, fv, ft, fa, fd = x, y, yaw, v, t, a, d
-
+        if not path_indexs:
+            print("best time is")
+            print(float("inf"))
+            return False, None, None, None, None, None, None, None
+
+        # pure pursuit tracking of all the candidate paths in lockstep
+        courses = [self.calc_tracking_course(self.generate_final_course(ind))
+                   for ind in path_indexs]
+        (cx, cy, speed_profile), n_points = pure_pursuit.pad_courses(
+            [(icx, icy, isp) for (icx, icy, _, _, isp) in courses])
+        prediction = pure_pursuit.ClosedLoopPredictionBatch(
+            cx, cy, speed_profile, n_points,
+            [goal[0:2] for (_, _, _, goal, _) in courses])
+
+        best = None
+        while best is None and not prediction.done:
+            arrived = prediction.step()
+
+            # the first feasible arrival has the shortest time, so the
+            # rest of the candidates are not simulated any further
+            for i in np.flatnonzero(arrived):
+                t, x, y, yaw, v, a, d = prediction.get_trajectory(i)
+                yaw = [reeds_shepp_path_planning.pi_2_pi(iyaw)
+                       for iyaw in yaw]
+                icx, icy, _, goal, _ = courses[i]
+                if self.check_tracking_result(icx, icy, goal, True, x, y,
+                                              yaw, v):
+                    best = x, y, yaw, v, t, a, d
+
+        if best is None:
+            print("best time is")
+            print(float("inf"))
+            return False, None, None, None, None, None, None, None
+
+        print("feasible path is found")
+        fx, fy, fyaw, fv, ft, fa, fd = best
         print("best time is")
-        print(best_time)
-
-        if fx:
-            fx.append(self.end.x)
-            fy.append(self.end.y)
-            fyaw.append(self.end.yaw)
-            return True, fx, fy, fyaw, fv, ft, fa, fd
+        print(ft[-1])
 
-        return False, None, None, None, None, None, None, None
+        fx.append(self.end.x)
+        fy.append(self.end.y)
+        fyaw.append(self.end.yaw)
+        return True, fx, fy, fyaw, fv, ft, fa, fd
 
-    def check_tracking_path_is_feasible(self, path):
+    def calc_tracking_course(self, path):
         cx = np.array([state[0] for state in path])[::-1]
         cy = np.array([state[1] for state in path])[::-1]
         cyaw = np.array([state[2] for state in path])[::-1]
@@ -109,10 +126,22 @@ class ClosedLoopRRTStar(RRTStarReedsShepp):
         speed_profile = pure_pursuit.calc_speed_profile(
             cx, cy, cyaw, self.target_speed)
 
+        return cx, cy, cyaw, goal, speed_profile
+
+    def check_tracking_path_is_feasible(self, path):
+        cx, cy, cyaw, goal, speed_profile = self.calc_tracking_course(path)
+
         t, x, y, yaw, v, a, d, find_goal = pure_pursuit.closed_loop_prediction(
             cx, cy, cyaw, speed_profile, goal)
         yaw = [reeds_shepp_path_planning.pi_2_pi(iyaw) for iyaw in yaw]
 
+        find_goal = self.check_tracking_result(cx, cy, goal, find_goal,
+                                               x, y, yaw, v)
+
+        return find_goal, x, y, yaw, v, t, a, d
+
+    def check_tracking_result(self, cx, cy, goal, find_goal, x, y, yaw, v):
+
         if not find_goal:
             print("cannot reach goal")
 
@@ -131,7 +160,7 @@ class ClosedLoopRRTStar(RRTStarReedsShepp):
             print("This path is collision")
             find_goal = False
 
-        return find_goal, x, y, yaw, v, t, a, d
+        return find_goal
 
     def get_goal_indexes(self):
         goalinds = []
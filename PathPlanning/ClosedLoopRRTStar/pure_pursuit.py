@@ -153,6 +153,166 @@ def closed_loop_prediction(cx, cy, cyaw, speed_profile, goal):
     return t, x, y, yaw, v, a, d, find_goal
 
 
+def pad_courses(courses):
+    """
+    pad courses of different lengths into (N, max_len) arrays by repeating
+    their last point
+
+    return
+        list of padded arrays, one for each course component
+        n_points: (N,) number of points of each course
+    """
+    n_points = np.array([len(course[0]) for course in courses])
+    padded = []
+    for i in range(len(courses[0])):
+        padded.append(np.array(
+            [np.pad(np.asarray(course[i], dtype=float),
+                    (0, max(n_points) - len(course[i])), mode="edge")
+             for course in courses]))
+
+    return padded, n_points
+
+
+def calc_target_index_batch(state, cx, cy, n_points):
+    """
+    calc_target_index for a State of (N,) arrays and (N, max_len) padded
+    courses
+    """
+    rows = np.arange(len(cx))
+    valid = np.arange(cx.shape[1]) < n_points[:, np.newaxis]
+
+    d = np.where(valid, np.hypot(state.x[:, np.newaxis] - cx,
+                                 state.y[:, np.newaxis] - cy), np.inf)
+    ind = np.argmin(d, axis=1)
+    mindis = d[rows, ind]
+
+    seg = np.hypot(np.diff(cx, axis=1), np.diff(cy, axis=1))
+    L = np.zeros(len(cx))
+
+    # walk forward like calc_target_index, all the courses together
+    walk = (Lf > L) & (ind + 1 < n_points)
+    while np.any(walk):
+        L[walk] += seg[rows[walk], ind[walk]]
+        ind[walk] += 1
+        walk = (Lf > L) & (ind + 1 < n_points)
+
+    return ind, mindis
+
+
+def pure_pursuit_control_batch(state, cx, cy, n_points, pind):
+    """
+    pure_pursuit_control for a State of (N,) arrays and (N, max_len) padded
+    courses
+    """
+
+    ind, dis = calc_target_index_batch(state, cx, cy, n_points)
+
+    ind = np.minimum(np.maximum(ind, pind), n_points - 1)
+    rows = np.arange(len(cx))
+    tx = cx[rows, ind]
+    ty = cy[rows, ind]
+
+    alpha = np.arctan2(ty - state.y, tx - state.x) - state.yaw
+
+    alpha = np.where(state.v <= 0.0, math.pi - alpha, alpha)  # back
+
+    delta = np.arctan2(2.0 * unicycle_model.L * np.sin(alpha) / Lf, 1.0)
+    delta = np.clip(delta, -unicycle_model.steer_max, unicycle_model.steer_max)
+
+    return delta, ind, dis
+
+
+class ClosedLoopPredictionBatch:
+    """
+    closed_loop_prediction for many courses simulated in lockstep
+
+    Each call of step() advances all the running courses by one control step,
+    so the caller can stop the simulation as soon as it has the result it
+    needs.
+    """
+
+    def __init__(self, cx, cy, speed_profile, n_points, goal):
+        """
+        cx, cy, speed_profile: (N, max_len) padded courses, see pad_courses
+        n_points: (N,) number of points of each course
+        goal: (N, 2) goal positions
+        """
+        self.cx, self.cy = cx, cy
+        self.speed_profile = speed_profile
+        self.n_points = n_points
+        self.goal = np.asarray(goal, dtype=float)
+
+        n = len(cx)
+        self.state = unicycle_model.State(x=np.zeros(n), y=np.zeros(n),
+                                          yaw=np.zeros(n), v=np.zeros(n))
+        self.time = 0.0
+        self.target_ind, _ = calc_target_index_batch(self.state, cx, cy,
+                                                     n_points)
+
+        self.running = np.ones(n, dtype=bool)
+        self.find_goal = np.zeros(n, dtype=bool)
+        self.length = np.ones(n, dtype=int)  # number of recorded states
+
+        zeros = np.zeros(n)
+        self.history = {"t": [zeros], "x": [zeros], "y": [zeros],
+                        "yaw": [zeros], "v": [zeros], "a": [zeros],
+                        "d": [zeros]}
+
+    @property
+    def done(self):
+        return not np.any(self.running) or T < self.time
+
+    def step(self):
+        """
+        advance all the running courses by one control step
+
+        return: (N,) bool array of the courses which reached their goal
+        """
+        maxdis = 0.5
+
+        di, self.target_ind, dis = pure_pursuit_control_batch(
+            self.state, self.cx, self.cy, self.n_points, self.target_ind)
+
+        target_speed = self.speed_profile[np.arange(len(self.cx)),
+                                          self.target_ind]
+        target_speed = target_speed * \
+            (maxdis - np.minimum(dis, maxdis - 0.1)) / maxdis
+
+        ai = np.clip(Kp * (target_speed - self.state.v),
+                     -unicycle_model.accel_max, unicycle_model.accel_max)
+        self.state = unicycle_model.update_batch(self.state, ai, di)
+
+        stop = (np.abs(self.state.v) <= stop_speed) \
+            & (self.target_ind <= self.n_points - 2)
+        self.target_ind = self.target_ind + stop
+
+        self.time = self.time + unicycle_model.dt
+
+        # check goal
+        dx = self.state.x - self.goal[:, 0]
+        dy = self.state.y - self.goal[:, 1]
+        arrived = self.running & (np.hypot(dx, dy) <= goal_dis)
+        self.find_goal |= arrived
+        self.running &= ~arrived
+
+        for key, value in (("t", np.full(len(self.cx), self.time)),
+                           ("x", self.state.x), ("y", self.state.y),
+                           ("yaw", self.state.yaw), ("v", self.state.v),
+                           ("a", ai), ("d", di)):
+            self.history[key].append(value)
+        self.length += self.running
+
+        return arrived
+
+    def get_trajectory(self, i):
+        """
+        return: t, x, y, yaw, v, a, d lists of the i-th course like
+            closed_loop_prediction
+        """
+        return [np.array(self.history[key])[:self.length[i], i].tolist()
+                for key in ("t", "x", "y", "yaw", "v", "a", "d")]
+
+
 def set_stop_point(target_speed, cx, cy, cyaw):
     speed_profile = [target_speed] * len(cx)
     forward = True
@@ -38,6 +38,20 @@ def update(state, a, delta):
     return state
 
 
+def update_batch(state, a, delta):
+    """
+    update for a State of (N,) arrays
+    """
+
+    state.x = state.x + state.v * np.cos(state.yaw) * dt
+    state.y = state.y + state.v * np.sin(state.yaw) * dt
+    state.yaw = state.yaw + state.v / L * np.tan(delta) * dt
+    state.yaw = pi_2_pi(state.yaw)
+    state.v = state.v + a * dt
+
+    return state
+
+
 def pi_2_pi(angle):
     return (angle + math.pi) % (2 * math.pi) - math.pi
 
@@ -7,6 +7,7 @@ Author: Atsushi Sakai(@Atsushi_twi)
 import math
 import numpy as np
 import bisect
+from scipy.spatial import cKDTree
 
 
 class Spline:
@@ -39,13 +40,24 @@ class Spline:
                 (self.c[i + 1] + 2.0 * self.c[i]) / 3.0
             self.b.append(tb)
 
+        self.a = np.array(self.a, dtype=float)
+        self.b = np.array(self.b)
+        self.d = np.array(self.d)
+        self.__x = np.asarray(x, dtype=float)  # for array queries
+
     def calc(self, t):
         """
         Calc position
 
-        if t is outside of the input x, return None
+        t can be a scalar or an array.
+        if t is outside of the input x, return None (np.nan for arrays)
 
         """
+        if np.ndim(t) != 0:
+            i, dx, inside = self.__search_index_array(t)
+            result = self.a[i] + self.b[i] * dx + \
+                self.c[i] * dx ** 2.0 + self.d[i] * dx ** 3.0
+            return np.where(inside, result, np.nan)
 
         if t < self.x[0]:
             return None
@@ -63,8 +75,14 @@ class Spline:
         """
         Calc first derivative
 
-        if t is outside of the input x, return None
+        t can be a scalar or an array.
+        if t is outside of the input x, return None (np.nan for arrays)
         """
+        if np.ndim(t) != 0:
+            i, dx, inside = self.__search_index_array(t)
+            result = self.b[i] + 2.0 * self.c[i] * dx + \
+                3.0 * self.d[i] * dx ** 2.0
+            return np.where(inside, result, np.nan)
 
         if t < self.x[0]:
             return None
@@ -79,7 +97,13 @@ class Spline:
     def calcdd(self, t):
         """
         Calc second derivative
+
+        t can be a scalar or an array.
         """
+        if np.ndim(t) != 0:
+            i, dx, inside = self.__search_index_array(t)
+            result = 2.0 * self.c[i] + 6.0 * self.d[i] * dx
+            return np.where(inside, result, np.nan)
 
         if t < self.x[0]:
             return None
@@ -97,6 +121,20 @@ class Spline:
         """
         return bisect.bisect(self.x, x) - 1
 
+    def __search_index_array(self, t):
+        """
+        search data segment indexes for an array
+
+        returns: segment indexes, offsets in the segments and
+            a mask of the values inside of the input x
+        """
+        t = np.asarray(t, dtype=float)
+        i = np.searchsorted(self.__x, t, side="right") - 1
+        # the last knot belongs to the last segment
+        i = np.clip(i, 0, self.nx - 2)
+        inside = (t >= self.__x[0]) & (t <= self.__x[-1])
+        return i, t - self.__x[i], inside
+
     def __calc_A(self, h):
         """
         calc matrix A for spline coefficient c
@@ -148,6 +186,8 @@ class Spline2D:
     def calc_position(self, s):
         """
         calc position
+
+        s can be a scalar or an array
         """
         x = self.sx.calc(s)
         y = self.sy.calc(s)
@@ -157,6 +197,8 @@ class Spline2D:
     def calc_curvature(self, s):
         """
         calc curvature
+
+        s can be a scalar or an array
         """
         dx = self.sx.calcd(s)
         ddx = self.sx.calcdd(s)
@@ -168,26 +210,78 @@ class Spline2D:
     def calc_yaw(self, s):
         """
         calc yaw
+
+        s can be a scalar or an array
         """
         dx = self.sx.calcd(s)
         dy = self.sy.calcd(s)
+        if np.ndim(s) != 0:
+            return np.arctan2(dy, dx)
         yaw = math.atan2(dy, dx)
         return yaw
 
 
+class Spline2DProjector:
+    """
+    Nearest arc length projection index for Spline2D
+
+    A dense table of course samples is indexed with a KD-tree. A query
+    takes the nearest sample as initial guess and refines it with Newton
+    steps on the squared distance, so mapping (x, y) to s costs O(log n).
+    """
+
+    def __init__(self, sp, ds=0.1, n_newton=3):
+        """
+        sp: Spline2D
+        ds: sampling length of the table [m]
+        n_newton: number of Newton refinement steps
+        """
+        self.sp = sp
+        self.n_newton = n_newton
+        self.s_table = np.append(np.arange(sp.s[0], sp.s[-1], ds), sp.s[-1])
+        x, y = sp.calc_position(self.s_table)
+        self.tree = cKDTree(np.vstack((x, y)).T)
+
+    def calc_s(self, x, y):
+        """
+        calc arc length of the nearest course point
+
+        x, y can be scalars or arrays
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float),
+                                   np.asarray(y, dtype=float))
+        qx, qy = x.ravel(), y.ravel()
+        _, ind = self.tree.query(np.vstack((qx, qy)).T)
+        s = self.s_table[ind]
+
+        sx, sy = self.sp.sx, self.sp.sy
+        for _ in range(self.n_newton):
+            ex, ey = sx.calc(s) - qx, sy.calc(s) - qy
+            dx, dy = sx.calcd(s), sy.calcd(s)
+            ddx, ddy = sx.calcdd(s), sy.calcdd(s)
+
+            # derivatives of 0.5 * squared distance with respect to s
+            grad = ex * dx + ey * dy
+            hess = dx ** 2 + dy ** 2 + ex * ddx + ey * ddy
+            # only take the step where the distance is locally convex
+            convex = hess > 0.0
+            step = np.where(convex, grad / np.where(convex, hess, 1.0), 0.0)
+            s = np.clip(s - step, self.sp.s[0], self.sp.s[-1])
+
+        if x.ndim == 0:
+            return float(s[0])
+        return s.reshape(x.shape)
+
+
 def calc_spline_course(x, y, ds=0.1):
     sp = Spline2D(x, y)
-    s = list(np.arange(0, sp.s[-1], ds))
+    s = np.arange(0, sp.s[-1], ds)
 
-    rx, ry, ryaw, rk = [], [], [], []
-    for i_s in s:
-        ix, iy = sp.calc_position(i_s)
-        rx.append(ix)
-        ry.append(iy)
-        ryaw.append(sp.calc_yaw(i_s))
-        rk.append(sp.calc_curvature(i_s))
+    rx, ry = sp.calc_position(s)
+    ryaw = sp.calc_yaw(s)
+    rk = sp.calc_curvature(s)
 
-    return rx, ry, ryaw, rk, s
+    return rx.tolist(), ry.tolist(), ryaw.tolist(), rk.tolist(), s.tolist()
 
 
 def main():  # pragma: no cover
@@ -54,6 +54,30 @@ def dubins_path_planning(s_x, s_y, s_yaw, g_x, g_y, g_yaw, curvature,
     return x_list, y_list, yaw_list, modes, lengths
 
 
+def dubins_path_length(s_x, s_y, s_yaw, g_x, g_y, g_yaw, curvature):
+    """
+    Segment lengths of the Dubins path, without generating its points
+
+    The arguments are the same as dubins_path_planning.
+
+    :return:
+        modes: mode list of a path
+        lengths: length of path segments.
+    """
+
+    g_x -= s_x
+    g_y -= s_y
+
+    l_rot = Rot.from_euler('z', s_yaw).as_matrix()[0:2, 0:2]
+    le_xy = np.stack([g_x, g_y]).T @ l_rot
+    le_yaw = g_yaw - s_yaw
+
+    lengths, mode = calc_dubins_lengths_from_origin(le_xy[0], le_xy[1],
+                                                    le_yaw, curvature)
+
+    return mode, [length / curvature for length in lengths]
+
+
 def mod2pi(theta):
     return theta - 2.0 * math.pi * math.floor(theta / 2.0 / math.pi)
 
@@ -177,8 +201,7 @@ def left_right_left(alpha, beta, d):
     return t, p, q, mode
 
 
-def dubins_path_planning_from_origin(end_x, end_y, end_yaw, curvature,
-                                     step_size):
+def calc_dubins_lengths_from_origin(end_x, end_y, end_yaw, curvature):
     dx = end_x
     dy = end_y
     D = math.hypot(dx, dy)
@@ -204,7 +227,14 @@ def dubins_path_planning_from_origin(end_x, end_y, end_yaw, curvature,
         if best_cost > cost:
             bt, bp, bq, best_mode = t, p, q, mode
             best_cost = cost
-    lengths = [bt, bp, bq]
+
+    return [bt, bp, bq], best_mode
+
+
+def dubins_path_planning_from_origin(end_x, end_y, end_yaw, curvature,
+                                     step_size):
+    lengths, best_mode = calc_dubins_lengths_from_origin(end_x, end_y,
+                                                         end_yaw, curvature)
 
     x_list, y_list, yaw_list, directions = generate_local_course(sum(lengths),
                                                                  lengths,
@@ -11,6 +11,7 @@ from enum import Enum
 
 import matplotlib.pyplot as plt
 import numpy as np
+from scipy.spatial import cKDTree
 
 show_animation = True
 
@@ -26,6 +27,22 @@ def dwa_control(x, config, goal, ob):
     return u, trajectory
 
 
+def dwa_control_batch(x, config, goal, ob, ob_tree=None):
+    """
+    Dynamic Window Approach control with all samples rolled out at once
+
+    ob_tree: cKDTree of ob, pass it to avoid rebuilding it every cycle
+    """
+    dw = calc_dynamic_window(x, config)
+    if ob_tree is None:
+        ob_tree = cKDTree(ob)
+
+    u, trajectory = calc_control_and_trajectory_batch(
+        x, dw, config, goal, ob, ob_tree)
+
+    return u, trajectory
+
+
 class RobotType(Enum):
     circle = 0
     rectangle = 1
@@ -181,6 +198,137 @@ def calc_control_and_trajectory(x, dw, config, goal, ob):
     return best_u, best_trajectory
 
 
+def calc_n_predict_steps(config):
+    """
+    number of motion steps done by predict_trajectory
+    """
+    n_steps = 0
+    time = 0
+    while time <= config.predict_time:
+        n_steps += 1
+        time += config.dt
+    return n_steps
+
+
+def predict_trajectories(x_init, v, y, config):
+    """
+    predict trajectories for arrays of inputs at once
+
+    returns: (len(v), n_steps + 1, 5) array, same values as
+        predict_trajectory for each input
+    """
+    v = np.asarray(v, dtype=float)[:, None]
+    y = np.asarray(y, dtype=float)[:, None]
+    n_steps = calc_n_predict_steps(config)
+    shape = (v.shape[0], n_steps + 1)
+
+    # accumulate like motion() does, step by step
+    d_yaw = np.broadcast_to(y * config.dt, shape).copy()
+    d_yaw[:, 0] = x_init[2]
+    yaw = np.cumsum(d_yaw, axis=1)
+
+    d_x = v * np.cos(yaw) * config.dt
+    d_x[:, 0] = x_init[0]
+    d_y = v * np.sin(yaw) * config.dt
+    d_y[:, 0] = x_init[1]
+
+    trajectories = np.empty(shape + (5,))
+    trajectories[:, :, 0] = np.cumsum(d_x, axis=1)
+    trajectories[:, :, 1] = np.cumsum(d_y, axis=1)
+    trajectories[:, :, 2] = yaw
+    trajectories[:, :, 3] = v
+    trajectories[:, :, 4] = y
+    trajectories[:, 0, 3:] = x_init[3:5]
+
+    return trajectories
+
+
+def calc_control_and_trajectory_batch(x, dw, config, goal, ob, ob_tree):
+    """
+    calculation final input with dynamic window, evaluating all sampled
+    inputs as one array
+    """
+    v, y = np.meshgrid(np.arange(dw[0], dw[1], config.v_resolution),
+                       np.arange(dw[2], dw[3], config.yaw_rate_resolution),
+                       indexing="ij")
+    v, y = v.ravel(), y.ravel()
+    if v.size == 0:
+        return [0.0, 0.0], np.array([x])
+
+    trajectories = predict_trajectories(x, v, y, config)
+
+    # calc cost
+    to_goal_cost = config.to_goal_cost_gain * \
+        calc_to_goal_cost_batch(trajectories, goal)
+    speed_cost = config.speed_cost_gain * \
+        (config.max_speed - trajectories[:, -1, 3])
+    ob_cost = config.obstacle_cost_gain * \
+        calc_obstacle_cost_batch(trajectories, ob, ob_tree, config)
+    final_cost = to_goal_cost + speed_cost + ob_cost
+
+    # search minimum trajectory, the last one wins on ties
+    # like calc_control_and_trajectory
+    i = len(final_cost) - 1 - np.argmin(final_cost[::-1])
+    best_u = [v[i], y[i]]
+    if abs(best_u[0]) < config.robot_stuck_flag_cons \
+            and abs(x[3]) < config.robot_stuck_flag_cons:
+        # to ensure the robot do not get stuck, see
+        # calc_control_and_trajectory
+        best_u[1] = -config.max_delta_yaw_rate
+
+    return best_u, trajectories[i]
+
+
+def calc_obstacle_cost_batch(trajectories, ob, ob_tree, config):
+    """
+    calc obstacle cost for (n, steps, 5) trajectories, inf: collision
+
+    ob_tree: cKDTree of ob
+    """
+    points = trajectories[:, :, 0:2].reshape(-1, 2)
+    r, _ = ob_tree.query(points)
+    min_r = np.min(r.reshape(trajectories.shape[:2]), axis=1)
+
+    if config.robot_type == RobotType.rectangle:
+        # only obstacles inside of the circumscribed circle can collide
+        radius = math.hypot(config.robot_length / 2, config.robot_width / 2)
+        neighbors = ob_tree.query_ball_point(points, radius)
+        counts = np.array([len(n) for n in neighbors])
+        point_ind = np.repeat(np.arange(len(points)), counts)
+        ob_ind = np.fromiter((j for n in neighbors for j in n), dtype=int,
+                             count=counts.sum())
+
+        yaw = trajectories[:, :, 2].reshape(-1)[point_ind]
+        d = ob[ob_ind] - points[point_ind]
+        # coordinates in the robot frame
+        local_x = d[:, 0] * np.cos(yaw) + d[:, 1] * np.sin(yaw)
+        local_y = -d[:, 0] * np.sin(yaw) + d[:, 1] * np.cos(yaw)
+        inside = (np.abs(local_x) <= config.robot_length / 2) & \
+            (np.abs(local_y) <= config.robot_width / 2)
+        collision = np.zeros(len(points), dtype=bool)
+        collision[point_ind[inside]] = True
+        collision = np.any(collision.reshape(trajectories.shape[:2]), axis=1)
+    elif config.robot_type == RobotType.circle:
+        collision = min_r <= config.robot_radius
+
+    with np.errstate(divide="ignore"):
+        cost = 1.0 / min_r
+    cost[collision] = float("Inf")
+    return cost
+
+
+def calc_to_goal_cost_batch(trajectories, goal):
+    """
+        calc to goal cost with angle difference for (n, steps, 5)
+        trajectories
+    """
+    dx = goal[0] - trajectories[:, -1, 0]
+    dy = goal[1] - trajectories[:, -1, 1]
+    error_angle = np.arctan2(dy, dx)
+    cost_angle = error_angle - trajectories[:, -1, 2]
+    return np.abs(np.arctan2(np.sin(cost_angle), np.cos(cost_angle)))
+
+
 def calc_obstacle_cost(trajectory, ob, config):
     """
     calc obstacle cost inf: collision
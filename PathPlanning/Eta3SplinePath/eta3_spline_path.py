@@ -13,13 +13,18 @@ Ref:
 
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.integrate import quad
 
 # NOTE: *_pose is a 3-array:
 # 0 - x coord, 1 - y coord, 2 - orientation angle \theta
 
 show_animation = True
 
+# arc length tables: number of u intervals per segment and
+# Gauss-Legendre quadrature order used on each interval
+N_LENGTH_TABLE = 64
+GAUSS_LEGENDRE_ORDER = 8
+GL_NODES, GL_WEIGHTS = np.polynomial.legendre.leggauss(GAUSS_LEGENDRE_ORDER)
+
 
 class Eta3Path(object):
     """
@@ -185,8 +190,71 @@ class Eta3PathSegment(object):
             self.coeffs[:, 1:].dot(np.array(
                 [1, 2. * u, 3. * u**2, 4. * u**3,
                  5. * u**4, 6. * u**5, 7. * u**6]))), 1e-6)
-        self.f_length = lambda ue: quad(lambda u: self.s_dot(u), 0, ue)
-        self.segment_length = self.f_length(1)[0]
+        self.f_length = lambda ue: (float(self.calc_length(ue)), 0.0)
+
+        # cumulative arc length at uniformly spaced u, monotone because
+        # s_dot is always positive; used for length and s -> u lookups
+        self.u_table = np.linspace(0., 1., N_LENGTH_TABLE + 1)
+        self.s_table = np.concatenate(([0.], np.cumsum(
+            self.__calc_interval_length(self.u_table[:-1],
+                                        self.u_table[1:]))))
+        self.segment_length = self.s_table[-1]
+
+    def calc_s_dot(self, u):
+        """
+        Eta3PathSegment::calc_s_dot
+
+        input
+            u - array of interpolation parameters, 0 <= u <= 1
+        returns
+            rate of change of arc length wrt u, like s_dot
+        """
+        return np.maximum(np.hypot(*self.calc_derivs(u, order=1)), 1e-6)
+
+    def __calc_interval_length(self, u0, u1):
+        """
+        arc length between u0 and u1 (arrays) by Gauss-Legendre quadrature
+        """
+        u0, u1 = np.asarray(u0, dtype=float), np.asarray(u1, dtype=float)
+        half = (u1 - u0)[..., np.newaxis] / 2.
+        u = u0[..., np.newaxis] + half * (GL_NODES + 1.)
+        return np.sum(half * GL_WEIGHTS * self.calc_s_dot(u), axis=-1)
+
+    def calc_length(self, u):
+        """
+        Eta3PathSegment::calc_length
+
+        input
+            u - scalar or array of interpolation parameters, 0 <= u <= 1
+        returns
+            arc length from the start of the segment to u
+        """
+        u = np.asarray(u, dtype=float)
+        k = np.clip(np.searchsorted(self.u_table, u, side="right") - 1,
+                    0, N_LENGTH_TABLE - 1)
+        return self.s_table[k] + \
+            self.__calc_interval_length(self.u_table[k], u)
+
+    def calc_u(self, s, n_newton=2):
+        """
+        Eta3PathSegment::calc_u
+
+        input
+            s - scalar or array of arc lengths from the start of the segment
+        returns
+            interpolation parameters u with calc_length(u) == s
+        """
+        s = np.clip(np.asarray(s, dtype=float), 0., self.segment_length)
+        k = np.clip(np.searchsorted(self.s_table, s, side="right") - 1,
+                    0, N_LENGTH_TABLE - 1)
+        u0, u1 = self.u_table[k], self.u_table[k + 1]
+        # linear interpolation in the table as initial guess
+        u = u0 + (u1 - u0) * (s - self.s_table[k]) / \
+            (self.s_table[k + 1] - self.s_table[k])
+        for _ in range(n_newton):
+            f = self.s_table[k] + self.__calc_interval_length(u0, u) - s
+            u = np.clip(u - f / self.calc_s_dot(u), u0, u1)
+        return u
 
     def calc_point(self, u):
         """
@@ -217,6 +285,39 @@ class Eta3PathSegment(object):
 
         return self.coeffs[:, 2:].dot(np.array([2, 6. * u, 12. * u**2, 20. * u**3, 30. * u**4, 42. * u**5]))
 
+    def calc_points(self, u):
+        """
+        Eta3PathSegment::calc_points
+
+        input
+            u - array of interpolation parameters, 0 <= u <= 1
+        returns
+            (x,y) of the points along the segment, shape (2,) + u.shape
+        """
+        u = np.asarray(u, dtype=float)
+        return np.tensordot(self.coeffs, u[np.newaxis] ** np.arange(8).reshape(
+            (8,) + (1,) * u.ndim), axes=1)
+
+    def calc_derivs(self, u, order=1):
+        """
+        Eta3PathSegment::calc_derivs
+
+        input
+            u - array of interpolation parameters, 0 <= u <= 1
+        returns
+            (d^nx/du^n,d^ny/du^n) of the points along the segment,
+            shape (2,) + u.shape, for 0 < n <= 2
+        """
+        assert 0 < order <= 2
+        u = np.asarray(u, dtype=float)
+        powers = np.arange(8 - order).reshape((8 - order,) + (1,) * u.ndim)
+        if order == 1:
+            factors = np.arange(1., 8.)
+        else:
+            factors = np.arange(2., 8.) * np.arange(1., 7.)
+        return np.tensordot(self.coeffs[:, order:] * factors,
+                            u[np.newaxis] ** powers, axes=1)
+
 
 def test1():
 
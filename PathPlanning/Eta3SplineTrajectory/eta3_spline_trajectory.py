@@ -17,7 +17,8 @@ import matplotlib.pyplot as plt
 from matplotlib.collections import LineCollection
 import sys
 import os
-sys.path.append(os.path.relpath("../Eta3SplinePath"))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
+                "/../Eta3SplinePath")
 
 try:
     from eta3_spline_path import Eta3Path, Eta3PathSegment
@@ -58,8 +59,6 @@ class eta3_trajectory(Eta3Path):
             (np.array([0]), np.cumsum(length_array)))
         # compute velocity profile on top of the path
         self.velocity_profile()
-        self.ui_prev = 0
-        self.prev_seg_id = 0
 
     def velocity_profile(self):
         r"""                  /~~~~~----------------\
@@ -189,16 +188,8 @@ class eta3_trajectory(Eta3Path):
         assert(np.all(self.times >= 0))
         self.total_time = self.times.sum()
 
-    def get_interp_param(self, seg_id, s, ui, tol=0.001):
-        def f(u):
-            return self.segments[seg_id].f_length(u)[0] - s
-
-        def fprime(u):
-            return self.segments[seg_id].s_dot(u)
-        while (0 <= ui <= 1) and abs(f(ui)) > tol:
-            ui -= f(ui) / fprime(ui)
-        ui = max(0, min(ui, 1))
-        return ui
+    def get_interp_param(self, seg_id, s):
+        return float(self.segments[seg_id].calc_u(s))
 
     def calc_traj_point(self, time):
         # compute velocity at time
@@ -256,15 +247,8 @@ class eta3_trajectory(Eta3Path):
         else:
             # compute interpolation parameter using length from current segment's starting point
             curr_segment_length = s - self.cum_lengths[seg_id]
-            ui = self.get_interp_param(
-                seg_id=seg_id, s=curr_segment_length, ui=self.ui_prev)
-
-        if not seg_id == self.prev_seg_id:
-            self.ui_prev = 0
-        else:
-            self.ui_prev = ui
+            ui = self.get_interp_param(seg_id=seg_id, s=curr_segment_length)
 
-        self.prev_seg_id = seg_id
         # compute angular velocity of current point= (ydd*xd - xdd*yd) / (xd**2 + yd**2)
         d = self.segments[seg_id].calc_deriv(ui, order=1)
         dd = self.segments[seg_id].calc_deriv(ui, order=2)
@@ -290,6 +274,89 @@ class eta3_trajectory(Eta3Path):
             d[1], d[0]), linear_velocity, angular_velocity])
         return state
 
+    def calc_traj_points(self, times):
+        """
+        vectorized calc_traj_point
+
+        input
+            times - array of timestamps
+        returns
+            states as columns of a (5, len(times)) array, rows are
+            x, y, yaw, linear velocity and angular velocity
+        """
+        time = np.asarray(times, dtype=float)
+        t_end = np.cumsum(self.times)
+        s_end = np.cumsum(self.seg_lengths)
+
+        # velocity profile sections, see velocity_profile
+        conditions = [time <= t_end[0], time <= t_end[1], time <= t_end[2],
+                      time <= t_end[3], time <= t_end[4], time <= t_end[5],
+                      time < t_end[6]]
+        t_start = np.select(conditions, np.concatenate(([0.], t_end[:-1])),
+                            default=0.)
+        delta_t = time - t_start
+        j, a = self.max_jerk, self.max_accel
+        v = self.vels
+
+        linear_velocity = np.select(conditions, [
+            self.v0 + j * delta_t**2 / 2.,
+            v[0] + a * delta_t,
+            v[1] + a * delta_t - j * delta_t**2 / 2.,
+            np.full_like(delta_t, v[3]),
+            v[3] - j * delta_t**2 / 2.,
+            v[4] - a * delta_t,
+            v[5] - a * delta_t + j * delta_t**2 / 2.], default=0.)
+        s = np.select(conditions, [
+            self.v0 * delta_t + j * delta_t**3 / 6,
+            s_end[0] + v[0] * delta_t + a * delta_t**2 / 2.,
+            s_end[1] + v[1] * delta_t + a * delta_t**2 / 2.
+            - j * delta_t**3 / 6.,
+            s_end[2] + v[3] * delta_t,
+            s_end[3] + v[3] * delta_t - j * delta_t**3 / 6.,
+            s_end[4] + v[4] * delta_t - a * delta_t**2 / 2.,
+            s_end[5] + v[5] * delta_t - a * delta_t**2 / 2.
+            + j * delta_t**3 / 6.], default=self.total_length)
+        linear_accel = np.select(conditions, [
+            j * delta_t,
+            np.full_like(delta_t, a),
+            a - j * delta_t,
+            np.zeros_like(delta_t),
+            -j * delta_t,
+            np.full_like(delta_t, -a),
+            -a + j * delta_t], default=0.)
+
+        seg_ids = np.clip(
+            np.searchsorted(self.cum_lengths, s, side="right") - 1,
+            0, len(self.segments) - 1)
+        d = np.empty((2,) + time.shape)
+        dd = np.empty((2,) + time.shape)
+        pos = np.empty((2,) + time.shape)
+        su = np.empty(time.shape)
+        for seg_id, segment in enumerate(self.segments):
+            mask = seg_ids == seg_id
+            if not np.any(mask):
+                continue
+            ui = segment.calc_u(s[mask] - self.cum_lengths[seg_id])
+            d[:, mask] = segment.calc_derivs(ui, order=1)
+            dd[:, mask] = segment.calc_derivs(ui, order=2)
+            pos[:, mask] = segment.calc_points(ui)
+            su[mask] = segment.calc_s_dot(ui)
+
+        # compute angular velocity= (ydd*xd - xdd*yd) / (xd**2 + yd**2)
+        moving = ~np.isclose(su, 0.) & ~np.isclose(linear_velocity, 0.)
+        safe_v = np.where(moving, linear_velocity, 1.)
+        ut = linear_velocity / su
+        utt = linear_accel / su - (d[0] * dd[0] + d[1] * dd[1]) / su**2 * ut
+        xt = d[0] * ut
+        yt = d[1] * ut
+        xtt = dd[0] * ut**2 + d[0] * utt
+        ytt = dd[1] * ut**2 + d[1] * utt
+        angular_velocity = np.where(
+            moving, (ytt * xt - xtt * yt) / safe_v**2, 0.)
+
+        return np.stack([pos[0], pos[1], np.arctan2(d[1], d[0]),
+                         linear_velocity, angular_velocity])
+
 
 def test1(max_vel=0.5):
 
@@ -47,6 +47,7 @@ TARGET_SPEED = 30.0 / 3.6  # target speed [m/s]
 D_T_S = 5.0 / 3.6  # target speed sampling length [m/s]
 N_S_SAMPLE = 1  # sampling number of target speed
 ROBOT_RADIUS = 2.0  # robot radius [m]
+BATCH_CHUNK_SIZE = 16  # candidates checked at once in cost order
 
 # cost weights
 K_J = 0.1
@@ -247,6 +248,249 @@ def frenet_optimal_planning(csp, s0, c_speed, c_d, c_d_d, c_d_dd, ob):
     return best_path
 
 
+class FrenetPathBatch:
+    """
+    All candidate frenet paths stored as (candidates x time) arrays
+
+    Rows are ordered like the list of calc_frenet_paths and row i is only
+    valid for the first n_t[i] time samples.
+    """
+
+    def __init__(self):
+        self.t = None
+        self.n_t = None
+        self.d = None
+        self.d_d = None
+        self.d_dd = None
+        self.d_ddd = None
+        self.s = None
+        self.s_d = None
+        self.s_dd = None
+        self.s_ddd = None
+        self.cd = None
+        self.cv = None
+        self.cf = None
+
+    @property
+    def time_mask(self):
+        return np.arange(len(self.t))[np.newaxis, :] < self.n_t[:, np.newaxis]
+
+    def to_frenet_path(self, i):
+        """
+        convert one candidate to a FrenetPath without global positions
+        """
+        fp = FrenetPath()
+        n = self.n_t[i]
+        fp.t = self.t[:n].tolist()
+        fp.d = self.d[i, :n].tolist()
+        fp.d_d = self.d_d[i, :n].tolist()
+        fp.d_dd = self.d_dd[i, :n].tolist()
+        fp.d_ddd = self.d_ddd[i, :n].tolist()
+        fp.s = self.s[i, :n].tolist()
+        fp.s_d = self.s_d[i, :n].tolist()
+        fp.s_dd = self.s_dd[i, :n].tolist()
+        fp.s_ddd = self.s_ddd[i, :n].tolist()
+        fp.cd = float(self.cd[i])
+        fp.cv = float(self.cv[i])
+        fp.cf = float(self.cf[i])
+        return fp
+
+
+def calc_polynomial_batch(coefficients, t):
+    """
+    evaluate polynomials and their first three derivatives
+
+    coefficients: (..., order + 1) array, lowest order first
+    t: (K,) time array
+    returns: 4 arrays of shape (..., K)
+    """
+    n = coefficients.shape[-1]
+    results = []
+    for derivative in range(4):
+        value = np.zeros(coefficients.shape[:-1] + t.shape)
+        for k in range(derivative, n):
+            factor = math.factorial(k) / math.factorial(k - derivative)
+            value += factor * coefficients[..., k, np.newaxis] \
+                * t ** (k - derivative)
+        results.append(value)
+    return results
+
+
+def calc_frenet_paths_batch(c_speed, c_d, c_d_d, c_d_dd, s0):
+    """
+    batched version of calc_frenet_paths
+
+    returns: FrenetPathBatch
+    """
+    d_targets = np.arange(-MAX_ROAD_WIDTH, MAX_ROAD_WIDTH, D_ROAD_W)
+    t_targets = np.arange(MIN_T, MAX_T, DT)
+    v_targets = np.arange(TARGET_SPEED - D_T_S * N_S_SAMPLE,
+                          TARGET_SPEED + D_T_S * N_S_SAMPLE, D_T_S)
+    n_d, n_t, n_v = len(d_targets), len(t_targets), len(v_targets)
+    T = t_targets
+
+    # Lateral motion planning: quintic polynomials for every (di, Ti)
+    a0, a1, a2 = c_d, c_d_d, c_d_dd / 2.0
+    A = np.stack([np.stack([T ** 3, T ** 4, T ** 5], axis=-1),
+                  np.stack([3 * T ** 2, 4 * T ** 3, 5 * T ** 4], axis=-1),
+                  np.stack([6 * T, 12 * T ** 2, 20 * T ** 3], axis=-1)],
+                 axis=-2)
+    b = np.stack(np.broadcast_arrays(
+        d_targets[:, np.newaxis] - a0 - a1 * T - a2 * T ** 2,
+        - a1 - 2 * a2 * T,
+        np.full(n_t, - 2 * a2)), axis=-1)
+    x = np.linalg.solve(A, b[..., np.newaxis])[..., 0]
+    lat_coefficients = np.concatenate(
+        [np.broadcast_to([a0, a1, a2], (n_d, n_t, 3)), x], axis=-1)
+
+    # Longitudinal motion planning (Velocity keeping): quartic polynomials
+    # for every (Ti, tv)
+    a0, a1, a2 = s0, c_speed, 0.0
+    A = np.stack([np.stack([3 * T ** 2, 4 * T ** 3], axis=-1),
+                  np.stack([6 * T, 12 * T ** 2], axis=-1)], axis=-2)
+    b = np.stack(np.broadcast_arrays(
+        v_targets - a1 - 2 * a2 * T[:, np.newaxis],
+        np.full((n_t, n_v), - 2 * a2)), axis=-1)
+    x = np.linalg.solve(A[:, np.newaxis], b[..., np.newaxis])[..., 0]
+    lon_coefficients = np.concatenate(
+        [np.broadcast_to([a0, a1, a2], (n_t, n_v, 3)), x], axis=-1)
+
+    fpb = FrenetPathBatch()
+    fpb.t = np.arange(0.0, T[-1], DT)
+    n_samples = np.array([len(np.arange(0.0, Ti, DT)) for Ti in T])
+
+    shape = (n_d, n_t, n_v, len(fpb.t))
+    lat = [np.broadcast_to(v[:, :, np.newaxis], shape).reshape(-1, shape[-1])
+           for v in calc_polynomial_batch(lat_coefficients, fpb.t)]
+    lon = [np.broadcast_to(v[np.newaxis], shape).reshape(-1, shape[-1])
+           for v in calc_polynomial_batch(lon_coefficients, fpb.t)]
+    fpb.d, fpb.d_d, fpb.d_dd, fpb.d_ddd = lat
+    fpb.s, fpb.s_d, fpb.s_dd, fpb.s_ddd = lon
+    fpb.n_t = np.broadcast_to(n_samples[np.newaxis, :, np.newaxis],
+                              shape[:-1]).ravel()
+    Ti = np.broadcast_to(T[np.newaxis, :, np.newaxis], shape[:-1]).ravel()
+
+    mask = fpb.time_mask
+    last = fpb.n_t - 1
+    rows = np.arange(len(last))
+    Jp = np.sum(np.where(mask, fpb.d_ddd ** 2, 0.0), axis=1)  # square of jerk
+    Js = np.sum(np.where(mask, fpb.s_ddd ** 2, 0.0), axis=1)  # square of jerk
+
+    # square of diff from target speed
+    ds = (TARGET_SPEED - fpb.s_d[rows, last]) ** 2
+
+    fpb.cd = K_J * Jp + K_T * Ti + K_D * fpb.d[rows, last] ** 2
+    fpb.cv = K_J * Js + K_T * Ti + K_D * ds
+    fpb.cf = K_LAT * fpb.cd + K_LON * fpb.cv
+
+    return fpb
+
+
+def calc_global_paths_batch(fpb, csp, ind):
+    """
+    batched version of calc_global_paths for the candidates in ind
+
+    returns: x, y, yaw, ds, c arrays and the number of global points
+        of each candidate. Like calc_global_paths, a path is cut at the
+        first point beyond the course.
+    """
+    s, d = fpb.s[ind], fpb.d[ind]
+    valid = fpb.time_mask[ind] & (s >= csp.s[0]) & (s <= csp.s[-1])
+    valid = np.logical_and.accumulate(valid, axis=1)
+    n_xy = np.count_nonzero(valid, axis=1)
+
+    s = np.clip(s, csp.s[0], csp.s[-1])
+    ix, iy = csp.calc_position(s)
+    i_yaw = csp.calc_yaw(s)
+    x = ix + d * np.cos(i_yaw + math.pi / 2.0)
+    y = iy + d * np.sin(i_yaw + math.pi / 2.0)
+
+    # calc yaw and ds, last values are repeated like calc_global_paths
+    dx, dy = np.diff(x, axis=1), np.diff(y, axis=1)
+    yaw = np.arctan2(dy, dx)
+    ds = np.hypot(dx, dy)
+    last = np.maximum(n_xy - 2, 0)[:, np.newaxis]
+    seg = np.arange(x.shape[1])[np.newaxis, :]
+    seg = np.minimum(seg, last)
+    yaw = np.take_along_axis(yaw, seg, axis=1)
+    ds = np.take_along_axis(ds, seg, axis=1)
+
+    # calc curvature
+    with np.errstate(divide="ignore", invalid="ignore"):
+        c = np.diff(yaw, axis=1) / ds[:, :-1]
+
+    return x, y, yaw, ds, c, n_xy
+
+
+def check_paths_batch(fpb, csp, ob, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    batched version of check_paths
+
+    Speed and acceleration are checked for all candidates at once. The
+    remaining candidates are projected to global coordinates and checked
+    for curvature and collision in chunks in ascending cost order, so the
+    search stops with the first chunk containing a feasible path.
+
+    returns: index of the best feasible candidate and its global arrays
+        (x, y, yaw, ds, c, n_xy), or None if there is no feasible candidate
+    """
+    mask = fpb.time_mask
+    ok = ~np.any(mask & (fpb.s_d > MAX_SPEED), axis=1)  # Max speed check
+    ok &= ~np.any(mask & (np.abs(fpb.s_dd) > MAX_ACCEL),
+                  axis=1)  # Max accel check
+
+    candidates = np.flatnonzero(ok)
+    # ascending cost, later candidates first on ties like
+    # frenet_optimal_planning
+    candidates = candidates[np.lexsort((-candidates, fpb.cf[candidates]))]
+
+    for start in range(0, len(candidates), chunk_size):
+        ind = candidates[start:start + chunk_size]
+        x, y, yaw, ds, c, n_xy = calc_global_paths_batch(fpb, csp, ind)
+
+        ok = n_xy >= 2
+        # Max curvature check, the last curvature of a path is always zero
+        c_mask = np.arange(c.shape[1])[np.newaxis, :] < \
+            (n_xy - 2)[:, np.newaxis]
+        ok &= ~np.any(c_mask & ~(np.abs(c) <= MAX_CURVATURE), axis=1)
+
+        # collision check
+        xy_mask = np.arange(x.shape[1])[np.newaxis, :] < n_xy[:, np.newaxis]
+        d2 = (x[:, :, np.newaxis] - ob[np.newaxis, np.newaxis, :, 0]) ** 2 + \
+            (y[:, :, np.newaxis] - ob[np.newaxis, np.newaxis, :, 1]) ** 2
+        ok &= ~np.any(xy_mask[:, :, np.newaxis] & (d2 <= ROBOT_RADIUS ** 2),
+                      axis=(1, 2))
+
+        if np.any(ok):
+            j = np.argmax(ok)
+            return ind[j], (x[j], y[j], yaw[j], ds[j], c[j], n_xy[j])
+
+    return None
+
+
+def frenet_optimal_planning_batch(csp, s0, c_speed, c_d, c_d_d, c_d_dd, ob,
+                                  chunk_size=BATCH_CHUNK_SIZE):
+    """
+    batched version of frenet_optimal_planning
+
+    returns: best FrenetPath or None
+    """
+    fpb = calc_frenet_paths_batch(c_speed, c_d, c_d_d, c_d_dd, s0)
+    result = check_paths_batch(fpb, csp, ob, chunk_size)
+    if result is None:
+        return None
+
+    i, (x, y, yaw, ds, c, n_xy) = result
+    best_path = fpb.to_frenet_path(i)
+    best_path.x = x[:n_xy].tolist()
+    best_path.y = y[:n_xy].tolist()
+    best_path.yaw = yaw[:n_xy].tolist()
+    best_path.ds = ds[:n_xy].tolist()
+    best_path.c = c[:n_xy - 1].tolist()
+
+    return best_path
+
+
 def generate_target_course(x, y):
     csp = cubic_spline_planner.Spline2D(x, y)
     s = np.arange(0, csp.s[-1], 0.1)
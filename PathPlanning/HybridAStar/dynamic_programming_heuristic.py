@@ -8,10 +8,17 @@ See Wikipedia article (https://en.wikipedia.org/wiki/A*_search_algorithm)
 
 """
 
+import hashlib
 import heapq
 import math
+import os
+from collections import OrderedDict
 
 import matplotlib.pyplot as plt
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
 
 show_animation = False
 
@@ -117,6 +124,139 @@ def calc_distance_heuristic(gx, gy, ox, oy, resolution, rr):
     return closed_set
 
 
+def calc_distance_heuristic_map(gx, gy, ox, oy, resolution, rr):
+    """
+    Array based version of calc_distance_heuristic
+
+    The grid is converted to a sparse 8-connected graph and solved with
+    scipy's compiled Dijkstra instead of expanding Node objects one by one.
+
+    gx: goal x position [m]
+    gy: goal y position [m]
+    ox: x position list of Obstacles [m]
+    oy: y position list of Obstacles [m]
+    resolution: grid resolution [m]
+    rr: robot radius[m]
+
+    returns: cost map indexed by [x - min_x, y - min_y] (np.inf where the
+        cell is not reachable from the goal), min_x, min_y
+    """
+    ox = np.asarray(ox, dtype=float) / resolution
+    oy = np.asarray(oy, dtype=float) / resolution
+
+    obstacle_map, min_x, min_y, _, _, x_w, y_w = calc_obstacle_map_array(
+        ox, oy, resolution, rr)
+
+    cost_map = np.full((x_w, y_w), np.inf)
+    goal_ix = round(gx / resolution) - min_x
+    goal_iy = round(gy / resolution) - min_y
+    if not (0 <= goal_ix < x_w and 0 <= goal_iy < y_w):
+        return cost_map, min_x, min_y
+
+    # the goal cell itself is expanded even if it is inside an obstacle
+    expandable = ~obstacle_map
+    expandable[goal_ix, goal_iy] = True
+
+    ix, iy = np.meshgrid(np.arange(x_w), np.arange(y_w), indexing="ij")
+    ix, iy = ix.ravel(), iy.ravel()
+    src_ok = expandable.ravel()
+
+    src, dst, weight = [], [], []
+    for dx, dy, cost in get_motion_model():
+        nx, ny = ix + dx, iy + dy
+        ok = src_ok & (nx >= 0) & (ny >= 0) & (nx < x_w) & (ny < y_w)
+        ok[ok] = ~obstacle_map[nx[ok], ny[ok]]
+        src.append(ix[ok] * y_w + iy[ok])
+        dst.append(nx[ok] * y_w + ny[ok])
+        weight.append(np.full(np.count_nonzero(ok), cost))
+
+    n_cells = x_w * y_w
+    graph = csr_matrix((np.concatenate(weight),
+                        (np.concatenate(src), np.concatenate(dst))),
+                       shape=(n_cells, n_cells))
+    cost_map = dijkstra(graph, directed=True,
+                        indices=goal_ix * y_w + goal_iy).reshape(x_w, y_w)
+
+    return cost_map, min_x, min_y
+
+
+class HeuristicCache:
+    """
+    Content addressed cache of holonomic heuristic maps
+
+    Maps are keyed by a hash of (obstacles, goal, resolution, robot radius).
+    Recently used maps are kept in an in-memory LRU, and if cache_dir is
+    given every map is also stored there as a .npy file which is
+    memory-mapped when it is loaded again.
+    """
+
+    def __init__(self, max_size=8, cache_dir=None):
+        """
+        max_size: number of maps kept in memory
+        cache_dir: directory for .npy files, None for memory only cache
+        """
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self._maps = OrderedDict()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def calc_key(gx, gy, ox, oy, resolution, rr):
+        h = hashlib.sha1()
+        h.update(np.asarray(ox, dtype=np.float64).tobytes())
+        h.update(np.asarray(oy, dtype=np.float64).tobytes())
+        h.update(np.array([gx, gy, resolution, rr],
+                          dtype=np.float64).tobytes())
+        return h.hexdigest()
+
+    def get(self, gx, gy, ox, oy, resolution, rr):
+        """
+        returns: cost map, min_x, min_y (see calc_distance_heuristic_map)
+        """
+        min_x = round(min(ox) / resolution)
+        min_y = round(min(oy) / resolution)
+
+        key = self.calc_key(gx, gy, ox, oy, resolution, rr)
+        if key in self._maps:
+            self._maps.move_to_end(key)
+            return self._maps[key], min_x, min_y
+
+        cost_map = self._load(key)
+        if cost_map is None:
+            cost_map, min_x, min_y = calc_distance_heuristic_map(
+                gx, gy, ox, oy, resolution, rr)
+            self._save(key, cost_map)
+
+        self._maps[key] = cost_map
+        if len(self._maps) > self.max_size:
+            self._maps.popitem(last=False)
+
+        return cost_map, min_x, min_y
+
+    def clear(self):
+        self._maps.clear()
+
+    def _calc_path(self, key):
+        return os.path.join(self.cache_dir, key + ".npy")
+
+    def _load(self, key):
+        if self.cache_dir is None:
+            return None
+        path = self._calc_path(key)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode="r")
+
+    def _save(self, key, cost_map):
+        if self.cache_dir is None:
+            return
+        path = self._calc_path(key)
+        tmp_path = path + ".tmp.npy"
+        np.save(tmp_path, cost_map)
+        os.replace(tmp_path, path)  # atomic, so readers never see half files
+
+
 def verify_node(node, obstacle_map, min_x, min_y, max_x, max_y):
     if node.x < min_x:
         return False
@@ -158,6 +298,28 @@ def calc_obstacle_map(ox, oy, resolution, vr):
     return obstacle_map, min_x, min_y, max_x, max_y, x_width, y_width
 
 
+def calc_obstacle_map_array(ox, oy, resolution, vr):
+    """
+    Same as calc_obstacle_map, but returns a bool np.ndarray and uses a
+    KD-tree instead of checking every obstacle for every cell.
+    """
+    min_x = round(min(ox))
+    min_y = round(min(oy))
+    max_x = round(max(ox))
+    max_y = round(max(oy))
+
+    x_width = round(max_x - min_x)
+    y_width = round(max_y - min_y)
+
+    x, y = np.meshgrid(np.arange(x_width) + min_x,
+                       np.arange(y_width) + min_y, indexing="ij")
+    tree = cKDTree(np.vstack((ox, oy)).T)
+    d, _ = tree.query(np.vstack((x.ravel(), y.ravel())).T)
+    obstacle_map = (d <= vr / resolution).reshape(x_width, y_width)
+
+    return obstacle_map, min_x, min_y, max_x, max_y, x_width, y_width
+
+
 def calc_index(node, x_width, x_min, y_min):
     return (node.y - y_min) * x_width + (node.x - x_min)
 
@@ -18,7 +18,7 @@ from scipy.spatial import cKDTree
 sys.path.append(os.path.dirname(os.path.abspath(__file__))
                 + "/../ReedsSheppPath")
 try:
-    from dynamic_programming_heuristic import calc_distance_heuristic
+    from dynamic_programming_heuristic import HeuristicCache
     import reeds_shepp_path_planning as rs
     from car import move, check_car_collision, MAX_STEER, WB, plot_car
 except Exception:
@@ -38,6 +38,9 @@ H_COST = 5.0  # Heuristic cost
 
 show_animation = True
 
+# holonomic heuristic maps, reused when replanning to the same goal
+heuristic_cache = HeuristicCache()
+
 
 class Node:
 
@@ -274,7 +277,7 @@ def hybrid_a_star_planning(start, goal, ox, oy, xy_resolution, yaw_resolution):
 
     openList, closedList = {}, {}
 
-    h_dp = calc_distance_heuristic(
+    h_dp = heuristic_cache.get(
         goal_node.x_list[-1], goal_node.y_list[-1],
         ox, oy, xy_resolution, VR)
 
@@ -329,10 +332,12 @@ def hybrid_a_star_planning(start, goal, ox, oy, xy_resolution, yaw_resolution):
 
 
 def calc_cost(n, h_dp, c):
-    ind = (n.y_index - c.min_y) * c.x_w + (n.x_index - c.min_x)
-    if ind not in h_dp:
+    cost_map, min_x, min_y = h_dp
+    ix, iy = n.x_index - min_x, n.y_index - min_y
+    if not (0 <= ix < cost_map.shape[0] and 0 <= iy < cost_map.shape[1]) \
+            or math.isinf(cost_map[ix, iy]):
         return n.cost + 999999999  # collision cost
-    return n.cost + H_COST * h_dp[ind].cost
+    return n.cost + H_COST * cost_map[ix, iy]
 
 
 def get_final_path(closed, goal_node):
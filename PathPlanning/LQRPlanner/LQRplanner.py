@@ -24,6 +24,7 @@ class LQRPlanner:
         self.GOAL_DIST = 0.1
         self.MAX_ITER = 150
         self.EPS = 0.01
+        self.gain_cache = {}  # LQR gains per system model
 
     def lqr_planning(self, sx, sy, gx, gy, show_animation=True):
 
@@ -69,6 +70,55 @@ class LQRPlanner:
 
         return rx, ry
 
+    def lqr_planning_batch(self, sx, sy, gx, gy):
+        """
+        LQR planning from many start points toward many goal points
+
+        The closed-loop trajectories are rolled out together as (2, N)
+        states, like lqr_planning does for one start and goal.
+
+        sx, sy, gx, gy: (N,) arrays, or scalars broadcast against them
+
+        return
+            rx, ry: (N, max_points) paths padded with nan
+            n_points: (N,) number of path points, 0 if no path was found
+        """
+        sx, sy, gx, gy = np.broadcast_arrays(
+            *[np.atleast_1d(np.asarray(v, dtype=float))
+              for v in (sx, sy, gx, gy)])
+
+        x = np.vstack((sx - gx, sy - gy))  # State vectors
+
+        # Linear system model
+        A, B = self.get_system_model()
+        K = self.calc_lqr_gain(A, B)
+
+        rx, ry = [sx], [sy]
+        n_points = np.zeros(len(sx), dtype=int)
+
+        time = 0.0
+        while time <= self.MAX_TIME:
+            time += self.DT
+
+            u = -K @ x
+
+            x = A @ x + B @ u
+
+            rx.append(x[0] + gx)
+            ry.append(x[1] + gy)
+
+            d = np.sqrt((gx - rx[-1]) ** 2 + (gy - ry[-1]) ** 2)
+            reached = (d <= self.GOAL_DIST) & (n_points == 0)
+            n_points[reached] = len(rx)
+            if np.all(n_points > 0):
+                break
+
+        rx, ry = np.array(rx).T, np.array(ry).T
+        valid = np.arange(rx.shape[1]) < n_points[:, np.newaxis]
+
+        return np.where(valid, rx, np.nan), np.where(valid, ry, np.nan), \
+            n_points
+
     def solve_dare(self, A, B, Q, R):
         """
         solve a discrete time_Algebraic Riccati equation (DARE)
@@ -109,9 +159,20 @@ class LQRPlanner:
 
         return A, B
 
+    def calc_lqr_gain(self, A, B):
+        """
+        LQR gain of the system model, solved once per model
+        """
+        key = (A.tobytes(), B.tobytes(), self.MAX_ITER, self.EPS)
+        if key not in self.gain_cache:
+            Kopt, X, ev = self.dlqr(A, B, np.eye(2), np.eye(1))
+            self.gain_cache[key] = Kopt
+
+        return self.gain_cache[key]
+
     def lqr_control(self, A, B, x):
 
-        Kopt, X, ev = self.dlqr(A, B, np.eye(2), np.eye(1))
+        Kopt = self.calc_lqr_gain(A, B)
 
         u = -Kopt @ x
 
@@ -185,25 +185,119 @@ class LQRRRTStar(RRTStar):
 
         return px, py, clen
 
+    def sample_path_batch(self, rx, ry, n_points, step):
+        """
+        sample_path for padded paths from LQRPlanner.lqr_planning_batch
+
+        return
+            px, py: (N, max_samples) sampled paths padded with nan
+            n_samples: (N,) number of samples of each path
+            course_lengths: (N,) total length of each sampled path
+        """
+        t = np.arange(0.0, 1.0, step)
+
+        # (paths, segments, t)
+        px = (t * rx[:, 1:, np.newaxis]
+              + (1.0 - t) * rx[:, :-1, np.newaxis]).reshape(len(rx), -1)
+        py = (t * ry[:, 1:, np.newaxis]
+              + (1.0 - t) * ry[:, :-1, np.newaxis]).reshape(len(ry), -1)
+        n_samples = np.maximum(n_points - 1, 0) * len(t)
+
+        valid = np.arange(px.shape[1]) < n_samples[:, np.newaxis]
+        px = np.where(valid, px, np.nan)
+        py = np.where(valid, py, np.nan)
+
+        clen = np.hypot(np.diff(px, axis=1), np.diff(py, axis=1))
+        course_lengths = np.sum(np.where(valid[:, 1:], clen, 0.0), axis=1)
+
+        return px, py, n_samples, course_lengths
+
+    def steer_batch(self, from_nodes, to_nodes):
+        """
+        steer from each of from_nodes to the paired to_nodes with one batched
+        LQR rollout
+
+        return
+            list of new nodes, None where no path was found
+        """
+        rx, ry, n_points = self.lqr_planner.lqr_planning_batch(
+            [n.x for n in from_nodes], [n.y for n in from_nodes],
+            [n.x for n in to_nodes], [n.y for n in to_nodes])
+
+        px, py, n_samples, course_lens = self.sample_path_batch(
+            rx, ry, n_points, self.step_size)
+
+        new_nodes = []
+        for i, from_node in enumerate(from_nodes):
+            if n_samples[i] == 0:
+                new_nodes.append(None)
+                continue
+
+            newNode = copy.copy(from_node)
+            newNode.path_x = px[i, :n_samples[i]].tolist()
+            newNode.path_y = py[i, :n_samples[i]].tolist()
+            newNode.x = newNode.path_x[-1]
+            newNode.y = newNode.path_y[-1]
+            newNode.cost += course_lens[i]
+            newNode.parent = from_node
+            new_nodes.append(newNode)
+
+        return new_nodes
+
     def steer(self, from_node, to_node):
 
-        wx, wy = self.lqr_planner.lqr_planning(
-            from_node.x, from_node.y, to_node.x, to_node.y, show_animation=False)
+        return self.steer_batch([from_node], [to_node])[0]
+
+    def choose_parent(self, new_node, near_inds):
+        """
+        choose the cheapest parent for new_node, steering from all the near
+        nodes in one batch
+        """
+        if not near_inds:
+            return None
+
+        near_nodes = [self.node_list[i] for i in near_inds]
+        t_nodes = self.steer_batch(near_nodes, [new_node] * len(near_nodes))
 
-        px, py, course_lens = self.sample_path(wx, wy, self.step_size)
+        # search nearest cost in near_inds
+        costs = []
+        for t_node in t_nodes:
+            if t_node and self.check_collision(t_node, self.obstacle_list):
+                costs.append(t_node.cost)
+            else:
+                costs.append(float("inf"))  # the cost of collision node
+        min_cost = min(costs)
 
-        if px is None:
+        if min_cost == float("inf"):
+            print("There is no good path.(min_cost is inf)")
             return None
 
-        newNode = copy.deepcopy(from_node)
-        newNode.x = px[-1]
-        newNode.y = py[-1]
-        newNode.path_x = px
-        newNode.path_y = py
-        newNode.cost += sum([abs(c) for c in course_lens])
-        newNode.parent = from_node
+        return t_nodes[costs.index(min_cost)]
 
-        return newNode
+    def rewire(self, new_node, near_inds):
+        """
+        rewire the near nodes through new_node, steering to all of them in
+        one batch
+        """
+        near_nodes = [self.node_list[i] for i in near_inds]
+        edge_nodes = self.steer_batch([new_node] * len(near_nodes),
+                                      near_nodes)
+
+        for near_node, edge_node in zip(near_nodes, edge_nodes):
+            if not edge_node:
+                continue
+
+            no_collision = self.check_collision(edge_node, self.obstacle_list)
+            improved_cost = near_node.cost > edge_node.cost
+
+            if no_collision and improved_cost:
+                near_node.x = edge_node.x
+                near_node.y = edge_node.y
+                near_node.cost = edge_node.cost
+                near_node.path_x = edge_node.path_x
+                near_node.path_y = edge_node.path_y
+                near_node.parent = edge_node.parent
+                self.propagate_cost_to_leaves(new_node)
 
 
 def main(maxIter=200):
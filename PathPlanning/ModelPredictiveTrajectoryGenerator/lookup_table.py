@@ -0,0 +1,103 @@
+"""
+
+Indexed lookup table for the model predictive trajectory generator
+
+Each row of the table is [x, y, yaw, s, km, kf]: a terminal state and the
+trajectory parameters which reach it. The rows are indexed with a KD-tree in
+(x, y, yaw) space, and the table is stored as a binary .npy file which is
+memory-mapped when it is loaded.
+
+"""
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+COLUMNS = ["x", "y", "yaw", "s", "km", "kf"]
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "lookup_table")
+
+
+class LookupTable:
+
+    def __init__(self, table):
+        """
+        :param table: (n, 6) array of [x, y, yaw, s, km, kf] rows
+        """
+        self.table = np.asarray(table, dtype=float).reshape(-1, len(COLUMNS))
+        self.kd_tree = cKDTree(self.table[:, 0:3])
+
+    def __len__(self):
+        return len(self.table)
+
+    def search_nearest(self, states):
+        """
+        search the nearest rows in (x, y, yaw) space
+
+        :param states: (3,) state or (n, 3) array of states [x, y, yaw]
+        :return: (6,) row or (n, 6) array of rows
+        """
+        _, ind = self.kd_tree.query(np.asarray(states, dtype=float)[..., 0:3])
+        return self.table[ind]
+
+    def save(self, path):
+        """
+        save the table as a binary .npy file
+        """
+        tmp_path = path + ".tmp.npy"
+        np.save(tmp_path, self.table)
+        os.replace(tmp_path, path)  # atomic, so readers never see half files
+
+    def save_csv(self, path):
+        pd.DataFrame(self.table, columns=COLUMNS).to_csv(path, index=None)
+
+    @classmethod
+    def load(cls, path):
+        """
+        load a binary .npy table memory-mapped
+        """
+        return cls(np.load(path, mmap_mode="r"))
+
+    @classmethod
+    def load_csv(cls, path):
+        return cls(pd.read_csv(path)[COLUMNS].to_numpy())
+
+
+def calc_binary_path(csv_path, cache_dir=CACHE_DIR):
+    key = hashlib.sha1(os.path.abspath(csv_path).encode()).hexdigest()
+    return os.path.join(cache_dir, key + ".npy")
+
+
+def load_lookup_table(csv_path, cache_dir=CACHE_DIR):
+    """
+    load a csv lookup table once
+
+    The table is converted to the binary format in cache_dir on the first
+    load, and later loads in the same process share one indexed table.
+
+    :param cache_dir: directory of the binary tables, None to not save
+    """
+    return _load_lookup_table(csv_path, os.path.getmtime(csv_path),
+                              cache_dir)
+
+
+@lru_cache(maxsize=8)
+def _load_lookup_table(csv_path, csv_mtime, cache_dir):
+    if cache_dir is None:
+        return LookupTable.load_csv(csv_path)
+
+    binary_path = calc_binary_path(csv_path, cache_dir)
+    if os.path.exists(binary_path) \
+            and os.path.getmtime(binary_path) >= csv_mtime:
+        return LookupTable.load(binary_path)
+
+    lookup_table = LookupTable.load_csv(csv_path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        lookup_table.save(binary_path)
+    except OSError:
+        pass  # read only cache, keep the table in memory
+    return lookup_table
@@ -5,12 +5,16 @@ Lookup Table generation for model predictive trajectory generator
 author: Atsushi Sakai
 
 """
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from matplotlib import pyplot as plt
 import numpy as np
 import math
 import model_predictive_trajectory_generator as planner
 import motion_model
 import pandas as pd
+from lookup_table import LookupTable
 
 
 def calc_states_list():
@@ -85,7 +89,8 @@ def generate_lookup_table():
         if x is not None:
             print("find good path")
             lookuptable.append(
-                [x[-1], y[-1], yaw[-1], float(p[0]), float(p[1]), float(p[2])])
+                [x[-1], y[-1], yaw[-1],
+                 float(p[0, 0]), float(p[1, 0]), float(p[2, 0])])
 
     print("finish lookup table generation")
 
@@ -106,6 +111,100 @@ def generate_lookup_table():
     print("Done")
 
 
+def _init_worker(wheelbase):
+    motion_model.L = wheelbase
+    planner.show_animation = False
+
+
+def _solve_state(args):
+    state, init_p, k0 = args
+    target = motion_model.State(x=state[0], y=state[1], yaw=state[2])
+    x, y, yaw, p = planner.optimize_trajectory(
+        target, k0, np.array(init_p).reshape(3, 1))
+    if x is None:
+        return None
+    return [x[-1], y[-1], yaw[-1],
+            float(p[0, 0]), float(p[1, 0]), float(p[2, 0])]
+
+
+def _save_checkpoint(path, states, done, table):
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, states=states, done=done, table=table)
+    os.replace(tmp_path, path)
+
+
+def generate_lookup_table_parallel(states, output_path, k0=0.0,
+                                   wheelbase=motion_model.L,
+                                   checkpoint_path=None, max_workers=None,
+                                   wave_size=None):
+    """
+    generate a lookup table with a process pool
+
+    States are solved in waves ordered by distance from the origin. Each
+    state is warm-started from the parameters of its nearest already solved
+    neighbor, found with the KD-tree of a LookupTable. After every wave the
+    progress is written to checkpoint_path, and an interrupted run called
+    again with the same states resumes from there.
+
+    :param states: list of target states [x, y, yaw]
+    :param output_path: path of the binary (.npy) lookup table to write
+    :param k0: initial steering
+    :param wheelbase: wheel base of the vehicle [m]
+    :param checkpoint_path: .npz checkpoint file, None for no checkpoints
+    :param max_workers: number of worker processes, None for all cpus
+    :param wave_size: states solved in parallel per wave,
+        default: 4 per worker
+    :return: LookupTable
+    """
+    states = np.array(states, dtype=float).reshape(-1, 3)
+    order = np.argsort(np.hypot(states[:, 0], states[:, 1]), kind="stable")
+
+    # x, y, yaw, s, km, kf
+    table = np.array([[1.0, 0.0, 0.0, 1.0, 0.0, 0.0]])
+    done = np.zeros(len(states), dtype=bool)
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        checkpoint = np.load(checkpoint_path)
+        if not np.array_equal(checkpoint["states"], states):
+            raise ValueError("checkpoint " + checkpoint_path +
+                             " was made for different states")
+        table, done = checkpoint["table"], checkpoint["done"]
+        print("resume from checkpoint:", np.count_nonzero(done), "/",
+              len(states))
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if wave_size is None:
+        wave_size = 4 * max_workers
+
+    todo = order[~done[order]]
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             initializer=_init_worker,
+                             initargs=(wheelbase,)) as executor:
+        for start in range(0, len(todo), wave_size):
+            wave = todo[start:start + wave_size]
+            best = LookupTable(table).search_nearest(states[wave])
+            args = [(states[i], [math.hypot(states[i, 0], states[i, 1]),
+                                 bestp[4], bestp[5]], k0)
+                    for i, bestp in zip(wave, best)]
+
+            rows = [row for row in executor.map(_solve_state, args)
+                    if row is not None]
+            if rows:
+                table = np.vstack((table, rows))
+            done[wave] = True
+
+            if checkpoint_path is not None:
+                _save_checkpoint(checkpoint_path, states, done, table)
+
+    lookup_table = LookupTable(table)
+    lookup_table.save(output_path)
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print("lookup table file is saved as " + output_path)
+
+    return lookup_table
+
+
 def main():
     generate_lookup_table()
 
@@ -39,52 +39,43 @@ def calc_diff(target, x, y, yaw):
     return d
 
 
+def calc_diff_batch(target, x, y, yaw):
+    """
+    calc_diff for arrays of last states
+
+    :return: (3, n) array
+    """
+    return np.array([target.x - x,
+                     target.y - y,
+                     motion_model.pi_2_pi(target.yaw - yaw)])
+
+
 def calc_j(target, p, h, k0):
-    xp, yp, yawp = motion_model.generate_last_state(
-        p[0, 0] + h[0], p[1, 0], p[2, 0], k0)
-    dp = calc_diff(target, [xp], [yp], [yawp])
-    xn, yn, yawn = motion_model.generate_last_state(
-        p[0, 0] - h[0], p[1, 0], p[2, 0], k0)
-    dn = calc_diff(target, [xn], [yn], [yawn])
-    d1 = np.array((dp - dn) / (2.0 * h[0])).reshape(3, 1)
-
-    xp, yp, yawp = motion_model.generate_last_state(
-        p[0, 0], p[1, 0] + h[1], p[2, 0], k0)
-    dp = calc_diff(target, [xp], [yp], [yawp])
-    xn, yn, yawn = motion_model.generate_last_state(
-        p[0, 0], p[1, 0] - h[1], p[2, 0], k0)
-    dn = calc_diff(target, [xn], [yn], [yawn])
-    d2 = np.array((dp - dn) / (2.0 * h[1])).reshape(3, 1)
-
-    xp, yp, yawp = motion_model.generate_last_state(
-        p[0, 0], p[1, 0], p[2, 0] + h[2], k0)
-    dp = calc_diff(target, [xp], [yp], [yawp])
-    xn, yn, yawn = motion_model.generate_last_state(
-        p[0, 0], p[1, 0], p[2, 0] - h[2], k0)
-    dn = calc_diff(target, [xn], [yn], [yawn])
-    d3 = np.array((dp - dn) / (2.0 * h[2])).reshape(3, 1)
-
-    J = np.hstack((d1, d2, d3))
+    # all six perturbed parameter vectors in one batched call
+    dp = np.diag(h)
+    params = p.reshape(1, 3) + np.vstack((dp, -dp))
+    x, y, yaw = motion_model.generate_last_state_batch(
+        params[:, 0], params[:, 1], params[:, 2], k0)
+    d = calc_diff_batch(target, x, y, yaw)
+
+    J = (d[:, 0:3] - d[:, 3:6]) / (2.0 * h)
 
     return J
 
 
 def selection_learning_param(dp, p, k0, target):
-    mincost = float("inf")
     mina = 1.0
     maxa = 2.0
     da = 0.5
 
-    for a in np.arange(mina, maxa, da):
-        tp = p + a * dp
-        xc, yc, yawc = motion_model.generate_last_state(
-            tp[0], tp[1], tp[2], k0)
-        dc = calc_diff(target, [xc], [yc], [yawc])
-        cost = np.linalg.norm(dc)
+    a = np.arange(mina, maxa, da)
+    tp = p.reshape(1, 3) + a[:, np.newaxis] * dp.reshape(1, 3)
+    xc, yc, yawc = motion_model.generate_last_state_batch(
+        tp[:, 0], tp[:, 1], tp[:, 2], k0)
+    cost = np.linalg.norm(calc_diff_batch(target, xc, yc, yawc), axis=0)
 
-        if cost <= mincost and a != 0.0:
-            mina = a
-            mincost = cost
+    # the last one wins on ties
+    mina = a[len(a) - 1 - np.argmin(cost[::-1])]
 
     #  print(mincost, mina)
     #  input()
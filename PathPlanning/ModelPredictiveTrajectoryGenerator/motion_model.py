@@ -1,6 +1,5 @@
 import math
 import numpy as np
-import scipy.interpolate
 
 # motion parameter
 L = 1.0  # wheel base
@@ -32,58 +31,82 @@ def update(state, v, delta, dt, L):
     return state
 
 
+def calc_steer_profile(t, time, k0, km, kf):
+    """
+    steering at times t, the quadratic through (0, k0), (time / 2, km) and
+    (time, kf), which is what a quadratic interp1d of these points gives
+    """
+    tau = t / time
+    return k0 * (2.0 * tau - 1.0) * (tau - 1.0) \
+        + km * 4.0 * tau * (1.0 - tau) \
+        + kf * tau * (2.0 * tau - 1.0)
+
+
+def integrate_states(kp, dt):
+    """
+    integrate the bicycle model over steering arrays with cumulative sums
+
+    :param kp: (..., n) steering array, 0 entries after the end of shorter
+        trajectories leave their states unchanged when masked with dt=0
+    :param dt: scalar or (..., 1) time tick
+    :return: x, y, yaw arrays of shape (..., n + 1), yaw not normalized
+    """
+    shape = kp.shape[:-1] + (kp.shape[-1] + 1,)
+    yaw = np.zeros(shape)
+    yaw[..., 1:] = np.cumsum(v / L * np.tan(kp) * dt, axis=-1)
+    x = np.zeros(shape)
+    x[..., 1:] = np.cumsum(v * np.cos(yaw[..., :-1]) * dt, axis=-1)
+    y = np.zeros(shape)
+    y[..., 1:] = np.cumsum(v * np.sin(yaw[..., :-1]) * dt, axis=-1)
+    return x, y, yaw
+
+
 def generate_trajectory(s, km, kf, k0):
+    # the optimizer passes one element arrays
+    s, km, kf = (np.asarray(p, dtype=float).item() for p in (s, km, kf))
 
     n = s / ds
     time = s / v  # [s]
-    
-    if isinstance(time, type(np.array([]))): time = time[0]
-    if isinstance(km, type(np.array([]))): km = km[0]
-    if isinstance(kf, type(np.array([]))): kf = kf[0]
-    
-    tk = np.array([0.0, time / 2.0, time])
-    kk = np.array([k0, km, kf])
-    t = np.arange(0.0, time, time / n)
-    fkp = scipy.interpolate.interp1d(tk, kk, kind="quadratic")
-    kp = [fkp(ti) for ti in t]
-    dt = float(time / n)
-
-    #  plt.plot(t, kp)
-    #  plt.show()
-
-    state = State()
-    x, y, yaw = [state.x], [state.y], [state.yaw]
-
-    for ikp in kp:
-        state = update(state, v, ikp, dt, L)
-        x.append(state.x)
-        y.append(state.y)
-        yaw.append(state.yaw)
+    dt = time / n
 
-    return x, y, yaw
+    t = np.arange(0.0, time, dt)
+    kp = calc_steer_profile(t, time, k0, km, kf)
+
+    x, y, yaw = integrate_states(kp, dt)
+
+    return x.tolist(), y.tolist(), pi_2_pi(yaw).tolist()
 
 
 def generate_last_state(s, km, kf, k0):
 
+    x, y, yaw = generate_last_state_batch(s, km, kf, k0)
+
+    return x[0], y[0], yaw[0]
+
+
+def generate_last_state_batch(s, km, kf, k0):
+    """
+    generate the last states for arrays of parameters at once
+
+    :return: x, y, yaw arrays
+    """
+    s = np.asarray(s, dtype=float).reshape(-1)
+    km = np.asarray(km, dtype=float).reshape(-1)
+    kf = np.asarray(kf, dtype=float).reshape(-1)
+
     n = s / ds
     time = s / v  # [s]
-    
-    if isinstance(time,  type(np.array([]))): time = time[0]
-    if isinstance(km, type(np.array([]))): km = km[0]
-    if isinstance(kf, type(np.array([]))): kf = kf[0]
-    
-    tk = np.array([0.0, time / 2.0, time])
-    kk = np.array([k0, km, kf])
-    t = np.arange(0.0, time, time / n)
-    fkp = scipy.interpolate.interp1d(tk, kk, kind="quadratic")
-    kp = [fkp(ti) for ti in t]
     dt = time / n
+    # number of samples of np.arange(0.0, time, dt)
+    n_steps = np.ceil(time / dt).astype(int)
 
-    #  plt.plot(t, kp)
-    #  plt.show()
-
-    state = State()
+    i = np.arange(np.max(n_steps))
+    t = i * dt[:, np.newaxis]
+    kp = calc_steer_profile(t, time[:, np.newaxis], k0,
+                            km[:, np.newaxis], kf[:, np.newaxis])
+    # steps beyond the end of a trajectory do not move it
+    step_dt = np.where(i < n_steps[:, np.newaxis], dt[:, np.newaxis], 0.0)
 
-    _ = [update(state, v, ikp, dt, L) for ikp in kp]
+    x, y, yaw = integrate_states(kp, step_dt)
 
-    return state.x, state.y, state.yaw
+    return x[:, -1], y[:, -1], pi_2_pi(yaw[:, -1])
@@ -162,6 +162,139 @@ def quintic_polynomials_planner(sx, sy, syaw, sv, sa, gx, gy, gyaw, gv, ga, max_
     return time, rx, ry, ryaw, rv, ra, rj
 
 
+def calc_quintic_coefficients_batch(xs, vxs, axs, xe, vxe, axe, T):
+    """
+    solve quintic polynomial coefficients for many boundary conditions and
+    horizons in one batched linear solve
+
+    input
+        xs, vxs, axs, xe, vxe, axe: (M,) boundary conditions
+        T: (K,) horizons [s]
+
+    return
+        (M, K, 6) coefficients, lowest order first
+    """
+    xs, vxs, axs, xe, vxe, axe = [np.asarray(v, dtype=float)[:, np.newaxis]
+                                  for v in (xs, vxs, axs, xe, vxe, axe)]
+    a0, a1, a2 = xs, vxs, axs / 2.0
+
+    A = np.stack([np.stack([T ** 3, T ** 4, T ** 5], axis=-1),
+                  np.stack([3 * T ** 2, 4 * T ** 3, 5 * T ** 4], axis=-1),
+                  np.stack([6 * T, 12 * T ** 2, 20 * T ** 3], axis=-1)],
+                 axis=-2)
+    b = np.stack(np.broadcast_arrays(xe - a0 - a1 * T - a2 * T ** 2,
+                                     vxe - a1 - 2 * a2 * T,
+                                     axe - 2 * a2), axis=-1)
+    x = np.linalg.solve(A, b[..., np.newaxis])[..., 0]
+
+    low = np.stack(np.broadcast_arrays(a0, a1, a2, T)[:3], axis=-1)
+
+    return np.concatenate([low, x], axis=-1)
+
+
+def calc_quintic_derivatives_batch(coefficients, t):
+    """
+    evaluate quintic polynomials and their first three derivatives
+
+    input
+        coefficients: (..., 6) coefficients, lowest order first
+        t: times, broadcastable against coefficients[..., 0]
+
+    return
+        list of 4 arrays: position, velocity, acceleration and jerk
+    """
+    c = [coefficients[..., k] for k in range(6)]
+    return [c[0] + c[1] * t + c[2] * t ** 2 + c[3] * t ** 3 + c[4] * t ** 4
+            + c[5] * t ** 5,
+            c[1] + 2 * c[2] * t + 3 * c[3] * t ** 2 + 4 * c[4] * t ** 3
+            + 5 * c[5] * t ** 4,
+            2 * c[2] + 6 * c[3] * t + 12 * c[4] * t ** 2 + 20 * c[5] * t ** 3,
+            6 * c[3] + 24 * c[4] * t + 60 * c[5] * t ** 2]
+
+
+def quintic_polynomials_planner_batch(sx, sy, syaw, sv, sa, gx, gy, gyaw, gv,
+                                      ga, max_accel, max_jerk, dt,
+                                      chunk_size=4):
+    """
+    batched quintic polynomial planner for M start/goal states
+
+    The inputs are like quintic_polynomials_planner, but every state input
+    can be an (M,) array. For each maneuver the first horizon T which
+    satisfies the accel and jerk limits is selected, like
+    quintic_polynomials_planner does. Horizons are checked chunk_size at a
+    time for all maneuvers, and the search stops when every maneuver has
+    found one.
+
+    return
+        time, rx, ry, ryaw, rv, ra, rj: (M, N) arrays padded with nan
+        n_points: (M,) number of valid points of each maneuver
+        found: (M,) True if the path satisfies the limits; otherwise the
+            path of the longest horizon is returned like
+            quintic_polynomials_planner does
+    """
+    sx, sy, syaw, sv, sa, gx, gy, gyaw, gv, ga = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(v, dtype=float))
+          for v in (sx, sy, syaw, sv, sa, gx, gy, gyaw, gv, ga)])
+
+    horizons = np.arange(MIN_T, MAX_T, MIN_T)
+    xc = calc_quintic_coefficients_batch(
+        sx, sv * np.cos(syaw), sa * np.cos(syaw),
+        gx, gv * np.cos(gyaw), ga * np.cos(gyaw), horizons)
+    yc = calc_quintic_coefficients_batch(
+        sy, sv * np.sin(syaw), sa * np.sin(syaw),
+        gy, gv * np.sin(gyaw), ga * np.sin(gyaw), horizons)
+
+    n_samples = np.array([len(np.arange(0.0, T + dt, dt)) for T in horizons])
+
+    n_maneuvers = len(sx)
+    selected = np.full(n_maneuvers, len(horizons) - 1)
+    found = np.zeros(n_maneuvers, dtype=bool)
+    for start in range(0, len(horizons), chunk_size):
+        todo = np.flatnonzero(~found)
+        if len(todo) == 0:
+            break
+        ks = np.arange(start, min(start + chunk_size, len(horizons)))
+        i = np.arange(np.max(n_samples[ks]))
+        t = i * dt
+        valid = i < n_samples[ks][:, np.newaxis]
+
+        # (maneuvers, horizons, time)
+        _, _, ax, jx = calc_quintic_derivatives_batch(
+            xc[todo][:, ks, np.newaxis, :], t)
+        _, _, ay, jy = calc_quintic_derivatives_batch(
+            yc[todo][:, ks, np.newaxis, :], t)
+        a = np.max(np.where(valid, np.hypot(ax, ay), 0.0), axis=-1)
+        j = np.max(np.where(valid, np.hypot(jx, jy), 0.0), axis=-1)
+        ok = (a <= max_accel) & (j <= max_jerk)
+
+        has_ok = np.any(ok, axis=1)
+        selected[todo[has_ok]] = ks[np.argmax(ok[has_ok], axis=1)]
+        found[todo[has_ok]] = True
+
+    n_points = n_samples[selected]
+    i = np.arange(np.max(n_points))
+    valid = i < n_points[:, np.newaxis]
+    time = np.where(valid, i * dt, np.nan)
+
+    rows = np.arange(n_maneuvers)
+    x, vx, ax, jx = calc_quintic_derivatives_batch(
+        xc[rows, selected][:, np.newaxis, :], i * dt)
+    y, vy, ay, jy = calc_quintic_derivatives_batch(
+        yc[rows, selected][:, np.newaxis, :], i * dt)
+
+    rv = np.hypot(vx, vy)
+    ryaw = np.arctan2(vy, vx)
+    # signs like quintic_polynomials_planner: negative while slowing down
+    ra = np.hypot(ax, ay)
+    ra[:, 1:] *= np.where(np.diff(rv, axis=1) < 0.0, -1.0, 1.0)
+    rj = np.hypot(jx, jy)
+    rj[:, 1:] *= np.where(np.diff(ra, axis=1) < 0.0, -1.0, 1.0)
+
+    result = [np.where(valid, v, np.nan) for v in (x, y, ryaw, rv, ra, rj)]
+
+    return [time] + result + [n_points, found]
+
+
 def plot_arrow(x, y, yaw, length=1.0, width=0.5, fc="r", ec="k"):  # pragma: no cover
     """
     Plot arrow
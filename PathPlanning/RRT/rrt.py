@@ -192,13 +192,17 @@ class RRT:
         if node is None:
             return False
 
-        for (ox, oy, size) in obstacleList:
-            dx_list = [ox - x for x in node.path_x]
-            dy_list = [oy - y for y in node.path_y]
-            d_list = [dx * dx + dy * dy for (dx, dy) in zip(dx_list, dy_list)]
+        if len(obstacleList) == 0:
+            return True  # safe
 
-            if min(d_list) <= size**2:
-                return False  # collision
+        # all the path points against all the obstacles at once
+        ob = np.asarray(obstacleList, dtype=float)
+        dx = ob[:, 0:1] - np.asarray(node.path_x, dtype=float)
+        dy = ob[:, 1:2] - np.asarray(node.path_y, dtype=float)
+        d = dx * dx + dy * dy
+
+        if np.any(d <= ob[:, 2:3] ** 2):
+            return False  # collision
 
         return True  # safe
 
@@ -123,26 +123,20 @@ class RRTStar(RRT):
         if not near_inds:
             return None
 
-        # search nearest cost in near_inds
-        costs = []
-        for i in near_inds:
-            near_node = self.node_list[i]
-            t_node = self.steer(near_node, new_node)
+        # search nearest cost in near_inds, the edge geometry is only
+        # generated and checked in cost order until a safe one is found
+        costs = [self.calc_new_cost(self.node_list[i], new_node)
+                 for i in near_inds]
+        for j in sorted(range(len(near_inds)), key=lambda j: costs[j]):
+            if costs[j] == float("inf"):
+                break
+            t_node = self.steer(self.node_list[near_inds[j]], new_node)
             if t_node and self.check_collision(t_node, self.obstacle_list):
-                costs.append(self.calc_new_cost(near_node, new_node))
-            else:
-                costs.append(float("inf"))  # the cost of collision node
-        min_cost = min(costs)
-
-        if min_cost == float("inf"):
-            print("There is no good path.(min_cost is inf)")
-            return None
-
-        min_ind = near_inds[costs.index(min_cost)]
-        new_node = self.steer(self.node_list[min_ind], new_node)
-        new_node.cost = min_cost
+                t_node.cost = costs[j]
+                return t_node
 
-        return new_node
+        print("There is no good path.(min_cost is inf)")
+        return None
 
     def search_best_goal_node(self):
         dist_to_goal_list = [
@@ -214,15 +208,17 @@ class RRTStar(RRT):
         """
         for i in near_inds:
             near_node = self.node_list[i]
+            # the edge geometry is only needed if the cost improves
+            cost = self.calc_new_cost(new_node, near_node)
+            if not near_node.cost > cost:
+                continue
+
             edge_node = self.steer(new_node, near_node)
             if not edge_node:
                 continue
-            edge_node.cost = self.calc_new_cost(new_node, near_node)
-
-            no_collision = self.check_collision(edge_node, self.obstacle_list)
-            improved_cost = near_node.cost > edge_node.cost
+            edge_node.cost = cost
 
-            if no_collision and improved_cost:
+            if self.check_collision(edge_node, self.obstacle_list):
                 near_node.x = edge_node.x
                 near_node.y = edge_node.y
                 near_node.cost = edge_node.cost
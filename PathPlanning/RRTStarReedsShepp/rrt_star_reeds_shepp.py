@@ -68,6 +68,9 @@ class RRTStarReedsShepp(RRTStar):
         self.goal_yaw_th = np.deg2rad(1.0)
         self.goal_xy_th = 0.5
 
+        # edge costs of the current iteration, keyed on the node poses
+        self.edge_cost_cache = {}
+
     def planning(self, animation=True, search_until_max_iter=True):
         """
         planning
@@ -78,6 +81,7 @@ class RRTStarReedsShepp(RRTStar):
         self.node_list = [self.start]
         for i in range(self.max_iter):
             print("Iter:", i, ", number of nodes:", len(self.node_list))
+            self.edge_cost_cache.clear()
             rnd = self.get_random_node()
             nearest_ind = self.get_nearest_node_index(self.node_list, rnd)
             new_node = self.steer(self.node_list[nearest_ind], rnd)
@@ -156,7 +160,7 @@ class RRTStarReedsShepp(RRTStar):
         if not px:
             return None
 
-        new_node = copy.deepcopy(from_node)
+        new_node = copy.copy(from_node)
         new_node.x = px[-1]
         new_node.y = py[-1]
         new_node.yaw = pyaw[-1]
@@ -171,13 +175,31 @@ class RRTStarReedsShepp(RRTStar):
 
     def calc_new_cost(self, from_node, to_node):
 
-        _, _, _, _, course_lengths = reeds_shepp_path_planning.reeds_shepp_path_planning(
+        return from_node.cost + self.calc_edge_cost(from_node, to_node)
+
+    def calc_edge_cost(self, from_node, to_node):
+        """
+        length of the Reeds Shepp path between the nodes
+
+        Only the segment lengths are solved, and they are memoized for the
+        current iteration, so the path points are only generated by steer.
+        """
+        key = (from_node.x, from_node.y, from_node.yaw,
+               to_node.x, to_node.y, to_node.yaw)
+        if key in self.edge_cost_cache:
+            return self.edge_cost_cache[key]
+
+        _, course_lengths = reeds_shepp_path_planning.reeds_shepp_path_length(
             from_node.x, from_node.y, from_node.yaw,
             to_node.x, to_node.y, to_node.yaw, self.curvature)
         if not course_lengths:
-            return float("inf")
+            cost = float("inf")
+        else:
+            cost = sum([abs(length) for length in course_lengths])
+
+        self.edge_cost_cache[key] = cost
 
-        return from_node.cost + sum([abs(l) for l in course_lengths])
+        return cost
 
     def get_random_node(self):
 
@@ -303,37 +303,74 @@ def pi_2_pi(angle):
     return (angle + math.pi) % (2 * math.pi) - math.pi
 
 
+def calc_path_course(path, q0, maxc, step_size):
+    """
+    generate the points of a path from generate_path in global coordinate
+    """
+    xs, ys, yaws, directions = generate_local_course(path.lengths,
+                                                     path.ctypes, maxc,
+                                                     step_size * maxc)
+
+    # convert global coordinate
+    path.x = [math.cos(-q0[2]) * ix + math.sin(-q0[2]) * iy + q0[0] for
+              (ix, iy) in zip(xs, ys)]
+    path.y = [-math.sin(-q0[2]) * ix + math.cos(-q0[2]) * iy + q0[1] for
+              (ix, iy) in zip(xs, ys)]
+    path.yaw = [pi_2_pi(yaw + q0[2]) for yaw in yaws]
+    path.directions = directions
+    path.lengths = [length / maxc for length in path.lengths]
+    path.L = path.L / maxc
+
+    return path
+
+
 def calc_paths(sx, sy, syaw, gx, gy, gyaw, maxc, step_size):
     q0 = [sx, sy, syaw]
     q1 = [gx, gy, gyaw]
 
     paths = generate_path(q0, q1, maxc, step_size)
     for path in paths:
-        xs, ys, yaws, directions = generate_local_course(path.lengths,
-                                                         path.ctypes, maxc,
-                                                         step_size * maxc)
-
-        # convert global coordinate
-        path.x = [math.cos(-q0[2]) * ix + math.sin(-q0[2]) * iy + q0[0] for
-                  (ix, iy) in zip(xs, ys)]
-        path.y = [-math.sin(-q0[2]) * ix + math.cos(-q0[2]) * iy + q0[1] for
-                  (ix, iy) in zip(xs, ys)]
-        path.yaw = [pi_2_pi(yaw + q0[2]) for yaw in yaws]
-        path.directions = directions
-        path.lengths = [length / maxc for length in path.lengths]
-        path.L = path.L / maxc
+        calc_path_course(path, q0, maxc, step_size)
 
     return paths
 
 
-def reeds_shepp_path_planning(sx, sy, syaw, gx, gy, gyaw, maxc, step_size=0.2):
-    paths = calc_paths(sx, sy, syaw, gx, gy, gyaw, maxc, step_size)
+def calc_best_path(sx, sy, syaw, gx, gy, gyaw, maxc, step_size):
+    """
+    the minimum length path, without generating its points
+
+    return: Path with lengths and ctypes in the curvature normalized
+        coordinate, or None if no path was found
+    """
+    paths = generate_path([sx, sy, syaw], [gx, gy, gyaw], maxc, step_size)
     if not paths:
+        return None
+
+    return min(paths, key=lambda p: abs(p.L) / maxc)
+
+
+def reeds_shepp_path_length(sx, sy, syaw, gx, gy, gyaw, maxc, step_size=0.2):
+    """
+    segment types and lengths of the minimum length path, without generating
+    its points
+
+    return: ctypes and lengths like reeds_shepp_path_planning, or
+        (None, None) if no path was found
+    """
+    b_path = calc_best_path(sx, sy, syaw, gx, gy, gyaw, maxc, step_size)
+    if b_path is None:
+        return None, None
+
+    return b_path.ctypes, [length / maxc for length in b_path.lengths]
+
+
+def reeds_shepp_path_planning(sx, sy, syaw, gx, gy, gyaw, maxc, step_size=0.2):
+    b_path = calc_best_path(sx, sy, syaw, gx, gy, gyaw, maxc, step_size)
+    if b_path is None:
         return None, None, None, None, None  # could not generate any path
 
-    # search minimum cost path
-    best_path_index = paths.index(min(paths, key=lambda p: abs(p.L)))
-    b_path = paths[best_path_index]
+    # only the minimum cost path is interpolated
+    b_path = calc_path_course(b_path, [sx, sy, syaw], maxc, step_size)
 
     return b_path.x, b_path.y, b_path.yaw, b_path.ctypes, b_path.lengths
 
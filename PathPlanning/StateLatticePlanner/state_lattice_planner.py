@@ -16,7 +16,6 @@ import os
 from matplotlib import pyplot as plt
 import numpy as np
 import math
-import pandas as pd
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__))
                 + "/../ModelPredictiveTrajectoryGenerator/")
@@ -25,6 +24,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__))
 try:
     import model_predictive_trajectory_generator as planner
     import motion_model
+    from lookup_table import load_lookup_table
 except ImportError:
     raise
 
@@ -52,20 +52,19 @@ def search_nearest_one_from_lookuptable(tx, ty, tyaw, lookup_table):
 
 
 def get_lookup_table():
-    data = pd.read_csv(table_path)
-
-    return np.array(data)
+    return load_lookup_table(table_path).table
 
 
 def generate_path(target_states, k0):
     # x, y, yaw, s, km, kf
-    lookup_table = get_lookup_table()
+    lookup_table = load_lookup_table(table_path)
     result = []
 
-    for state in target_states:
-        bestp = search_nearest_one_from_lookuptable(
-            state[0], state[1], state[2], lookup_table)
+    if len(target_states) == 0:
+        return result
+    best_params = lookup_table.search_nearest(np.array(target_states))
 
+    for state, bestp in zip(target_states, best_params):
         target = motion_model.State(x=state[0], y=state[1], yaw=state[2])
         init_p = np.array(
             [math.sqrt(state[0] ** 2 + state[1] ** 2), bestp[4], bestp[5]]).reshape(3, 1)
@@ -75,7 +74,8 @@ def generate_path(target_states, k0):
         if x is not None:
             print("find good path")
             result.append(
-                [x[-1], y[-1], yaw[-1], float(p[0]), float(p[1]), float(p[2])])
+                [x[-1], y[-1], yaw[-1],
+                 float(p[0, 0]), float(p[1, 0]), float(p[2, 0])])
 
     print("finish path generation")
     return result
@@ -10,10 +10,12 @@ control, sliding mode control https://github.com/Shunichi09/nonlinear_control
 
 """
 
-from math import cos, sin, radians, atan2
+from math import cos, sin, radians, atan2, hypot
+from time import perf_counter
 
 import matplotlib.pyplot as plt
 import numpy as np
+import scipy.linalg as scipy_linalg
 
 U_A_MAX = 1.0
 U_OMEGA_MAX = radians(45.0)
@@ -61,6 +63,18 @@ class TwoWheeledSystem:
         self.history_v.append(self.v)
 
 
+def _integrate(initial, increments):
+    """
+    running sums of (K,) initial values and (K, n) increments
+
+    :return: (K, n + 1) array
+    """
+    out = np.empty((increments.shape[0], increments.shape[1] + 1))
+    out[:, 0] = initial
+    out[:, 1:] = increments
+    return np.cumsum(out, axis=1, out=out)
+
+
 class NMPCSimulatorSystem:
 
     def calc_predict_and_adjoint_state(self, x, y, yaw, v, u_1s, u_2s, N, dt):
@@ -107,6 +121,47 @@ class NMPCSimulatorSystem:
 
         return lam_1s, lam_2s, lam_3s, lam_4s
 
+    @staticmethod
+    def calc_predict_and_adjoint_state_batch(x, y, yaw, v, u_1s, u_2s, N, dt):
+        """
+        calc_predict_and_adjoint_state for K initial states and input
+        sequences at once
+
+        Both Euler sweeps are accumulated with cumsum along the horizon, in
+        the same order as the step by step integration.
+
+        :param x, y, yaw, v: (K,) initial states
+        :param u_1s, u_2s: (K, N) inputs
+        :return: (K, N + 1) predicted states and (K, N) adjoint states
+        """
+        sin_u_2 = np.sin(u_2s[:, :N])
+
+        # by using state equation
+        v_s = _integrate(v, dt * u_1s[:, :N])
+        yaw_s = _integrate(yaw, dt * (v_s[:, :-1] / WB * sin_u_2))
+        cos_yaw = np.cos(yaw_s[:, :-1])
+        sin_yaw = np.sin(yaw_s[:, :-1])
+        x_s = _integrate(x, dt * (cos_yaw * v_s[:, :-1]))
+        y_s = _integrate(y, dt * (sin_yaw * v_s[:, :-1]))
+
+        # by using adjoint equation, backward from step N - 1 to 1
+        lam_1 = x_s[:, -1:]
+        lam_2 = y_s[:, -1:]
+        cos_yaw = cos_yaw[:, N - 1:0:-1]
+        sin_yaw = sin_yaw[:, N - 1:0:-1]
+        v_r = v_s[:, N - 1:0:-1]
+        lam_3r = _integrate(yaw_s[:, -1], dt * (
+            - lam_1 * sin_yaw * v_r + lam_2 * cos_yaw * v_r))
+        lam_4r = _integrate(v_s[:, -1], dt * (
+            lam_1 * cos_yaw + lam_2 * sin_yaw
+            + lam_3r[:, :-1] * sin_u_2[:, N - 1:0:-1] / WB))
+
+        lam_1s = np.repeat(lam_1, N, axis=1)
+        lam_2s = np.repeat(lam_2, N, axis=1)
+
+        return x_s, y_s, yaw_s, v_s, lam_1s, lam_2s, lam_3r[:, ::-1], \
+            lam_4r[:, ::-1]
+
     @staticmethod
     def _predict_state_with_oylar(x, y, yaw, v, u_1, u_2, dt):
 
@@ -181,9 +236,17 @@ class NMPCControllerCGMRES:
         time history of actual raw_2
     history_f : list of float
         time history of error of optimal
+    record_history : bool
+        if False, the histories are not recorded and the optimality error
+        after each update is not evaluated
+    batch_jacobian : bool
+        if True, the input perturbations along every input are evaluated in
+        the same batched sweep as F, and cgmres multiplies with this forward
+        difference jacobian instead of evaluating one sweep per Krylov
+        direction
     """
 
-    def __init__(self):
+    def __init__(self, record_history=True, batch_jacobian=False):
         # parameters
         self.zeta = 100.  # stability gain
         self.ht = 0.01  # difference approximation tick
@@ -212,161 +275,156 @@ class NMPCControllerCGMRES:
         self.history_raw_1 = []
         self.history_raw_2 = []
         self.history_f = []
+        self.record_history = record_history
+        self.batch_jacobian = batch_jacobian
+
+        # Krylov basis and triangularized Hessenberg matrix of cgmres
+        self.vs = np.zeros((self.max_iteration, self.max_iteration + 1))
+        self.hs = np.zeros((self.max_iteration, self.max_iteration))
 
     def calc_input(self, x, y, yaw, v, time):
+        """
+        update the estimated optimal inputs with one cgmres step
 
+        The state and input perturbations are evaluated as a batch of
+        prediction and adjoint sweeps; each Krylov direction costs one more
+        sweep unless batch_jacobian is set.
+        """
         # calculating sampling time
         dt = self.tf * (1. - np.exp(-self.alpha * time)) / float(self.N)
 
         # x_dot
-        x_1_dot, x_2_dot, x_3_dot, x_4_dot = differential_model(
-            v, yaw, self.u_1s[0], self.u_2s[0])
-
-        dx_1 = x_1_dot * self.ht
-        dx_2 = x_2_dot * self.ht
-        dx_3 = x_3_dot * self.ht
-        dx_4 = x_4_dot * self.ht
-
-        x_s, y_s, yaw_s, v_s, lam_1s, lam_2s, lam_3s, lam_4s = self.simulator.calc_predict_and_adjoint_state(
-            x + dx_1, y + dx_2, yaw + dx_3, v + dx_4, self.u_1s, self.u_2s,
-            self.N, dt)
-
-        # Fxt:F(U,x+hx˙,t+h)
-        Fxt = self._calc_f(v_s, lam_3s, lam_4s,
-                           self.u_1s, self.u_2s, self.dummy_u_1s,
-                           self.dummy_u_2s,
-                           self.raw_1s, self.raw_2s, self.N)
-
-        # F:F(U,x,t)
-        x_s, y_s, yaw_s, v_s, lam_1s, lam_2s, lam_3s, lam_4s = self.simulator.calc_predict_and_adjoint_state(
-            x, y, yaw, v, self.u_1s, self.u_2s, self.N, dt)
-
-        F = self._calc_f(v_s, lam_3s, lam_4s,
-                         self.u_1s, self.u_2s, self.dummy_u_1s, self.dummy_u_2s,
-                         self.raw_1s, self.raw_2s, self.N)
+        state = np.array([x, y, yaw, v])
+        state_dot = np.array(differential_model(
+            v, yaw, self.u_1s[0], self.u_2s[0]))
+        state_ht = state + state_dot * self.ht
+
+        inputs = (self.u_1s, self.u_2s, self.dummy_u_1s, self.dummy_u_2s,
+                  self.raw_1s, self.raw_2s)
+        us = np.stack(inputs, axis=1).ravel()
+
+        # Fxt:F(U,x+hx˙,t+h), F:F(U,x,t) and Fuxt:F(U+hdU(0),x+hx˙,t+h)
+        states = np.array([state_ht, state, state_ht])
+        inputs_batch = np.array([us, us, us + us * self.ht])
+        if self.batch_jacobian:
+            # F(U+h e_k,x+hx˙,t+h) for every input k
+            states = np.vstack((states, np.tile(state_ht, (len(us), 1))))
+            inputs_batch = np.vstack((
+                inputs_batch, us + np.eye(len(us)) * self.ht))
+        Fs = self._calc_f_batch(states, inputs_batch, dt)
+        Fxt, F, Fuxt = Fs[:3]
+        jacobian = (Fs[3:] - Fxt).T / self.ht if self.batch_jacobian else None
 
         right = -self.zeta * F - ((Fxt - F) / self.ht)
-
-        du_1 = self.u_1s * self.ht
-        du_2 = self.u_2s * self.ht
-        ddummy_u_1 = self.dummy_u_1s * self.ht
-        ddummy_u_2 = self.dummy_u_2s * self.ht
-        draw_1 = self.raw_1s * self.ht
-        draw_2 = self.raw_2s * self.ht
-
-        x_s, y_s, yaw_s, v_s, lam_1s, lam_2s, lam_3s, lam_4s = self.simulator.calc_predict_and_adjoint_state(
-            x + dx_1, y + dx_2, yaw + dx_3, v + dx_4, self.u_1s + du_1,
-            self.u_2s + du_2, self.N, dt)
-
-        # Fuxt:F(U+hdU(0),x+hx˙,t+h)
-        Fuxt = self._calc_f(v_s, lam_3s, lam_4s,
-                            self.u_1s + du_1, self.u_2s + du_2,
-                            self.dummy_u_1s + ddummy_u_1,
-                            self.dummy_u_2s + ddummy_u_2,
-                            self.raw_1s + draw_1, self.raw_2s + draw_2, self.N)
-
         left = ((Fuxt - Fxt) / self.ht)
 
         # calculating cgmres
         r0 = right - left
         r0_norm = np.linalg.norm(r0)
 
-        vs = np.zeros((self.max_iteration, self.max_iteration + 1))
+        vs = self.vs
         vs[:, 0] = r0 / r0_norm
 
-        hs = np.zeros((self.max_iteration + 1, self.max_iteration + 1))
-
-        # in this case the state is 3(u and dummy_u)
-        e = np.zeros((self.max_iteration + 1, 1))
-        e[0] = 1.0
-
-        ys_pre = None
-
-        du_1_new, du_2_new, draw_1_new, draw_2_new = None, None, None, None
-        ddummy_u_1_new, ddummy_u_2_new = None, None
+        # the least squares problem of hs is kept in QR form with Givens
+        # rotations: hs[:i + 1, :i] = Q R, g = Q' r0_norm e
+        hs = self.hs
+        cs = []
+        sn = []
+        g = [r0_norm]
 
         for i in range(self.max_iteration):
-            du_1 = vs[::self.input_num, i] * self.ht
-            du_2 = vs[1::self.input_num, i] * self.ht
-            ddummy_u_1 = vs[2::self.input_num, i] * self.ht
-            ddummy_u_2 = vs[3::self.input_num, i] * self.ht
-            draw_1 = vs[4::self.input_num, i] * self.ht
-            draw_2 = vs[5::self.input_num, i] * self.ht
-
-            x_s, y_s, yaw_s, v_s, lam_1s, lam_2s, lam_3s, lam_4s = self.simulator.calc_predict_and_adjoint_state(
-                x + dx_1, y + dx_2, yaw + dx_3, v + dx_4, self.u_1s + du_1,
-                self.u_2s + du_2, self.N, dt)
-
-            Fuxt = self._calc_f(v_s, lam_3s, lam_4s,
-                                self.u_1s + du_1, self.u_2s + du_2,
-                                self.dummy_u_1s + ddummy_u_1,
-                                self.dummy_u_2s + ddummy_u_2,
-                                self.raw_1s + draw_1, self.raw_2s + draw_2,
-                                self.N)
+            dus = vs[:, i] * self.ht
 
-            Av = ((Fuxt - Fxt) / self.ht)
-
-            sum_Av = np.zeros(self.max_iteration)
+            if jacobian is None:
+                Fuxt = self._calc_f_batch(
+                    state_ht[None], (us + dus)[None], dt)[0]
+                Av = ((Fuxt - Fxt) / self.ht)
+            else:
+                Av = jacobian @ vs[:, i]
 
             # Gram–Schmidt orthonormalization
-            for j in range(i + 1):
-                hs[j, i] = np.dot(Av, vs[:, j])
-                sum_Av = sum_Av + hs[j, i] * vs[:, j]
-
-            v_est = Av - sum_Av
-
-            hs[i + 1, i] = np.linalg.norm(v_est)
-
-            vs[:, i + 1] = v_est / hs[i + 1, i]
-
-            inv_hs = np.linalg.pinv(hs[:i + 1, :i])
-            ys = np.dot(inv_hs, r0_norm * e[:i + 1])
+            h = vs[:, :i + 1].T @ Av
+            v_est = Av - vs[:, :i + 1] @ h
+            h_norm = np.linalg.norm(v_est)
+            vs[:, i + 1] = v_est / h_norm
 
-            judge_value = r0_norm * e[:i + 1] - np.dot(hs[:i + 1, :i], ys[:i])
-
-            flag1 = np.linalg.norm(judge_value) < self.threshold
+            # residual of the least squares solution with i columns
+            flag1 = abs(g[i]) < self.threshold
 
             flag2 = i == self.max_iteration - 1
             if flag1 or flag2:
-                update_val = np.dot(vs[:, :i - 1], ys_pre[:i - 1]).flatten()
-                du_1_new = du_1 + update_val[::self.input_num]
-                du_2_new = du_2 + update_val[1::self.input_num]
-                ddummy_u_1_new = ddummy_u_1 + update_val[2::self.input_num]
-                ddummy_u_2_new = ddummy_u_2 + update_val[3::self.input_num]
-                draw_1_new = draw_1 + update_val[4::self.input_num]
-                draw_2_new = draw_2 + update_val[5::self.input_num]
+                # the solution of the previous iteration with i - 1 columns
+                n = max(i - 1, 0)
+                ys_pre = scipy_linalg.solve_triangular(hs[:n, :n], g[:n])
+                update_val = vs[:, :n] @ ys_pre
+                dus_new = dus + update_val
                 break
 
-            ys_pre = ys
+            h = h.tolist()
+            for j in range(i):
+                h[j], h[j + 1] = cs[j] * h[j] + sn[j] * h[j + 1], \
+                    -sn[j] * h[j] + cs[j] * h[j + 1]
+            r = hypot(h[i], h_norm)
+            cs.append(h[i] / r)
+            sn.append(h_norm / r)
+            h[i] = r
+            hs[:i + 1, i] = h
+            g.append(-sn[i] * g[i])
+            g[i] = cs[i] * g[i]
 
         # update input
-        self.u_1s += du_1_new * self.ht
-        self.u_2s += du_2_new * self.ht
-        self.dummy_u_1s += ddummy_u_1_new * self.ht
-        self.dummy_u_2s += ddummy_u_2_new * self.ht
-        self.raw_1s += draw_1_new * self.ht
-        self.raw_2s += draw_2_new * self.ht
-
-        x_s, y_s, yaw_s, v_s, lam_1s, lam_2s, lam_3s, lam_4s = self.simulator.calc_predict_and_adjoint_state(
-            x, y, yaw, v, self.u_1s, self.u_2s, self.N, dt)
-
-        F = self._calc_f(v_s, lam_3s, lam_4s,
-                         self.u_1s, self.u_2s, self.dummy_u_1s, self.dummy_u_2s,
-                         self.raw_1s, self.raw_2s, self.N)
-
-        print("norm(F) = {0}".format(np.linalg.norm(F)))
-
-        # for save
-        self.history_f.append(np.linalg.norm(F))
-        self.history_u_1.append(self.u_1s[0])
-        self.history_u_2.append(self.u_2s[0])
-        self.history_dummy_u_1.append(self.dummy_u_1s[0])
-        self.history_dummy_u_2.append(self.dummy_u_2s[0])
-        self.history_raw_1.append(self.raw_1s[0])
-        self.history_raw_2.append(self.raw_2s[0])
+        for u, du in zip(inputs, dus_new.reshape(self.N, self.input_num).T):
+            u += du * self.ht
+
+        if self.record_history:
+            F = self._calc_f_batch(
+                state[None], np.stack(inputs, axis=1).ravel()[None], dt)[0]
+
+            print("norm(F) = {0}".format(np.linalg.norm(F)))
+
+            # for save
+            self.history_f.append(np.linalg.norm(F))
+            self.history_u_1.append(self.u_1s[0])
+            self.history_u_2.append(self.u_2s[0])
+            self.history_dummy_u_1.append(self.dummy_u_1s[0])
+            self.history_dummy_u_2.append(self.dummy_u_2s[0])
+            self.history_raw_1.append(self.raw_1s[0])
+            self.history_raw_2.append(self.raw_2s[0])
 
         return self.u_1s, self.u_2s
 
+    def _calc_f_batch(self, states, us, dt):
+        """
+        :param states: (K, 4) initial states [x, y, yaw, v]
+        :param us: (K, N * input_num) inputs, interleaved per step as
+            [u_1, u_2, dummy_u_1, dummy_u_2, raw_1, raw_2]
+        :return: (K, N * input_num) optimality conditions, same layout as us
+        """
+        us = us.reshape(len(us), self.N, self.input_num)
+        u_1s = us[:, :, 0]
+        u_2s = us[:, :, 1]
+        dummy_u_1s = us[:, :, 2]
+        dummy_u_2s = us[:, :, 3]
+        raw_1s = us[:, :, 4]
+        raw_2s = us[:, :, 5]
+
+        _, _, _, v_s, _, _, lam_3s, lam_4s = \
+            self.simulator.calc_predict_and_adjoint_state_batch(
+                *states.T, u_1s, u_2s, self.N, dt)
+
+        F = np.empty(us.shape)
+        # ∂H/∂u(xi, ui, λi)
+        F[:, :, 0] = u_1s + lam_4s + 2.0 * raw_1s * u_1s
+        F[:, :, 1] = u_2s + lam_3s * v_s[:, :-1] / WB * np.cos(u_2s) ** 2 \
+            + 2.0 * raw_2s * u_2s
+        F[:, :, 2] = -PHI_V + 2.0 * raw_1s * dummy_u_1s
+        F[:, :, 3] = -PHI_OMEGA + 2.0 * raw_2s * dummy_u_2s
+        # C(xi, ui, λi)
+        F[:, :, 4] = u_1s ** 2 + dummy_u_1s ** 2 - U_A_MAX ** 2
+        F[:, :, 5] = u_2s ** 2 + dummy_u_2s ** 2 - U_OMEGA_MAX ** 2
+
+        return F.reshape(len(F), -1)
+
     @staticmethod
     def _calc_f(v_s, lam_3s, lam_4s, u_1s, u_2s, dummy_u_1s, dummy_u_2s,
                 raw_1s, raw_2s, N):
@@ -580,6 +638,41 @@ def animation(plant, controller, dt):
     plt.close("all")
 
 
+def benchmark(iteration_time=150.0, dt=0.1, budget=0.01):
+    """
+    per step latency of NMPCControllerCGMRES.calc_input along the main()
+    scenario
+
+    :param budget: control period [s] the latencies are compared with
+    :return: dict of [mean, 99th percentile, max] latency [s] per mode
+    """
+    result = {}
+    for name, batch_jacobian in [("matrix free", False),
+                                 ("batch jacobian", True)]:
+        plant_system = TwoWheeledSystem(-4.5, -2.5, radians(45.0), -1.0)
+        controller = NMPCControllerCGMRES(record_history=False,
+                                          batch_jacobian=batch_jacobian)
+
+        latency = []
+        for i in range(1, int(iteration_time / dt)):
+            start = perf_counter()
+            u_1s, u_2s = controller.calc_input(
+                plant_system.x, plant_system.y, plant_system.yaw,
+                plant_system.v, float(i) * dt)
+            latency.append(perf_counter() - start)
+            plant_system.update_state(u_1s[0], u_2s[0])
+
+        result[name] = [np.mean(latency), np.percentile(latency, 99),
+                        np.max(latency)]
+        print("{0}: mean {1:.2f} [ms], p99 {2:.2f} [ms], max {3:.2f} [ms], "
+              "{4} of {5} steps over {6:.0f} [ms]".format(
+                  name, *np.array(result[name]) * 1e3,
+                  np.count_nonzero(np.array(latency) > budget), len(latency),
+                  budget * 1e3))
+
+    return result
+
+
 def main():
     # simulation time
     dt = 0.1
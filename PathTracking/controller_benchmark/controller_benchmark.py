@@ -0,0 +1,551 @@
+"""
+
+Benchmark of the path tracking controllers
+
+Every controller is wrapped in an adapter with a common interface and driven
+headless over a shared suite of reference courses made with
+cubic_spline_planner.calc_spline_course. For every controller and course the
+per step latency of the control computation, the memory it allocates and the
+tracking error of the closed loop are recorded, and the results are written
+as JSON so they can be tracked for regressions.
+
+usage: python controller_benchmark.py [output.json]
+
+"""
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
+                "/../../PathPlanning/CubicSpline/")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../../")
+
+try:
+    import cubic_spline_planner
+    from PathTracking.cgmres_nmpc import cgmres_nmpc
+    from PathTracking.lqr_speed_steer_control import lqr_speed_steer_control
+    from PathTracking.lqr_steer_control import lqr_steer_control
+    from PathTracking.path_progress_tracker import path_progress_tracker
+    from PathTracking.pure_pursuit import pure_pursuit
+    from PathTracking.rear_wheel_feedback import rear_wheel_feedback
+    from PathTracking.stanley_controller import stanley_controller
+except ImportError:
+    raise
+
+TARGET_SPEED = 10.0 / 3.6  # [m/s]
+MAX_TIME = 120.0  # max simulation time of a run [s]
+MAX_ALLOCATION_STEPS = 1000  # max steps of the allocation measurement
+COURSE_TICK = 0.1  # [m]
+
+# waypoints of the reference courses. They are driven forward only and are
+# wide enough for the largest turning radius of the vehicle models.
+COURSES = {
+    "lane_change": ([0.0, 10.0, 20.0, 30.0, 40.0, 50.0],
+                    [0.0, 0.0, 3.5, 3.5, 3.5, 3.5]),
+    "s_curve": ([0.0, 10.0, 20.0, 30.0, 40.0],
+                [0.0, 5.0, 0.0, -5.0, 0.0]),
+    "hairpin": ([0.0, 50.0, 50.0, 25.0, 30.0],  # stanley main() at half size
+                [0.0, 0.0, -15.0, -10.0, 0.0]),
+}
+
+
+class Course:
+
+    def __init__(self, name, ax, ay, ds=COURSE_TICK):
+        self.name = name
+        self.ax = ax
+        self.ay = ay
+        self.ds = ds
+        self.cx, self.cy, self.cyaw, self.ck, self.s = \
+            cubic_spline_planner.calc_spline_course(ax, ay, ds=ds)
+        self.goal = [self.cx[-1], self.cy[-1]]
+
+
+def make_courses(courses=COURSES):
+    return [Course(name, ax, ay) for name, (ax, ay) in courses.items()]
+
+
+class Controller:
+    """
+    common interface of the benchmarked controllers
+
+    reset() puts the vehicle at the start of a course, calc_input() is the
+    timed control computation of one step, update() applies the inputs to
+    the vehicle model of the controller for one control period dt, and
+    is_goal() is the end condition of the main() of the controller. The
+    vehicle pose is read from state.x and state.y.
+    """
+    name: str = ""
+    dt: float = 0.0  # [s] control period
+
+    def reset(self, course):
+        raise NotImplementedError
+
+    def calc_input(self):
+        raise NotImplementedError
+
+    def update(self, u):
+        raise NotImplementedError
+
+    def is_goal(self):
+        raise NotImplementedError
+
+
+class PurePursuit(Controller):
+    name = "pure_pursuit"
+    dt = pure_pursuit.dt
+
+    def reset(self, course):
+        pure_pursuit.show_animation = False
+        self.course = course
+        self.state = pure_pursuit.State(
+            x=course.cx[0], y=course.cy[0], yaw=course.cyaw[0], v=0.0)
+        self.target_course = pure_pursuit.TargetCourse(course.cx, course.cy)
+        self.target_ind, _ = self.target_course.search_target_index(
+            self.state)
+
+    def calc_input(self):
+        ai = pure_pursuit.proportional_control(TARGET_SPEED, self.state.v)
+        di, self.target_ind = pure_pursuit.pure_pursuit_steer_control(
+            self.state, self.target_course, self.target_ind)
+        return ai, di
+
+    def update(self, u):
+        self.state.update(*u)
+
+    def is_goal(self):
+        return self.target_ind >= len(self.course.cx) - 1
+
+
+class Stanley(Controller):
+    name = "stanley_controller"
+    dt = stanley_controller.dt
+
+    def reset(self, course):
+        stanley_controller.show_animation = False
+        self.course = course
+        self.state = stanley_controller.State(
+            x=course.cx[0], y=course.cy[0], yaw=course.cyaw[0], v=0.0)
+        self.tracker = stanley_controller.path_progress_tracker.\
+            PathProgressTracker(course.cx, course.cy, course.cyaw)
+        self.target_idx, _ = stanley_controller.calc_target_index(
+            self.state, course.cx, course.cy, self.tracker)
+
+    def calc_input(self):
+        course = self.course
+        ai = stanley_controller.pid_control(TARGET_SPEED, self.state.v)
+        di, self.target_idx = stanley_controller.stanley_control(
+            self.state, course.cx, course.cy, course.cyaw, self.target_idx,
+            self.tracker)
+        return ai, di
+
+    def update(self, u):
+        self.state.update(*u)
+
+    def is_goal(self):
+        return self.target_idx >= len(self.course.cx) - 1
+
+
+class RearWheelFeedback(Controller):
+    """
+    the controller tracks its own spline, which is fitted to the course
+    points every waypoint_tick so that it follows the same course as the
+    other controllers
+    """
+    name = "rear_wheel_feedback"
+    dt = rear_wheel_feedback.dt
+    goal_dis = 0.3
+    waypoint_tick = 1.0  # [m]
+
+    def reset(self, course):
+        rear_wheel_feedback.show_animation = False
+        self.course = course
+        step = max(int(round(self.waypoint_tick / course.ds)), 1)
+        ind = np.append(np.arange(0, len(course.cx) - 1, step),
+                        len(course.cx) - 1)
+        self.path = rear_wheel_feedback.CubicSplinePath(
+            np.array(course.cx)[ind], np.array(course.cy)[ind])
+        self.state = rear_wheel_feedback.State(
+            x=course.cx[0], y=course.cy[0], yaw=float(self.path.calc_yaw(0.0)),
+            v=0.0)
+        _, _, _, self.s0 = self.path.calc_track_error(
+            self.state.x, self.state.y, 0.0)
+
+    def calc_input(self):
+        e, k, yaw_ref, self.s0 = self.path.calc_track_error(
+            self.state.x, self.state.y, self.s0)
+        di = rear_wheel_feedback.rear_wheel_feedback_control(
+            self.state, e, k, yaw_ref)
+        speed_ref = rear_wheel_feedback.calc_target_speed(self.state, yaw_ref)
+        ai = rear_wheel_feedback.pid_control(speed_ref, self.state.v)
+        return ai, di
+
+    def update(self, u):
+        self.state.update(*u, self.dt)
+
+    def is_goal(self):
+        return math.hypot(self.state.x - self.course.goal[0],
+                          self.state.y - self.course.goal[1]) <= self.goal_dis
+
+
+class LQRSteer(Controller):
+    name = "lqr_steer_control"
+    dt = lqr_steer_control.dt
+    goal_dis = 0.3
+
+    def __init__(self):
+        m = lqr_steer_control
+        self.gain_schedule = m.lqr_gain_schedule.load_gain_schedule(
+            m.calc_model_matrix, m.Q, m.R, m.lqr_speeds)
+
+    def reset(self, course):
+        m = lqr_steer_control
+        m.show_animation = False
+        self.course = course
+        self.state = m.State(
+            x=course.cx[0], y=course.cy[0], yaw=course.cyaw[0], v=0.0)
+        self.speed_profile = m.calc_speed_profile(
+            course.cx, course.cy, course.cyaw, TARGET_SPEED)
+        self.tracker = m.path_progress_tracker.PathProgressTracker(
+            course.cx, course.cy, course.cyaw)
+        self.e, self.e_th = 0.0, 0.0
+
+    def calc_input(self):
+        course = self.course
+        dl, target_ind, self.e, self.e_th = \
+            lqr_steer_control.lqr_steering_control(
+                self.state, course.cx, course.cy, course.cyaw, course.ck,
+                self.e, self.e_th, self.gain_schedule, self.tracker)
+        ai = lqr_steer_control.PIDControl(self.speed_profile[target_ind],
+                                          self.state.v)
+        return ai, dl
+
+    def update(self, u):
+        self.state = lqr_steer_control.update(self.state, *u)
+
+    def is_goal(self):
+        return math.hypot(self.state.x - self.course.goal[0],
+                          self.state.y - self.course.goal[1]) <= self.goal_dis
+
+
+class LQRSpeedSteer(Controller):
+    name = "lqr_speed_steer_control"
+    dt = lqr_speed_steer_control.dt
+    goal_dis = 0.3
+
+    def __init__(self):
+        m = lqr_speed_steer_control
+        self.gain_schedule = m.lqr_gain_schedule.load_gain_schedule(
+            m.calc_model_matrix, m.lqr_Q, m.lqr_R, m.lqr_speeds)
+
+    def reset(self, course):
+        m = lqr_speed_steer_control
+        m.show_animation = False
+        self.course = course
+        self.state = m.State(
+            x=course.cx[0], y=course.cy[0], yaw=course.cyaw[0], v=0.0)
+        self.speed_profile = m.calc_speed_profile(
+            course.cx, course.cy, course.cyaw, TARGET_SPEED)
+        self.tracker = m.path_progress_tracker.PathProgressTracker(
+            course.cx, course.cy, course.cyaw)
+        self.e, self.e_th = 0.0, 0.0
+
+    def calc_input(self):
+        m = lqr_speed_steer_control
+        course = self.course
+        dl, _, self.e, self.e_th, ai = m.lqr_speed_steering_control(
+            self.state, course.cx, course.cy, course.cyaw, course.ck,
+            self.e, self.e_th, self.speed_profile, m.lqr_Q, m.lqr_R,
+            self.gain_schedule, self.tracker)
+        return ai, dl
+
+    def update(self, u):
+        self.state = lqr_speed_steer_control.update(self.state, *u)
+
+    def is_goal(self):
+        return math.hypot(self.state.x - self.course.goal[0],
+                          self.state.y - self.course.goal[1]) <= self.goal_dis
+
+
+class ModelPredictive(Controller):
+    """
+    iterative linear MPC solved with the compiled LinearMPC
+
+    :raises ImportError: if cvxpy is not installed
+    """
+    name = "model_predictive_speed_and_steer_control"
+
+    def __init__(self):
+        from PathTracking.model_predictive_speed_and_steer_control import \
+            model_predictive_speed_and_steer_control
+        self.m = model_predictive_speed_and_steer_control
+        self.dt = self.m.DT
+
+    def reset(self, course):
+        m = self.m
+        m.show_animation = False
+        self.course = course
+        self.cyaw = m.smooth_yaw(list(course.cyaw))
+        self.speed_profile = m.calc_speed_profile(
+            course.cx, course.cy, self.cyaw, TARGET_SPEED)
+        self.state = m.State(
+            x=course.cx[0], y=course.cy[0], yaw=self.cyaw[0], v=0.0)
+        self.tracker = m.path_progress_tracker.PathProgressTracker(
+            course.cx, course.cy, self.cyaw, window=m.N_IND_SEARCH)
+        self.target_ind, _ = self.tracker.search(self.state.x, self.state.y)
+        self.mpc = m.LinearMPC()
+        self.oa, self.odelta = None, None
+        self.u = (0.0, 0.0)
+
+    def calc_input(self):
+        m = self.m
+        course = self.course
+        xref, self.target_ind, dref = m.calc_ref_trajectory(
+            self.state, course.cx, course.cy, self.cyaw, course.ck,
+            self.speed_profile, course.ds, self.target_ind, self.tracker)
+        x0 = [self.state.x, self.state.y, self.state.v, self.state.yaw]
+        self.oa, self.odelta, _, _, _, _ = m.iterative_linear_mpc_control(
+            xref, x0, dref, self.oa, self.odelta, self.mpc)
+        if self.odelta is not None:  # keep the last inputs if infeasible
+            self.u = (self.oa[0], self.odelta[0])
+        return self.u
+
+    def update(self, u):
+        self.state = self.m.update_state(self.state, *u)
+
+    def is_goal(self):
+        return self.m.check_goal(self.state, self.course.goal,
+                                 self.target_ind, len(self.course.cx))
+
+
+class CGMRES(Controller):
+    """
+    C/GMRES NMPC of the two wheeled system
+
+    The controller stabilizes the system to the origin, so it is given the
+    pose relative to a carrot: the course pose lookahead ahead of the
+    nearest course point. As in main(), the plant moves ht per step and the
+    prediction horizon grows with 0.1 [s] per step.
+    """
+    name = "cgmres_nmpc"
+    time_tick = 0.1
+    goal_dis = 0.3
+    lookahead = 3.0  # [m]
+
+    def __init__(self, batch_jacobian=True):
+        self.batch_jacobian = batch_jacobian
+        self.dt = cgmres_nmpc.NMPCControllerCGMRES().ht
+
+    def reset(self, course):
+        cgmres_nmpc.show_animation = False
+        self.course = course
+        self.state = cgmres_nmpc.TwoWheeledSystem(
+            course.cx[0], course.cy[0], course.cyaw[0], 0.0)
+        self.controller = cgmres_nmpc.NMPCControllerCGMRES(
+            record_history=False, batch_jacobian=self.batch_jacobian)
+        self.tracker = path_progress_tracker.PathProgressTracker(
+            course.cx, course.cy, course.cyaw)
+        self.steps = 0
+
+    def calc_carrot_pose(self):
+        """
+        :return: x, y, yaw of the vehicle in the frame of the carrot, the
+            yaw wrapped to [-pi, pi)
+        """
+        course = self.course
+        ind, _ = self.tracker.search(self.state.x, self.state.y)
+        ind = min(ind + int(round(self.lookahead / course.ds)),
+                  len(course.cx) - 1)
+
+        dx = self.state.x - course.cx[ind]
+        dy = self.state.y - course.cy[ind]
+        c, s = math.cos(course.cyaw[ind]), math.sin(course.cyaw[ind])
+        return c * dx + s * dy, -s * dx + c * dy, \
+            path_progress_tracker.pi_2_pi(self.state.yaw - course.cyaw[ind])
+
+    def calc_input(self):
+        self.steps += 1
+        u_1s, u_2s = self.controller.calc_input(
+            *self.calc_carrot_pose(), self.state.v,
+            self.steps * self.time_tick)
+        return u_1s[0], u_2s[0]
+
+    def update(self, u):
+        self.state.update_state(*u, self.dt)
+
+    def is_goal(self):
+        return math.hypot(self.state.x - self.course.goal[0],
+                          self.state.y - self.course.goal[1]) <= self.goal_dis
+
+
+def make_controllers():
+    """
+    :return: the controllers, and the names of the ones skipped because an
+        optional dependency is not installed
+    """
+    controllers = [PurePursuit(), Stanley(), RearWheelFeedback(), LQRSteer(),
+                   LQRSpeedSteer()]
+    skipped = []
+    try:
+        controllers.append(ModelPredictive())
+    except ImportError:  # cvxpy
+        skipped.append(ModelPredictive.name)
+    controllers.append(CGMRES())
+
+    return controllers, skipped
+
+
+def summarize(values, percentiles=(50, 90, 99)):
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return None
+    summary = {"mean": float(np.mean(values))}
+    for p in percentiles:
+        summary["p%d" % p] = float(np.percentile(values, p))
+    summary["max"] = float(np.max(values))
+    return summary
+
+
+def run(controller, course, max_time=MAX_TIME, measure_allocations=True):
+    """
+    drive a controller over a course
+
+    The latencies are measured in a first run. The allocations are measured
+    with tracemalloc, which would distort the latencies, in a second run over
+    the same steps (at most MAX_ALLOCATION_STEPS): the peak traced memory of
+    each step, and the memory still allocated at the end of the run.
+    """
+    max_steps = int(round(max_time / controller.dt))
+
+    latency = []
+    x, y = [], []
+    reached = False
+    controller.reset(course)
+    x.append(controller.state.x)
+    y.append(controller.state.y)
+    while len(latency) < max_steps:
+        start = time.perf_counter()
+        u = controller.calc_input()
+        latency.append(time.perf_counter() - start)
+        controller.update(u)
+        x.append(controller.state.x)
+        y.append(controller.state.y)
+        if controller.is_goal():
+            reached = True
+            break
+
+    cross_track_error, _ = cKDTree(
+        np.column_stack((course.cx, course.cy))).query(np.column_stack((x, y)))
+
+    result = {
+        "controller": controller.name,
+        "course": course.name,
+        "dt": controller.dt,
+        "steps": len(latency),
+        "sim_time": len(latency) * controller.dt,
+        "reached": reached,
+        "goal_distance": math.hypot(x[-1] - course.goal[0],
+                                    y[-1] - course.goal[1]),
+        "cross_track_error": {
+            "rms": float(np.sqrt(np.mean(cross_track_error ** 2))),
+            "max": float(np.max(cross_track_error))},
+        "latency_us": summarize(np.array(latency) * 1e6),
+    }
+
+    if measure_allocations:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        controller.reset(course)
+        base, _ = tracemalloc.get_traced_memory()
+        allocated = []
+        for _ in range(min(len(latency), MAX_ALLOCATION_STEPS)):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            u = controller.calc_input()
+            _, peak = tracemalloc.get_traced_memory()
+            allocated.append(peak - current)
+            controller.update(u)
+        retained = tracemalloc.get_traced_memory()[0] - base
+        if not was_tracing:
+            tracemalloc.stop()
+
+        result["allocated_bytes"] = summarize(allocated)
+        result["retained_bytes"] = retained
+
+    return result
+
+
+def run_benchmark(controllers=None, courses=None, max_time=MAX_TIME,
+                  measure_allocations=True):
+    """
+    :param controllers: Controller objects, all of them if None
+    :param courses: Course objects, the COURSES if None
+    :return: dict of the results, serializable to JSON
+    """
+    skipped = []
+    if controllers is None:
+        controllers, skipped = make_controllers()
+    if courses is None:
+        courses = make_courses()
+
+    results = []
+    for controller in controllers:
+        for course in courses:
+            # keep the prints of the controllers out of the output
+            with contextlib.redirect_stdout(io.StringIO()):
+                results.append(run(controller, course, max_time,
+                                   measure_allocations))
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "parameters": {
+            "target_speed": TARGET_SPEED,
+            "max_time": max_time,
+            "max_allocation_steps": MAX_ALLOCATION_STEPS,
+            "course_tick": COURSE_TICK,
+        },
+        "skipped": skipped,
+        "results": results,
+    }
+
+
+def main(output=None):
+    print(__file__ + " start!!")
+
+    benchmark = run_benchmark()
+
+    for result in benchmark["results"]:
+        print("{controller:>42} {course:>20}: p50 {p50:9.1f} [us], "
+              "p99 {p99:9.1f} [us], rms error {rms:.3f} [m], {goal}".format(
+                  p50=result["latency_us"]["p50"],
+                  p99=result["latency_us"]["p99"],
+                  rms=result["cross_track_error"]["rms"],
+                  goal="goal" if result["reached"] else "not reached",
+                  **result))
+    for name in benchmark["skipped"]:
+        print("skipped " + name)
+
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(benchmark, f, indent=2)
+
+    return benchmark
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,82 @@
+"""
+
+Lockstep simulation of a fleet of vehicles for the path tracking controllers
+
+The courses of the vehicles are padded into (N, max_len) arrays, so a
+controller computes the inputs of all vehicles with array operations. The
+fleet is stepped in lockstep until every vehicle reached the end of its
+course, and only summary metrics are accumulated, so the memory does not grow
+with the simulation time.
+
+"""
+import numpy as np
+
+
+def pad_courses(courses):
+    """
+    pad courses of different lengths into (N, max_len) arrays by repeating
+    their last point
+
+    :param courses: list of courses, each a tuple of components like
+        (cx, cy) or (cx, cy, cyaw)
+    :return: list of padded arrays, one for each course component, and the
+        (N,) number of points of each course
+    """
+    n_points = np.array([len(course[0]) for course in courses])
+    padded = []
+    for i in range(len(courses[0])):
+        padded.append(np.array(
+            [np.pad(np.asarray(course[i], dtype=float),
+                    (0, max(n_points) - len(course[i])), mode="edge")
+             for course in courses]))
+
+    return padded, n_points
+
+
+def simulate_fleet(step, target_index, last_index, dt, max_time):
+    """
+    step the running vehicles until their target indexes reach the end of
+    their courses
+
+    :param step: function (running, target_index) -> (target_index, error)
+        which computes the inputs of the vehicles, updates the running ones
+        and returns their (N,) new target indexes and cross track errors
+    :param target_index: (N,) initial target indexes
+    :param last_index: (N,) last index of each course
+    :param dt: [s] time tick
+    :param max_time: [s] max simulation time
+    :return: dict of (N,) arrays
+        reached: the target index reached the end of the course
+        completion_time: [s] time at the end of the course, nan if not reached
+        cross_track_rms: [m] RMS cross track error
+        cross_track_max: [m] max absolute cross track error
+    """
+    n = len(last_index)
+    time = 0.0
+
+    completion_time = np.where(last_index > target_index, np.nan, 0.0)
+    squared_sum = np.zeros(n)
+    cross_track_max = np.zeros(n)
+    n_steps = np.zeros(n, dtype=int)
+
+    running = last_index > target_index
+    while max_time >= time and np.any(running):
+        index, error = step(running, target_index)
+        target_index = np.where(running, index, target_index)
+
+        time += dt
+
+        squared_sum += np.where(running, error ** 2, 0.0)
+        cross_track_max = np.where(
+            running, np.maximum(cross_track_max, np.abs(error)),
+            cross_track_max)
+        n_steps += running
+
+        finished = running & (last_index <= target_index)
+        completion_time[finished] = time
+        running &= ~finished
+
+    return {"reached": ~np.isnan(completion_time),
+            "completion_time": completion_time,
+            "cross_track_rms": np.sqrt(squared_sum / np.maximum(n_steps, 1)),
+            "cross_track_max": cross_track_max}
@@ -6,6 +6,7 @@ author Atsushi Sakai (@Atsushi_twi)
 
 """
 import math
+import os
 import sys
 
 import matplotlib.pyplot as plt
@@ -13,9 +14,18 @@ import numpy as np
 import scipy.linalg as la
 
 sys.path.append("../../PathPlanning/CubicSpline/")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
+                "/../lqr_steer_control/")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
+                "/../path_progress_tracker/")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
+                "/../speed_profile/")
 
 try:
     import cubic_spline_planner
+    import lqr_gain_schedule
+    import path_progress_tracker
+    import speed_profile
 except ImportError:
     raise
 
@@ -24,6 +34,7 @@ except ImportError:
 # LQR parameter
 lqr_Q = np.eye(5)
 lqr_R = np.eye(2)
+lqr_speeds = np.linspace(-5.0, 5.0, 201)  # speed grid of gain schedule [m/s]
 dt = 0.1  # time tick[s]
 L = 0.5  # Wheel base of the vehicle [m]
 max_steer = np.deg2rad(45.0)  # maximum steering angle[rad]
@@ -96,15 +107,7 @@ def dlqr(A, B, Q, R):
     return K, X, eig_result[0]
 
 
-def lqr_speed_steering_control(state, cx, cy, cyaw, ck, pe, pth_e, sp, Q, R):
-    ind, e = calc_nearest_index(state, cx, cy, cyaw)
-
-    tv = sp[ind]
-
-    k = ck[ind]
-    v = state.v
-    th_e = pi_2_pi(state.yaw - cyaw[ind])
-
+def calc_model_matrix(v):
     # A = [1.0, dt, 0.0, 0.0, 0.0
     #      0.0, 0.0, v, 0.0, 0.0]
     #      0.0, 0.0, 1.0, dt, 0.0]
@@ -127,7 +130,33 @@ def lqr_speed_steering_control(state, cx, cy, cyaw, ck, pe, pth_e, sp, Q, R):
     B[3, 0] = v / L
     B[4, 1] = dt
 
-    K, _, _ = dlqr(A, B, Q, R)
+    return A, B
+
+
+def lqr_speed_steering_control(state, cx, cy, cyaw, ck, pe, pth_e, sp, Q, R,
+                               gain_schedule=None, tracker=None):
+    """
+    :param gain_schedule: lqr_gain_schedule.LQRGainSchedule to interpolate
+        the gain from, if None the gain is solved with dlqr
+    :param tracker: path_progress_tracker.PathProgressTracker of the course,
+        if None the nearest index is searched over the whole course
+    """
+    if tracker is None:
+        ind, e = calc_nearest_index(state, cx, cy, cyaw)
+    else:
+        ind, e = tracker.search(state.x, state.y)
+
+    tv = sp[ind]
+
+    k = ck[ind]
+    v = state.v
+    th_e = pi_2_pi(state.yaw - cyaw[ind])
+
+    if gain_schedule is None:
+        A, B = calc_model_matrix(v)
+        K, _, _ = dlqr(A, B, Q, R)
+    else:
+        K = gain_schedule.calc_gain(v)
 
     # state vector
     # x = [e, dot_e, th_e, dot_th_e, delta_v]
@@ -182,7 +211,7 @@ def calc_nearest_index(state, cx, cy, cyaw):
     return ind, mind
 
 
-def do_simulation(cx, cy, cyaw, ck, speed_profile, goal):
+def do_simulation(cx, cy, cyaw, ck, speed_profile, goal, gain_schedule=None):
     T = 500.0  # max simulation time
     goal_dis = 0.3
     stop_speed = 0.05
@@ -198,9 +227,12 @@ def do_simulation(cx, cy, cyaw, ck, speed_profile, goal):
 
     e, e_th = 0.0, 0.0
 
+    tracker = path_progress_tracker.PathProgressTracker(cx, cy, cyaw)
+
     while T >= time:
         dl, target_ind, e, e_th, ai = lqr_speed_steering_control(
-            state, cx, cy, cyaw, ck, e, e_th, speed_profile, lqr_Q, lqr_R)
+            state, cx, cy, cyaw, ck, e, e_th, speed_profile, lqr_Q, lqr_R,
+            gain_schedule, tracker)
 
         state = update(state, ai, dl)
 
@@ -239,34 +271,24 @@ def do_simulation(cx, cy, cyaw, ck, speed_profile, goal):
     return t, x, y, yaw, v
 
 
-def calc_speed_profile(cyaw, target_speed):
-    speed_profile = [target_speed] * len(cyaw)
-
-    direction = 1.0
-
-    # Set stop point
-    for i in range(len(cyaw) - 1):
-        dyaw = abs(cyaw[i + 1] - cyaw[i])
-        switch = math.pi / 4.0 <= dyaw < math.pi / 2.0
-
-        if switch:
-            direction *= -1
-
-        if direction != 1.0:
-            speed_profile[i] = - target_speed
-        else:
-            speed_profile[i] = target_speed
+def calc_speed_profile(cx, cy, cyaw, target_speed, max_lateral_accel=None,
+                       max_accel=None, max_decel=None):
+    """
+    stops at the direction switches and slows down over the last points, see
+    speed_profile.calc_speed_profile for the optional limits
+    """
+    direction, stop = speed_profile.calc_switch_direction(cyaw)
 
-        if switch:
-            speed_profile[i] = 0.0
+    sp = speed_profile.calc_speed_profile(
+        cx, cy, target_speed, direction, stop,
+        max_lateral_accel=max_lateral_accel, max_accel=max_accel,
+        max_decel=max_decel)
 
-    # speed down
-    for i in range(40):
-        speed_profile[-i] = target_speed / (50 - i)
-        if speed_profile[-i] <= 1.0 / 3.6:
-            speed_profile[-i] = 1.0 / 3.6
+    # speed down, i = 0 sets the first point as well
+    i = np.arange(40)
+    sp[-i] = np.maximum(target_speed / (50 - i), 1.0 / 3.6)
 
-    return speed_profile
+    return sp
 
 
 def main():
@@ -279,9 +301,12 @@ def main():
         ax, ay, ds=0.1)
     target_speed = 10.0 / 3.6  # simulation parameter km/h -> m/s
 
-    sp = calc_speed_profile(cyaw, target_speed)
+    sp = calc_speed_profile(cx, cy, cyaw, target_speed)
+
+    gain_schedule = lqr_gain_schedule.load_gain_schedule(
+        calc_model_matrix, lqr_Q, lqr_R, lqr_speeds)
 
-    t, x, y, yaw, v = do_simulation(cx, cy, cyaw, ck, sp, goal)
+    t, x, y, yaw, v = do_simulation(cx, cy, cyaw, ck, sp, goal, gain_schedule)
 
     if show_animation:  # pragma: no cover
         plt.close()
@@ -0,0 +1,133 @@
+"""
+
+Gain scheduled LQR for the path tracking controllers
+
+The linearized tracking models of lqr_steer_control and
+lqr_speed_steer_control only change with the vehicle speed, so the LQR gains
+are solved once over a grid of speeds with a direct DARE solver and linearly
+interpolated at runtime. Solved schedules are saved as .npz files, keyed on
+Q, R, the speed grid and the model matrices on the grid (which carry the
+vehicle parameters such as dt and the wheel base).
+
+"""
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import scipy.linalg as la
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "lqr_gain_schedule")
+CACHE_VERSION = 2  # part of the cache key, bump when the solved gains change
+
+
+def solve_dare_iterative(A, B, Q, R, max_iter=150, eps=0.01):
+    """
+    fixed point iteration of the DARE, as solve_dare of the controllers
+    """
+    x = Q
+    x_next = Q
+    for i in range(max_iter):
+        x_next = A.T @ x @ A - A.T @ x @ B @ \
+            la.inv(R + B.T @ x @ B) @ B.T @ x @ A + Q
+        if (abs(x_next - x)).max() < eps:
+            break
+        x = x_next
+
+    return x_next
+
+
+def solve_lqr_gain(A, B, Q, R):
+    """
+    LQR gain from the stabilizing solution of the DARE
+
+    If the DARE has no stabilizing solution, e.g. when the steering has no
+    authority at zero speed, the gain is solved from the truncated fixed
+    point iteration like dlqr of the controllers, so the inputs which still
+    have authority (the acceleration) keep their gains.
+    """
+    try:
+        X = la.solve_discrete_are(A, B, Q, R)
+    except (np.linalg.LinAlgError, ValueError):
+        X = solve_dare_iterative(A, B, Q, R)
+
+    return la.solve(B.T @ X @ B + R, B.T @ X @ A)
+
+
+class LQRGainSchedule:
+
+    def __init__(self, speeds, gains):
+        """
+        :param speeds: (n,) increasing speed grid [m/s]
+        :param gains: (n, n_u, n_x) LQR gains on the grid
+        """
+        self.speeds = np.asarray(speeds, dtype=float)
+        self.gains = np.asarray(gains, dtype=float)
+
+    @classmethod
+    def solve(cls, calc_model_matrix, Q, R, speeds):
+        """
+        :param calc_model_matrix: function of the speed returning (A, B)
+        """
+        gains = [solve_lqr_gain(*calc_model_matrix(v), Q, R) for v in speeds]
+        return cls(speeds, gains)
+
+    def calc_gain(self, v):
+        """
+        interpolate the gain at the speed v, clamped to the speed grid
+        """
+        speeds = self.speeds
+        if v <= speeds[0]:
+            return self.gains[0]
+        if v >= speeds[-1]:
+            return self.gains[-1]
+
+        i = np.searchsorted(speeds, v) - 1
+        w = (v - speeds[i]) / (speeds[i + 1] - speeds[i])
+        return self.gains[i] + w * (self.gains[i + 1] - self.gains[i])
+
+    def save(self, path):
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, speeds=self.speeds, gains=self.gains)
+        os.replace(tmp_path, path)  # atomic, so readers never see half files
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["speeds"], data["gains"])
+
+
+def calc_schedule_key(calc_model_matrix, Q, R, speeds):
+    h = hashlib.sha1()
+    h.update(str(CACHE_VERSION).encode())
+    for v in speeds:
+        for matrix in calc_model_matrix(v):
+            h.update(np.ascontiguousarray(matrix, dtype=float).tobytes())
+    for array in (Q, R, speeds):
+        array = np.ascontiguousarray(array, dtype=float)
+        h.update(str(array.shape).encode())
+        h.update(array.tobytes())
+    return h.hexdigest()
+
+
+def load_gain_schedule(calc_model_matrix, Q, R, speeds, cache_dir=CACHE_DIR):
+    """
+    load a saved gain schedule, or solve and save it
+
+    :param cache_dir: directory of the saved schedules, None to not save
+    """
+    if cache_dir is None:
+        return LQRGainSchedule.solve(calc_model_matrix, Q, R, speeds)
+
+    path = os.path.join(cache_dir, calc_schedule_key(
+        calc_model_matrix, Q, R, speeds) + ".npz")
+    if os.path.exists(path):
+        return LQRGainSchedule.load(path)
+
+    schedule = LQRGainSchedule.solve(calc_model_matrix, Q, R, speeds)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        schedule.save(path)
+    except OSError:
+        pass  # read only cache, keep the schedule in memory
+    return schedule
@@ -9,11 +9,20 @@ import scipy.linalg as la
 import matplotlib.pyplot as plt
 import math
 import numpy as np
+import os
 import sys
 sys.path.append("../../PathPlanning/CubicSpline/")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
+                "/../path_progress_tracker/")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
+                "/../speed_profile/")
 
 try:
     import cubic_spline_planner
+    import lqr_gain_schedule
+    import path_progress_tracker
+    import speed_profile
 except:
     raise
 
@@ -23,6 +32,7 @@ Kp = 1.0  # speed proportional gain
 # LQR parameter
 Q = np.eye(4)
 R = np.eye(1)
+lqr_speeds = np.linspace(-5.0, 5.0, 201)  # speed grid of gain schedule [m/s]
 
 # parameters
 dt = 0.1  # time tick[s]
@@ -103,13 +113,7 @@ def dlqr(A, B, Q, R):
     return K, X, eigVals
 
 
-def lqr_steering_control(state, cx, cy, cyaw, ck, pe, pth_e):
-    ind, e = calc_nearest_index(state, cx, cy, cyaw)
-
-    k = ck[ind]
-    v = state.v
-    th_e = pi_2_pi(state.yaw - cyaw[ind])
-
+def calc_model_matrix(v):
     A = np.zeros((4, 4))
     A[0, 0] = 1.0
     A[0, 1] = dt
@@ -121,7 +125,31 @@ def lqr_steering_control(state, cx, cy, cyaw, ck, pe, pth_e):
     B = np.zeros((4, 1))
     B[3, 0] = v / L
 
-    K, _, _ = dlqr(A, B, Q, R)
+    return A, B
+
+
+def lqr_steering_control(state, cx, cy, cyaw, ck, pe, pth_e,
+                         gain_schedule=None, tracker=None):
+    """
+    :param gain_schedule: lqr_gain_schedule.LQRGainSchedule to interpolate
+        the gain from, if None the gain is solved with dlqr
+    :param tracker: path_progress_tracker.PathProgressTracker of the course,
+        if None the nearest index is searched over the whole course
+    """
+    if tracker is None:
+        ind, e = calc_nearest_index(state, cx, cy, cyaw)
+    else:
+        ind, e = tracker.search(state.x, state.y)
+
+    k = ck[ind]
+    v = state.v
+    th_e = pi_2_pi(state.yaw - cyaw[ind])
+
+    if gain_schedule is None:
+        A, B = calc_model_matrix(v)
+        K, _, _ = dlqr(A, B, Q, R)
+    else:
+        K = gain_schedule.calc_gain(v)
 
     x = np.zeros((4, 1))
 
@@ -160,7 +188,8 @@ def calc_nearest_index(state, cx, cy, cyaw):
     return ind, mind
 
 
-def closed_loop_prediction(cx, cy, cyaw, ck, speed_profile, goal):
+def closed_loop_prediction(cx, cy, cyaw, ck, speed_profile, goal,
+                           gain_schedule=None):
     T = 500.0  # max simulation time
     goal_dis = 0.3
     stop_speed = 0.05
@@ -176,9 +205,11 @@ def closed_loop_prediction(cx, cy, cyaw, ck, speed_profile, goal):
 
     e, e_th = 0.0, 0.0
 
+    tracker = path_progress_tracker.PathProgressTracker(cx, cy, cyaw)
+
     while T >= time:
         dl, target_ind, e, e_th = lqr_steering_control(
-            state, cx, cy, cyaw, ck, e, e_th)
+            state, cx, cy, cyaw, ck, e, e_th, gain_schedule, tracker)
 
         ai = PIDControl(speed_profile[target_ind], state.v)
         state = update(state, ai, dl)
@@ -218,30 +249,19 @@ def closed_loop_prediction(cx, cy, cyaw, ck, speed_profile, goal):
     return t, x, y, yaw, v
 
 
-def calc_speed_profile(cx, cy, cyaw, target_speed):
-    speed_profile = [target_speed] * len(cx)
-
-    direction = 1.0
-
-    # Set stop point
-    for i in range(len(cx) - 1):
-        dyaw = abs(cyaw[i + 1] - cyaw[i])
-        switch = math.pi / 4.0 <= dyaw < math.pi / 2.0
-
-        if switch:
-            direction *= -1
-
-        if direction != 1.0:
-            speed_profile[i] = - target_speed
-        else:
-            speed_profile[i] = target_speed
-
-        if switch:
-            speed_profile[i] = 0.0
-
-    speed_profile[-1] = 0.0
+def calc_speed_profile(cx, cy, cyaw, target_speed, max_lateral_accel=None,
+                       max_accel=None, max_decel=None):
+    """
+    stops at the direction switches and at the goal, see
+    speed_profile.calc_speed_profile for the optional limits
+    """
+    direction, stop = speed_profile.calc_switch_direction(cyaw)
+    stop[-1] = True
 
-    return speed_profile
+    return speed_profile.calc_speed_profile(
+        cx, cy, target_speed, direction, stop,
+        max_lateral_accel=max_lateral_accel, max_accel=max_accel,
+        max_decel=max_decel)
 
 
 def main():
@@ -256,7 +276,11 @@ def main():
 
     sp = calc_speed_profile(cx, cy, cyaw, target_speed)
 
-    t, x, y, yaw, v = closed_loop_prediction(cx, cy, cyaw, ck, sp, goal)
+    gain_schedule = lqr_gain_schedule.load_gain_schedule(
+        calc_model_matrix, Q, R, lqr_speeds)
+
+    t, x, y, yaw, v = closed_loop_prediction(cx, cy, cyaw, ck, sp, goal,
+                                             gain_schedule)
 
     if show_animation:  # pragma: no cover
         plt.close()
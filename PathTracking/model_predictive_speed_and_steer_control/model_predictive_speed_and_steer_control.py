@@ -9,11 +9,18 @@ import matplotlib.pyplot as plt
 import cvxpy
 import math
 import numpy as np
+import os
 import sys
 sys.path.append("../../PathPlanning/CubicSpline/")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
+                "/../path_progress_tracker/")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
+                "/../speed_profile/")
 
 try:
     import cubic_spline_planner
+    import path_progress_tracker
+    import speed_profile
 except:
     raise
 
@@ -226,9 +233,11 @@ def predict_motion(x0, oa, od, xref):
     return xbar
 
 
-def iterative_linear_mpc_control(xref, x0, dref, oa, od):
+def iterative_linear_mpc_control(xref, x0, dref, oa, od, mpc=None):
     """
     MPC contorl with updating operational point iteraitvely
+
+    mpc: (Optional) LinearMPC to solve with instead of linear_mpc_control
     """
 
     if oa is None or od is None:
@@ -238,7 +247,11 @@ def iterative_linear_mpc_control(xref, x0, dref, oa, od):
     for i in range(MAX_ITER):
         xbar = predict_motion(x0, oa, od, xref)
         poa, pod = oa[:], od[:]
-        oa, od, ox, oy, oyaw, ov = linear_mpc_control(xref, xbar, x0, dref)
+        if mpc is None:
+            oa, od, ox, oy, oyaw, ov = linear_mpc_control(
+                xref, xbar, x0, dref)
+        else:
+            oa, od, ox, oy, oyaw, ov = mpc.solve(xref, xbar, x0, dref)
         du = sum(abs(oa - poa)) + sum(abs(od - pod))  # calc u change value
         if du <= DU_TH:
             break
@@ -305,12 +318,109 @@ def linear_mpc_control(xref, xbar, x0, dref):
     return oa, odelta, ox, oy, oyaw, ov
 
 
-def calc_ref_trajectory(state, cx, cy, cyaw, ck, sp, dl, pind):
+class LinearMPC:
+    """
+    linear_mpc_control with the problem built once
+
+    xref, the model matrices linearized at the operational point xbar and
+    dref, and x0 are cvxpy Parameters. The problem is DPP, so it is only
+    canonicalized on the first solve, and every solve is warm started from
+    the previous solution.
+    """
+
+    def __init__(self, solver=cvxpy.OSQP):
+        self.solver = solver
+
+        self.x = cvxpy.Variable((NX, T + 1))
+        self.u = cvxpy.Variable((NU, T))
+
+        self.xref = cvxpy.Parameter((NX, T + 1))
+        self.x0 = cvxpy.Parameter(NX)
+        self.A = [cvxpy.Parameter((NX, NX)) for _ in range(T)]
+        self.B = [cvxpy.Parameter((NX, NU)) for _ in range(T)]
+        self.C = [cvxpy.Parameter(NX) for _ in range(T)]
+
+        x, u, xref = self.x, self.u, self.xref
+
+        cost = 0.0
+        constraints = []
+
+        for t in range(T):
+            cost += cvxpy.quad_form(u[:, t], R)
+
+            if t != 0:
+                cost += cvxpy.quad_form(xref[:, t] - x[:, t], Q)
+
+            constraints += [x[:, t + 1] == self.A[t] @ x[:, t]
+                            + self.B[t] @ u[:, t] + self.C[t]]
+
+            if t < (T - 1):
+                cost += cvxpy.quad_form(u[:, t + 1] - u[:, t], Rd)
+                constraints += [cvxpy.abs(u[1, t + 1] - u[1, t]) <=
+                                MAX_DSTEER * DT]
+
+        cost += cvxpy.quad_form(xref[:, T] - x[:, T], Qf)
+
+        constraints += [x[:, 0] == self.x0]
+        constraints += [x[2, :] <= MAX_SPEED]
+        constraints += [x[2, :] >= MIN_SPEED]
+        constraints += [cvxpy.abs(u[0, :]) <= MAX_ACCEL]
+        constraints += [cvxpy.abs(u[1, :]) <= MAX_STEER]
+
+        self.prob = cvxpy.Problem(cvxpy.Minimize(cost), constraints)
+
+        # (canonicalization time, solver time) [s] of each solve
+        self.stats = []
+
+    def solve(self, xref, xbar, x0, dref):
+        """
+        solve like linear_mpc_control
+
+        xref: reference point
+        xbar: operational point
+        x0: initial state
+        dref: reference steer angle
+        """
+        self.xref.value = xref
+        self.x0.value = np.asarray(x0, dtype=float)
+        for t in range(T):
+            A, B, C = get_linear_model_matrix(
+                xbar[2, t], xbar[3, t], dref[0, t])
+            self.A[t].value, self.B[t].value, self.C[t].value = A, B, C
+
+        self.prob.solve(solver=self.solver, warm_start=True, verbose=False)
+        self.stats.append((self.prob.compilation_time,
+                           self.prob.solver_stats.solve_time))
+
+        if self.prob.status == cvxpy.OPTIMAL or \
+                self.prob.status == cvxpy.OPTIMAL_INACCURATE:
+            ox = get_nparray_from_matrix(self.x.value[0, :])
+            oy = get_nparray_from_matrix(self.x.value[1, :])
+            ov = get_nparray_from_matrix(self.x.value[2, :])
+            oyaw = get_nparray_from_matrix(self.x.value[3, :])
+            oa = get_nparray_from_matrix(self.u.value[0, :])
+            odelta = get_nparray_from_matrix(self.u.value[1, :])
+
+        else:
+            print("Error: Cannot solve mpc..")
+            oa, odelta, ox, oy, oyaw, ov = None, None, None, None, None, None
+
+        return oa, odelta, ox, oy, oyaw, ov
+
+
+def calc_ref_trajectory(state, cx, cy, cyaw, ck, sp, dl, pind, tracker=None):
+    """
+    tracker: (Optional) PathProgressTracker of the course to search the
+        nearest index with instead of calc_nearest_index
+    """
     xref = np.zeros((NX, T + 1))
     dref = np.zeros((1, T + 1))
     ncourse = len(cx)
 
-    ind, _ = calc_nearest_index(state, cx, cy, cyaw, pind)
+    if tracker is None:
+        ind, _ = calc_nearest_index(state, cx, cy, cyaw, pind)
+    else:
+        ind, _ = tracker.search(state.x, state.y)
 
     if pind >= ind:
         ind = pind
@@ -363,7 +473,7 @@ def check_goal(state, goal, tind, nind):
     return False
 
 
-def do_simulation(cx, cy, cyaw, ck, sp, dl, initial_state):
+def do_simulation(cx, cy, cyaw, ck, sp, dl, initial_state, mpc=None):
     """
     Simulation
 
@@ -373,6 +483,7 @@ def do_simulation(cx, cy, cyaw, ck, sp, dl, initial_state):
     ck: course curvature list
     sp: speed profile
     dl: course tick [m]
+    mpc: (Optional) LinearMPC to solve with instead of linear_mpc_control
 
     """
 
@@ -394,20 +505,23 @@ def do_simulation(cx, cy, cyaw, ck, sp, dl, initial_state):
     t = [0.0]
     d = [0.0]
     a = [0.0]
-    target_ind, _ = calc_nearest_index(state, cx, cy, cyaw, 0)
 
     odelta, oa = None, None
 
     cyaw = smooth_yaw(cyaw)
 
+    tracker = path_progress_tracker.PathProgressTracker(
+        cx, cy, cyaw, window=N_IND_SEARCH)
+    target_ind, _ = tracker.search(state.x, state.y)
+
     while MAX_TIME >= time:
         xref, target_ind, dref = calc_ref_trajectory(
-            state, cx, cy, cyaw, ck, sp, dl, target_ind)
+            state, cx, cy, cyaw, ck, sp, dl, target_ind, tracker)
 
         x0 = [state.x, state.y, state.v, state.yaw]  # current state
 
         oa, odelta, ox, oy, oyaw, ov = iterative_linear_mpc_control(
-            xref, x0, dref, oa, odelta)
+            xref, x0, dref, oa, odelta, mpc)
 
         if odelta is not None:
             di, ai = odelta[0], oa[0]
@@ -448,33 +562,34 @@ def do_simulation(cx, cy, cyaw, ck, sp, dl, initial_state):
     return t, x, y, yaw, v, d, a
 
 
-def calc_speed_profile(cx, cy, cyaw, target_speed):
-
-    speed_profile = [target_speed] * len(cx)
-    direction = 1.0  # forward
-
-    # Set stop point
-    for i in range(len(cx) - 1):
-        dx = cx[i + 1] - cx[i]
-        dy = cy[i + 1] - cy[i]
-
-        move_direction = math.atan2(dy, dx)
-
-        if dx != 0.0 and dy != 0.0:
-            dangle = abs(pi_2_pi(move_direction - cyaw[i]))
-            if dangle >= math.pi / 4.0:
-                direction = -1.0
-            else:
-                direction = 1.0
-
-        if direction != 1.0:
-            speed_profile[i] = - target_speed
-        else:
-            speed_profile[i] = target_speed
-
-    speed_profile[-1] = 0.0
-
-    return speed_profile
+def calc_speed_profile(cx, cy, cyaw, target_speed, max_lateral_accel=None,
+                       max_accel=None, max_decel=None):
+    """
+    drives backward where the course moves against its yaw and stops at the
+    goal, see speed_profile.calc_speed_profile for the optional limits
+    """
+    cx = np.asarray(cx, dtype=float)
+    cy = np.asarray(cy, dtype=float)
+    dx = np.diff(cx)
+    dy = np.diff(cy)
+    move_direction = np.arctan2(dy, dx)
+    dangle = np.abs((move_direction - np.asarray(cyaw[:-1]) + math.pi) %
+                    (2 * math.pi) - math.pi)
+    backward = dangle >= math.pi / 4.0
+
+    # points where dx or dy is zero keep the previous direction
+    i = np.where((dx != 0.0) & (dy != 0.0), np.arange(len(dx)), -1)
+    i = np.maximum.accumulate(i)
+    direction = np.where((i >= 0) & backward[i], -1.0, 1.0)
+    direction = np.append(direction, 1.0)
+
+    stop = np.zeros(len(cx), dtype=bool)
+    stop[-1] = True
+
+    return speed_profile.calc_speed_profile(
+        cx, cy, target_speed, direction, stop,
+        max_lateral_accel=max_lateral_accel, max_accel=max_accel,
+        max_decel=max_decel)
 
 
 def smooth_yaw(yaw):
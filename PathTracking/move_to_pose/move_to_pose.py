@@ -9,6 +9,8 @@ P. I. Corke, "Robotics, Vision & Control", Springer 2017, ISBN 978-3-319-54413-7
 
 """
 
+import time
+
 import matplotlib.pyplot as plt
 import numpy as np
 from random import random
@@ -30,6 +32,8 @@ def move_to_pose(x_start, y_start, theta_start, x_goal, y_goal, theta_goal):
 
     Kp_rho*rho and Kp_alpha*alpha drive the robot along a line towards the goal
     Kp_beta*beta rotates the line so that it is parallel to the goal angle
+
+    returns the x and y trajectories of the robot
     """
     x = x_start
     y = y_start
@@ -75,6 +79,102 @@ def move_to_pose(x_start, y_start, theta_start, x_goal, y_goal, theta_goal):
                       np.sin(theta_goal), color='g', width=0.1)
             plot_vehicle(x, y, theta, x_traj, y_traj)
 
+    return x_traj, y_traj
+
+
+def move_to_pose_batch(x_start, y_start, theta_start, x_goal, y_goal,
+                       theta_goal, max_steps=10000):
+    """
+    move_to_pose for N robots and goals at once
+
+    All robots are advanced with array math in every step, robots which
+    reached their goal are masked out.
+
+    :param x_start, ..., theta_goal: (N,) start and goal poses
+    :param max_steps: maximum number of steps, robots which did not reach
+        their goal after it have the length max_steps
+    :return: (N, max_len) x and y trajectories padded with nan, (N,)
+        trajectory lengths
+    """
+    x = np.array(x_start, dtype=float)
+    y = np.array(y_start, dtype=float)
+    theta = np.array(theta_start, dtype=float)
+    x_goal = np.asarray(x_goal, dtype=float)
+    y_goal = np.asarray(y_goal, dtype=float)
+    theta_goal = np.asarray(theta_goal, dtype=float)
+
+    x_traj, y_traj = [], []
+    lengths = np.zeros(len(x), dtype=int)
+
+    rho = np.hypot(x_goal - x, y_goal - y)
+    active = np.flatnonzero(rho > 0.001)  # indexes of the moving robots
+    while len(active) and len(x_traj) < max_steps:
+        x_traj.append(x.copy())
+        y_traj.append(y.copy())
+        lengths[active] += 1
+
+        xa, ya, theta_a = x[active], y[active], theta[active]
+        x_diff = x_goal[active] - xa
+        y_diff = y_goal[active] - ya
+
+        rho = np.hypot(x_diff, y_diff)
+        alpha = (np.arctan2(y_diff, x_diff)
+                 - theta_a + np.pi) % (2 * np.pi) - np.pi
+        beta = (theta_goal[active] - theta_a - alpha + np.pi) % (
+            2 * np.pi) - np.pi
+
+        v = Kp_rho * rho
+        w = Kp_alpha * alpha + Kp_beta * beta
+
+        v = np.where((alpha > np.pi / 2) | (alpha < -np.pi / 2), -v, v)
+
+        theta_a = theta_a + w * dt
+        theta[active] = theta_a
+        x[active] = xa + v * np.cos(theta_a) * dt
+        y[active] = ya + v * np.sin(theta_a) * dt
+
+        active = active[rho > 0.001]
+
+    x_traj = np.array(x_traj).reshape(-1, len(x)).T
+    y_traj = np.array(y_traj).reshape(-1, len(x)).T
+    padding = np.arange(x_traj.shape[1]) >= lengths[:, np.newaxis]
+    x_traj[padding] = np.nan
+    y_traj[padding] = np.nan
+
+    return x_traj, y_traj, lengths
+
+
+def benchmark(n_robots=1000, seed=0):
+    """
+    compare the throughput of move_to_pose and move_to_pose_batch on random
+    start and goal poses
+    """
+    global show_animation
+    rng = np.random.default_rng(seed)
+    poses = np.column_stack((20 * rng.random((n_robots, 2)),
+                             2 * np.pi * rng.random(n_robots) - np.pi,
+                             20 * rng.random((n_robots, 2)),
+                             2 * np.pi * rng.random(n_robots) - np.pi))
+
+    animation, show_animation = show_animation, False
+    start = time.perf_counter()
+    for pose in poses:
+        move_to_pose(*pose)
+    scalar_time = time.perf_counter() - start
+    show_animation = animation
+
+    start = time.perf_counter()
+    _, _, lengths = move_to_pose_batch(*poses.T)
+    batch_time = time.perf_counter() - start
+
+    print("%d robots, %d steps" % (n_robots, lengths.sum()))
+    print("move_to_pose:       %.3f s, %.0f robots/s" %
+          (scalar_time, n_robots / scalar_time))
+    print("move_to_pose_batch: %.3f s, %.0f robots/s" %
+          (batch_time, n_robots / batch_time))
+
+    return scalar_time, batch_time
+
 
 def plot_vehicle(x, y, theta, x_traj, y_traj):  # pragma: no cover
     # Corners of triangular vehicle when pointing to the right (0 radians)
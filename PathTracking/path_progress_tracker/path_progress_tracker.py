@@ -0,0 +1,134 @@
+"""
+
+Path progress tracker for path tracking controllers
+
+The nearest course index is searched in a window ahead of the previous index,
+so the progress along the course is monotone and a course that crosses or
+doubles back on itself does not make the index jump. If the vehicle is far
+from the windowed nearest point (at the first search, or after it left the
+course) the index is relocalized globally with a KD-tree.
+
+"""
+import math
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+def pi_2_pi(angle):
+    return (angle + np.pi) % (2 * np.pi) - np.pi
+
+
+class PathProgressTracker:
+
+    def __init__(self, cx, cy, cyaw=None, window=10,
+                 relocalization_distance=5.0):
+        """
+        :param cx, cy: course points
+        :param cyaw: course yaw angles, calculated from the points if None
+        :param window: number of course points searched from the previous
+            index; the window slides forward while the nearest point is at
+            its end
+        :param relocalization_distance: [m] distance to the windowed nearest
+            point over which the index is searched over the whole course
+        """
+        if window < 2:
+            raise ValueError("window must be at least 2")
+
+        self.points = np.column_stack((cx, cy)).astype(float)
+        if cyaw is None:
+            d = np.diff(self.points, axis=0)
+            cyaw = np.arctan2(d[:, 1], d[:, 0])
+            cyaw = np.append(cyaw, cyaw[-1])
+        self.cyaw = np.asarray(cyaw, dtype=float)
+        self.window = window
+        self.relocalization_distance = relocalization_distance
+        self.kd_tree = cKDTree(self.points)
+
+        self.index = None  # of search
+        self.indexes = None  # of search_batch
+
+    def calc_nearest_index(self, x, y, pind=None):
+        """
+        :param x, y: (n,) positions
+        :param pind: (n,) previous indexes, None for a global search
+        :return: (n,) nearest course indexes
+        """
+        xy = np.column_stack((x, y))
+        if pind is None:
+            return self.kd_tree.query(xy)[1]
+
+        last = len(self.points) - 1
+        offsets = np.arange(self.window)
+        ind = np.minimum(np.array(pind, dtype=int), last)
+        active = np.arange(len(ind))
+        while len(active):
+            windows = np.minimum(ind[active, None] + offsets, last)
+            d = np.sum((self.points[windows] - xy[active, None]) ** 2, axis=2)
+            k = np.argmin(d, axis=1)
+            ind[active] = windows[np.arange(len(active)), k]
+            active = active[(k == self.window - 1) & (ind[active] < last)]
+
+        far = np.sum((self.points[ind] - xy) ** 2, axis=1) > \
+            self.relocalization_distance ** 2
+        if np.any(far):
+            ind[far] = self.kd_tree.query(xy[far])[1]
+
+        return ind
+
+    def calc_cross_track_error(self, x, y, ind):
+        """
+        signed distance to the course points, negative when the course is
+        on the left of the vehicle position
+
+        :param x, y: (n,) positions
+        :param ind: (n,) course indexes
+        """
+        dx = self.points[ind, 0] - x
+        dy = self.points[ind, 1] - y
+        angle = pi_2_pi(self.cyaw[ind] - np.arctan2(dy, dx))
+        return np.where(angle < 0, -1.0, 1.0) * np.hypot(dx, dy)
+
+    def search(self, x, y):
+        """
+        track the nearest course index of one vehicle
+
+        :return: nearest index, signed cross track error
+        """
+        points = self.points
+        if self.index is None:
+            ind = int(self.kd_tree.query([x, y])[1])
+        else:
+            ind = self.index
+            while True:
+                window = points[ind:ind + self.window]
+                d = (window[:, 0] - x) ** 2 + (window[:, 1] - y) ** 2
+                k = int(np.argmin(d))
+                ind += k
+                if k < len(window) - 1 or ind == len(points) - 1:
+                    break
+            if d[k] > self.relocalization_distance ** 2:
+                ind = int(self.kd_tree.query([x, y])[1])
+        self.index = ind
+
+        dx = points[ind, 0] - x
+        dy = points[ind, 1] - y
+        e = math.hypot(dx, dy)
+        if pi_2_pi(self.cyaw[ind] - math.atan2(dy, dx)) < 0:
+            e *= -1
+        return ind, e
+
+    def search_batch(self, x, y):
+        """
+        track the nearest course indexes of many vehicles on the course
+
+        :param x, y: (n,) positions
+        :return: (n,) nearest indexes, (n,) signed cross track errors
+        """
+        self.indexes = self.calc_nearest_index(x, y, self.indexes)
+        return self.indexes, self.calc_cross_track_error(
+            np.asarray(x), np.asarray(y), self.indexes)
+
+    def reset(self):
+        self.index = None
+        self.indexes = None
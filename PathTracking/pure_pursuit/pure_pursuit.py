@@ -9,6 +9,15 @@ author: Atsushi Sakai (@Atsushi_twi)
 import numpy as np
 import math
 import matplotlib.pyplot as plt
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
+                "/../fleet_simulation/")
+
+try:
+    import fleet_simulation
+except ImportError:
+    raise
 
 # Parameters
 k = 0.1  # look forward gain
@@ -69,15 +78,22 @@ def proportional_control(target, current):
 
 class TargetCourse:
 
-    def __init__(self, cx, cy):
+    def __init__(self, cx, cy, tracker=None):
+        """
+        :param tracker: (Optional) path_progress_tracker.PathProgressTracker
+            of the course to search the nearest point with
+        """
         self.cx = cx
         self.cy = cy
         self.old_nearest_point_index = None
+        self.tracker = tracker
 
     def search_target_index(self, state):
 
+        if self.tracker is not None:
+            ind, _ = self.tracker.search(state.rear_x, state.rear_y)
         # To speed up nearest point search, doing it at only first time.
-        if self.old_nearest_point_index is None:
+        elif self.old_nearest_point_index is None:
             # search nearest point index
             dx = [state.rear_x - icx for icx in self.cx]
             dy = [state.rear_y - icy for icy in self.cy]
@@ -88,12 +104,12 @@ class TargetCourse:
             ind = self.old_nearest_point_index
             distance_this_index = state.calc_distance(self.cx[ind],
                                                       self.cy[ind])
-            while True:
+            while (ind + 1) < len(self.cx):
                 distance_next_index = state.calc_distance(self.cx[ind + 1],
                                                           self.cy[ind + 1])
                 if distance_this_index < distance_next_index:
                     break
-                ind = ind + 1 if (ind + 1) < len(self.cx) else ind
+                ind = ind + 1
                 distance_this_index = distance_next_index
             self.old_nearest_point_index = ind
 
@@ -129,6 +145,149 @@ def pure_pursuit_steer_control(state, trajectory, pind):
     return delta, ind
 
 
+class BatchState:
+    """
+    State of N vehicles held as (N,) arrays
+    """
+
+    def __init__(self, x, y, yaw, v):
+        self.x = np.array(x, dtype=float)
+        self.y = np.array(y, dtype=float)
+        self.yaw = np.array(yaw, dtype=float)
+        self.v = np.array(v, dtype=float)
+        self.rear_x = self.x - ((WB / 2) * np.cos(self.yaw))
+        self.rear_y = self.y - ((WB / 2) * np.sin(self.yaw))
+
+    def update(self, a, delta, mask=None):
+        """
+        :param mask: (N,) bool array of the vehicles to update, all if None
+        """
+        if mask is None:
+            mask = np.ones(len(self.x), dtype=bool)
+        self.x = np.where(mask, self.x + self.v * np.cos(self.yaw) * dt,
+                          self.x)
+        self.y = np.where(mask, self.y + self.v * np.sin(self.yaw) * dt,
+                          self.y)
+        self.yaw = np.where(mask, self.yaw + self.v / WB * np.tan(delta) * dt,
+                            self.yaw)
+        self.v = np.where(mask, self.v + a * dt, self.v)
+        self.rear_x = self.x - ((WB / 2) * np.cos(self.yaw))
+        self.rear_y = self.y - ((WB / 2) * np.sin(self.yaw))
+
+
+class TargetCourseBatch:
+    """
+    TargetCourse of N vehicles, each on its own padded course
+    """
+
+    def __init__(self, cx, cy, n_points):
+        """
+        :param cx, cy: (N, max_len) padded courses, see
+            fleet_simulation.pad_courses
+        :param n_points: (N,) number of points of each course
+        """
+        self.cx = cx
+        self.cy = cy
+        self.n_points = n_points
+        self.old_nearest_point_index = None
+
+    def calc_distance(self, state, ind):
+        rows = np.arange(len(ind))
+        return np.hypot(state.rear_x - self.cx[rows, ind],
+                        state.rear_y - self.cy[rows, ind])
+
+    def search_target_index(self, state):
+        """
+        :return: (N,) look ahead target indexes, (N,) look ahead distances
+            and (N,) distances to the nearest course points
+        """
+        if self.old_nearest_point_index is None:
+            # search nearest point index
+            valid = np.arange(self.cx.shape[1]) < self.n_points[:, None]
+            d = np.where(valid, np.hypot(state.rear_x[:, None] - self.cx,
+                                         state.rear_y[:, None] - self.cy),
+                         np.inf)
+            ind = np.argmin(d, axis=1)
+        else:
+            # walk forward while the next point is not farther
+            ind = self.old_nearest_point_index.copy()
+            distance = self.calc_distance(state, ind)
+            walk = ind + 1 < self.n_points
+            while np.any(walk):
+                distance_next = self.calc_distance(
+                    state, np.minimum(ind + 1, self.n_points - 1))
+                walk &= distance >= distance_next
+                ind = ind + walk
+                distance = np.where(walk, distance_next, distance)
+                walk &= ind + 1 < self.n_points
+        self.old_nearest_point_index = ind
+        nearest_distance = self.calc_distance(state, ind)
+
+        Lf = k * state.v + Lfc  # update look ahead distance
+
+        # search look ahead target point index
+        walk = (Lf > self.calc_distance(state, ind)) & \
+            (ind + 1 < self.n_points)
+        while np.any(walk):
+            ind = ind + walk
+            walk &= (Lf > self.calc_distance(state, ind)) & \
+                (ind + 1 < self.n_points)
+
+        return ind, Lf, nearest_distance
+
+
+def pure_pursuit_steer_control_batch(state, trajectory, pind):
+    """
+    pure_pursuit_steer_control for a BatchState and a TargetCourseBatch
+
+    :return: (N,) steering angles, (N,) target indexes and (N,) distances to
+        the nearest course points
+    """
+    ind, Lf, nearest_distance = trajectory.search_target_index(state)
+
+    ind = np.maximum(ind, pind)
+
+    rows = np.arange(len(ind))
+    tx = trajectory.cx[rows, ind]
+    ty = trajectory.cy[rows, ind]
+
+    alpha = np.arctan2(ty - state.rear_y, tx - state.rear_x) - state.yaw
+
+    delta = np.arctan2(2.0 * WB * np.sin(alpha) / Lf, 1.0)
+
+    return delta, ind, nearest_distance
+
+
+def simulate_fleet(cx, cy, n_points, state, target_speed, T=100.0):
+    """
+    closed loop simulation of main() for N vehicles in lockstep
+
+    :param cx, cy: (N, max_len) padded courses, see
+        fleet_simulation.pad_courses
+    :param n_points: (N,) number of points of each course
+    :param state: BatchState of the vehicles, updated in place
+    :param target_speed: [m/s] scalar or (N,) target speeds
+    :param T: max simulation time
+    :return: dict of (N,) arrays, see fleet_simulation.simulate_fleet; the
+        cross track error is the distance to the nearest course point
+    """
+    target_course = TargetCourseBatch(cx, cy, n_points)
+    target_ind, _, _ = target_course.search_target_index(state)
+
+    def step(running, target_ind):
+        # Calc control input
+        ai = proportional_control(target_speed, state.v)
+        di, ind, nearest_distance = pure_pursuit_steer_control_batch(
+            state, target_course, target_ind)
+
+        state.update(ai, di, running)  # Control vehicle
+
+        return ind, nearest_distance
+
+    return fleet_simulation.simulate_fleet(step, target_ind, n_points - 1,
+                                           dt, T)
+
+
 def plot_arrow(x, y, yaw, length=1.0, width=0.5, fc="r", ec="k"):
     """
     Plot arrow
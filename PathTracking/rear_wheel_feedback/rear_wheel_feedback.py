@@ -6,11 +6,11 @@ author: Atsushi Sakai(@Atsushi_twi)
 
 """
 import matplotlib.pyplot as plt
+import bisect
 import math
 import numpy as np
 
 from scipy import interpolate
-from scipy import optimize
 
 Kp = 1.0  # speed propotional gain
 # steering control parameter
@@ -37,9 +37,15 @@ class State:
         self.v   = self.v + a * dt
 
 class CubicSplinePath:
-    def __init__(self, x, y):
+    def __init__(self, x, y, ds=0.02, search_range=2.0, newton_iter=3):
+        """
+        :param ds: [s-param] spacing of the sample table of the projection
+        :param search_range: [s-param] the projection is searched in
+            [s0 - search_range, s0 + search_range] around the previous one
+        :param newton_iter: Newton refinement steps of the projection
+        """
         x, y = map(np.asarray, (x, y))
-        s = np.append([0],(np.cumsum(np.diff(x)**2) + np.cumsum(np.diff(y)**2))**0.5)
+        s = np.append([0], np.cumsum(np.hypot(np.diff(x), np.diff(y))))
 
         self.X = interpolate.CubicSpline(s, x)
         self.Y = interpolate.CubicSpline(s, y)
@@ -51,43 +57,155 @@ class CubicSplinePath:
         self.ddY = self.Y.derivative(2)
 
         self.length = s[-1]
-    
+
+        # piecewise polynomial coefficients of X and Y, (4, n_segments, 2)
+        self.breaks = self.X.x
+        self.coeffs = np.stack((self.X.c, self.Y.c), axis=2)
+        # the same as python floats for the scalar projection
+        self.breaks_list = self.breaks.tolist()
+        self.coeffs_list = np.vstack((self.X.c, self.Y.c)).T.tolist()
+
+        # sample table of the projection
+        n = int(math.ceil(self.length / ds)) + 1
+        self.s_table = np.linspace(0.0, self.length, n)
+        # points as complex numbers, so the distances are a single np.abs
+        self.z_table = self.X(self.s_table) + 1j * self.Y(self.s_table)
+        self.table_ds = self.s_table[1] - self.s_table[0]
+        self.search_offsets = np.arange(
+            -int(math.ceil(search_range / self.table_ds)),
+            int(math.ceil(search_range / self.table_ds)) + 1)
+        self.newton_iter = newton_iter
+
+    def calc_derivatives(self, s):
+        """
+        position, first and second derivatives of the path at s
+
+        :return: three (..., 2) arrays of (x, y), (dx, dy), (ddx, ddy)
+        """
+        s = np.asarray(s, dtype=float)
+        i = np.clip(np.searchsorted(self.breaks, s, side="right") - 1,
+                    0, len(self.breaks) - 2)
+        t = (s - self.breaks[i])[..., np.newaxis]
+        c3, c2, c1, c0 = self.coeffs[:, i]
+        p = ((c3 * t + c2) * t + c1) * t + c0
+        dp = (3.0 * c3 * t + 2.0 * c2) * t + c1
+        ddp = 6.0 * c3 * t + 2.0 * c2
+        return p, dp, ddp
+
+    def __calc_derivatives_scalar(self, s):
+        i = min(max(bisect.bisect_right(self.breaks_list, s) - 1, 0),
+                len(self.coeffs_list) - 1)
+        t = s - self.breaks_list[i]
+        a3, a2, a1, a0, b3, b2, b1, b0 = self.coeffs_list[i]
+        return (((a3 * t + a2) * t + a1) * t + a0,
+                ((b3 * t + b2) * t + b1) * t + b0,
+                (3.0 * a3 * t + 2.0 * a2) * t + a1,
+                (3.0 * b3 * t + 2.0 * b2) * t + b1,
+                6.0 * a3 * t + 2.0 * a2,
+                6.0 * b3 * t + 2.0 * b2)
+
     def calc_yaw(self, s):
-        dx, dy = self.dX(s), self.dY(s)
-        return np.arctan2(dy, dx)
-    
+        _, dp, _ = self.calc_derivatives(s)
+        return np.arctan2(dp[..., 1], dp[..., 0])
+
     def calc_curvature(self, s):
-        dx, dy   = self.dX(s), self.dY(s)
-        ddx, ddy   = self.ddX(s), self.ddY(s)
+        _, dp, ddp = self.calc_derivatives(s)
+        dx, dy = dp[..., 0], dp[..., 1]
+        ddx, ddy = ddp[..., 0], ddp[..., 1]
         return (ddy * dx - ddx * dy) / ((dx ** 2 + dy ** 2)**(3 / 2))
-    
-    def __find_nearest_point(self, s0, x, y):
-        def calc_distance(_s, *args):
-            _x, _y= self.X(_s), self.Y(_s)
-            return (_x - args[0])**2 + (_y - args[1])**2
-        
-        def calc_distance_jacobian(_s, *args):
-            _x, _y = self.X(_s), self.Y(_s)
-            _dx, _dy = self.dX(_s), self.dY(_s)
-            return 2*_dx*(_x - args[0])+2*_dy*(_y-args[1])
-
-        minimum = optimize.fmin_cg(calc_distance, s0, calc_distance_jacobian, args=(x, y), full_output=True, disp=False)
-        return minimum
-
-    def calc_track_error(self, x, y, s0):
-        ret = self.__find_nearest_point(s0, x, y)
-        
-        s = ret[0][0]
-        e = ret[1]
 
-        k   = self.calc_curvature(s)
-        yaw = self.calc_yaw(s)
+    def __find_nearest_point_scalar(self, x, y, s0):
+        if s0 is None:
+            i0 = 0
+            table = self.z_table
+        else:
+            i = int(round(s0 / self.table_ds))
+            i0 = min(max(i + int(self.search_offsets[0]), 0),
+                     len(self.s_table) - 1)
+            table = self.z_table[i0:max(i + int(self.search_offsets[-1]) + 1,
+                                        i0 + 1)]
+        k = int(np.argmin(np.abs(table - complex(x, y))))
+        s = float(self.s_table[i0 + k])
+
+        derivatives = self.__calc_derivatives_scalar(s)
+        for _ in range(self.newton_iter):
+            px, py, dx, dy, ddx, ddy = derivatives
+            rx, ry = px - x, py - y
+            df = dx * dx + dy * dy + rx * ddx + ry * ddy
+            if df <= 0.0:
+                break
+            step = min(max((rx * dx + ry * dy) / df, -self.table_ds),
+                       self.table_ds)
+            s = min(max(s - step, 0.0), self.length)
+            derivatives = self.__calc_derivatives_scalar(s)
+            if abs(step) < 1e-9:
+                break
+
+        return s, derivatives
+
+    def find_nearest_point(self, x, y, s0=None):
+        """
+        project positions onto the path
+
+        The nearest sample of the table around s0 (or on the whole table if
+        s0 is None) is refined by Newton steps on the derivative of the
+        squared distance, limited to the table spacing so that the refinement
+        stays on the sampled branch of the path.
+
+        :param x, y: positions, scalars or arrays
+        :param s0: previous s-params of the positions
+        :return: s-params and distances of the nearest points
+        """
+        xy = np.stack(np.broadcast_arrays(x, y), axis=-1).astype(float)
+        z = xy[..., 0] + 1j * xy[..., 1]
+        if s0 is None:
+            d = np.abs(self.z_table - z[..., np.newaxis])
+            s = self.s_table[np.argmin(d, axis=-1)]
+        else:
+            i0 = np.rint(np.asarray(s0) / self.table_ds).astype(int)
+            windows = np.clip(i0[..., np.newaxis] + self.search_offsets,
+                              0, len(self.s_table) - 1)
+            d = np.abs(self.z_table[windows] - z[..., np.newaxis])
+            k = np.argmin(d, axis=-1)[..., np.newaxis]
+            s = self.s_table[np.take_along_axis(windows, k, axis=-1)[..., 0]]
+
+        for _ in range(self.newton_iter):
+            p, dp, ddp = self.calc_derivatives(s)
+            r = p - xy
+            f = np.sum(r * dp, axis=-1)
+            df = np.sum(dp * dp + r * ddp, axis=-1)
+            # skip the step where the distance is not locally convex
+            step = np.where(df > 0.0, f / np.where(df > 0.0, df, 1.0), 0.0)
+            step = np.clip(step, -self.table_ds, self.table_ds)
+            s = np.clip(s - step, 0.0, self.length)
+
+        p, _, _ = self.calc_derivatives(s)
+        return s, np.hypot(p[..., 0] - xy[..., 0], p[..., 1] - xy[..., 1])
 
-        dxl = self.X(s) - x
-        dyl = self.Y(s) - y
-        angle = pi_2_pi(yaw - math.atan2(dyl, dxl))
-        if angle < 0:
-            e*= -1
+    def calc_track_error(self, x, y, s0):
+        if np.isscalar(x) and np.isscalar(y) and \
+                (s0 is None or np.isscalar(s0)):
+            s, (px, py, dx, dy, ddx, ddy) = self.__find_nearest_point_scalar(
+                x, y, s0)
+            e = math.hypot(px - x, py - y)
+            k = (ddy * dx - ddx * dy) / ((dx ** 2 + dy ** 2)**(3 / 2))
+            yaw = math.atan2(dy, dx)
+            if pi_2_pi(yaw - math.atan2(py - y, px - x)) < 0:
+                e *= -1
+            return e, k, yaw, s
+
+        s, e = self.find_nearest_point(x, y, s0)
+
+        p, dp, ddp = self.calc_derivatives(s)
+        dx, dy = dp[..., 0], dp[..., 1]
+        ddx, ddy = ddp[..., 0], ddp[..., 1]
+        k = (ddy * dx - ddx * dy) / ((dx ** 2 + dy ** 2)**(3 / 2))
+        yaw = np.arctan2(dy, dx)
+
+        dxl = p[..., 0] - x
+        dyl = p[..., 1] - y
+        angle = (yaw - np.arctan2(dyl, dxl) + np.pi) % (2 * np.pi) - np.pi
+        e = np.where(angle < 0, -e, e)
 
         return e, k, yaw, s
 
@@ -108,10 +226,12 @@ def rear_wheel_feedback_control(state, e, k, yaw_ref):
     v = state.v
     th_e = pi_2_pi(state.yaw - yaw_ref)
 
+    # sin(th_e) / th_e tends to 1 as th_e tends to 0
+    sinc = 1.0 if th_e == 0.0 else math.sin(th_e) / th_e
     omega = v * k * math.cos(th_e) / (1.0 - k * e) - \
-        KTH * abs(v) * th_e - KE * v * math.sin(th_e) * e / th_e
+        KTH * abs(v) * th_e - KE * v * sinc * e
 
-    if th_e == 0.0 or omega == 0.0:
+    if omega == 0.0:
         return 0.0
 
     delta = math.atan2(L * omega / v, 1.0)
@@ -0,0 +1,95 @@
+"""
+
+Speed profile of a course for the path tracking controllers
+
+The speed along the course is limited by the target speed, by the lateral
+acceleration in curves and by stop points (direction switches and the goal).
+A forward pass then limits the acceleration and a backward pass the
+deceleration between the points. Both passes are recurrences on the squared
+speed, v[i + 1]^2 <= v[i]^2 + 2 a ds, whose solutions are running minimums,
+so the whole profile is computed with array operations.
+
+"""
+import numpy as np
+
+
+def calc_switch_direction(cyaw):
+    """
+    driving directions from the course yaw: the direction switches at the
+    points where the yaw to the next point jumps by [pi/4, pi/2)
+
+    :param cyaw: (n,) course yaw angles
+    :return: (n,) directions of 1.0 or -1.0, (n,) mask of the switch points
+    """
+    dyaw = np.abs(np.diff(cyaw))
+    switch = np.append((np.pi / 4.0 <= dyaw) & (dyaw < np.pi / 2.0), False)
+    direction = np.where(np.cumsum(switch) % 2 == 0, 1.0, -1.0)
+    direction[-1] = direction[-2] if len(direction) > 1 else 1.0
+    return direction, switch
+
+
+def calc_curvature(cx, cy):
+    dx, dy = np.gradient(cx, edge_order=2), np.gradient(cy, edge_order=2)
+    ddx, ddy = np.gradient(dx, edge_order=2), np.gradient(dy, edge_order=2)
+    return (dx * ddy - dy * ddx) / np.maximum(dx ** 2 + dy ** 2, 1e-12) ** 1.5
+
+
+def calc_speed_profile(cx, cy, target_speed, direction=None, stop=None,
+                       ck=None, max_lateral_accel=None, max_accel=None,
+                       max_decel=None, initial_speed=None):
+    """
+    :param cx, cy: (n,) course points
+    :param target_speed: [m/s] speed limit, scalar or (n,)
+    :param direction: (n,) driving directions of 1.0 or -1.0, forward if None.
+        With an acceleration limit the vehicle stops before each reversal
+    :param stop: (n,) mask of the points to stop at
+    :param ck: (n,) course curvatures, calculated from the points if None
+        and max_lateral_accel is set
+    :param max_lateral_accel: [m/ss] limits the speed in curves to
+        sqrt(max_lateral_accel / |k|), not limited if None
+    :param max_accel: [m/ss] acceleration limit of the forward pass, not
+        limited if None
+    :param max_decel: [m/ss] deceleration limit of the backward pass, not
+        limited if None
+    :param initial_speed: [m/s] speed at the first point for the forward
+        pass, not limited if None
+    :return: (n,) signed speed profile [m/s]
+    """
+    cx = np.asarray(cx, dtype=float)
+    cy = np.asarray(cy, dtype=float)
+    n = len(cx)
+
+    # squared speed limits
+    v2 = np.full(n, np.square(target_speed), dtype=float)
+    if max_lateral_accel is not None:
+        if ck is None:
+            ck = calc_curvature(cx, cy)
+        with np.errstate(divide="ignore"):
+            v2 = np.minimum(v2, max_lateral_accel / np.abs(ck))
+    if stop is not None:
+        v2[np.asarray(stop, dtype=bool)] = 0.0
+    if direction is not None and (max_accel is not None or
+                                  max_decel is not None):
+        # the passes limit the speed magnitude, so stop where the
+        # direction reverses
+        v2[:-1][np.diff(np.sign(direction)) != 0] = 0.0
+
+    if max_accel is not None and initial_speed is not None:
+        v2[0] = min(v2[0], initial_speed ** 2)
+    limit = v2
+
+    s = np.append(0.0, np.cumsum(np.hypot(np.diff(cx), np.diff(cy))))
+    if max_accel is not None:
+        # v2[i] = min over j <= i of v2[j] + 2 a (s[i] - s[j])
+        ramp = 2.0 * max_accel * s
+        v2 = np.minimum.accumulate(v2 - ramp) + ramp
+    if max_decel is not None:
+        # v2[i] = min over j >= i of v2[j] + 2 d (s[j] - s[i])
+        ramp = 2.0 * max_decel * s
+        v2 = np.minimum.accumulate((v2 + ramp)[::-1])[::-1] - ramp
+
+    # the ramps cancel up to round-off, keep the profile within the limits
+    speed = np.sqrt(np.clip(v2, 0.0, limit))
+    if direction is not None:
+        speed *= direction
+    return speed
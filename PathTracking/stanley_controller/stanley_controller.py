@@ -11,11 +11,18 @@ Ref:
 """
 import numpy as np
 import matplotlib.pyplot as plt
+import os
 import sys
 sys.path.append("../../PathPlanning/CubicSpline/")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
+                "/../path_progress_tracker/")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
+                "/../fleet_simulation/")
 
 try:
     import cubic_spline_planner
+    import fleet_simulation
+    import path_progress_tracker
 except:
     raise
 
@@ -76,7 +83,7 @@ def pid_control(target, current):
     return Kp * (target - current)
 
 
-def stanley_control(state, cx, cy, cyaw, last_target_idx):
+def stanley_control(state, cx, cy, cyaw, last_target_idx, tracker=None):
     """
     Stanley steering control.
 
@@ -85,9 +92,11 @@ def stanley_control(state, cx, cy, cyaw, last_target_idx):
     :param cy: ([float])
     :param cyaw: ([float])
     :param last_target_idx: (int)
+    :param tracker: (PathProgressTracker) optional tracker of the course
     :return: (float, int)
     """
-    current_target_idx, error_front_axle = calc_target_index(state, cx, cy)
+    current_target_idx, error_front_axle = calc_target_index(
+        state, cx, cy, tracker)
 
     if last_target_idx >= current_target_idx:
         current_target_idx = last_target_idx
@@ -118,13 +127,15 @@ def normalize_angle(angle):
     return angle
 
 
-def calc_target_index(state, cx, cy):
+def calc_target_index(state, cx, cy, tracker=None):
     """
     Compute index in the trajectory list of the target.
 
     :param state: (State object)
     :param cx: [float]
     :param cy: [float]
+    :param tracker: (PathProgressTracker) optional tracker of the course,
+        the whole course is searched without it
     :return: (int, float)
     """
     # Calc front axle position
@@ -132,19 +143,166 @@ def calc_target_index(state, cx, cy):
     fy = state.y + L * np.sin(state.yaw)
 
     # Search nearest point index
-    dx = [fx - icx for icx in cx]
-    dy = [fy - icy for icy in cy]
-    d = np.hypot(dx, dy)
-    target_idx = np.argmin(d)
+    if tracker is None:
+        dx = [fx - icx for icx in cx]
+        dy = [fy - icy for icy in cy]
+        d = np.hypot(dx, dy)
+        target_idx = np.argmin(d)
+    else:
+        target_idx, _ = tracker.search(fx, fy)
 
     # Project RMS error onto front axle vector
     front_axle_vec = [-np.cos(state.yaw + np.pi / 2),
                       -np.sin(state.yaw + np.pi / 2)]
-    error_front_axle = np.dot([dx[target_idx], dy[target_idx]], front_axle_vec)
+    error_front_axle = np.dot([fx - cx[target_idx], fy - cy[target_idx]],
+                              front_axle_vec)
 
     return target_idx, error_front_axle
 
 
+class BatchState(object):
+    """
+    Class representing the states of N vehicles as arrays.
+
+    :param x: (np.ndarray) x-coordinates
+    :param y: (np.ndarray) y-coordinates
+    :param yaw: (np.ndarray) yaw angles
+    :param v: (np.ndarray) speeds
+    """
+
+    def __init__(self, x, y, yaw, v):
+        """Instantiate the object."""
+        super(BatchState, self).__init__()
+        self.x = np.array(x, dtype=float)
+        self.y = np.array(y, dtype=float)
+        self.yaw = np.array(yaw, dtype=float)
+        self.v = np.array(v, dtype=float)
+
+    def update(self, acceleration, delta, mask=None):
+        """
+        Update the states of the vehicles.
+
+        :param acceleration: (np.ndarray) Accelerations
+        :param delta: (np.ndarray) Steering angles
+        :param mask: (np.ndarray) vehicles to update, all of them if None
+        """
+        if mask is None:
+            mask = np.ones(len(self.x), dtype=bool)
+        delta = np.clip(delta, -max_steer, max_steer)
+
+        self.x = np.where(mask, self.x + self.v * np.cos(self.yaw) * dt,
+                          self.x)
+        self.y = np.where(mask, self.y + self.v * np.sin(self.yaw) * dt,
+                          self.y)
+        yaw = normalize_angle_batch(
+            self.yaw + self.v / L * np.tan(delta) * dt)
+        self.yaw = np.where(mask, yaw, self.yaw)
+        self.v = np.where(mask, self.v + acceleration * dt, self.v)
+
+
+def normalize_angle_batch(angle):
+    """
+    Normalize angles to [-pi, pi].
+
+    :param angle: (np.ndarray)
+    :return: (np.ndarray) Angles in radian in [-pi, pi]
+    """
+    angle = np.where(angle > np.pi,
+                     angle - 2.0 * np.pi * np.ceil((angle - np.pi) /
+                                                   (2.0 * np.pi)), angle)
+    return np.where(angle < -np.pi,
+                    angle + 2.0 * np.pi * np.ceil((-np.pi - angle) /
+                                                  (2.0 * np.pi)), angle)
+
+
+def calc_target_index_batch(state, cx, cy, n_points):
+    """
+    Compute the target indexes of N vehicles on padded courses.
+
+    :param state: (BatchState object)
+    :param cx: (np.ndarray) (N, max_len) padded course x
+    :param cy: (np.ndarray) (N, max_len) padded course y
+    :param n_points: (np.ndarray) number of points of each course
+    :return: (np.ndarray, np.ndarray)
+    """
+    # Calc front axle position
+    fx = state.x + L * np.cos(state.yaw)
+    fy = state.y + L * np.sin(state.yaw)
+
+    # Search nearest point index
+    dx = fx[:, np.newaxis] - cx
+    dy = fy[:, np.newaxis] - cy
+    d = np.where(np.arange(cx.shape[1]) < n_points[:, np.newaxis],
+                 np.hypot(dx, dy), np.inf)
+    target_idx = np.argmin(d, axis=1)
+
+    # Project RMS error onto front axle vector
+    rows = np.arange(len(cx))
+    error_front_axle = \
+        dx[rows, target_idx] * -np.cos(state.yaw + np.pi / 2) + \
+        dy[rows, target_idx] * -np.sin(state.yaw + np.pi / 2)
+
+    return target_idx, error_front_axle
+
+
+def stanley_control_batch(state, cx, cy, cyaw, n_points, last_target_idx):
+    """
+    Stanley steering control of N vehicles on padded courses.
+
+    :param state: (BatchState object)
+    :param cx: (np.ndarray) (N, max_len) padded course x
+    :param cy: (np.ndarray) (N, max_len) padded course y
+    :param cyaw: (np.ndarray) (N, max_len) padded course yaw
+    :param n_points: (np.ndarray) number of points of each course
+    :param last_target_idx: (np.ndarray)
+    :return: (np.ndarray, np.ndarray, np.ndarray) steering angles, target
+        indexes and cross track errors at the front axles
+    """
+    current_target_idx, error_front_axle = calc_target_index_batch(
+        state, cx, cy, n_points)
+
+    current_target_idx = np.maximum(current_target_idx, last_target_idx)
+
+    # theta_e corrects the heading error
+    theta_e = normalize_angle_batch(
+        cyaw[np.arange(len(cx)), current_target_idx] - state.yaw)
+    # theta_d corrects the cross track error
+    theta_d = np.arctan2(k * error_front_axle, state.v)
+    # Steering control
+    delta = theta_e + theta_d
+
+    return delta, current_target_idx, error_front_axle
+
+
+def simulate_fleet(cx, cy, cyaw, n_points, state, target_speed,
+                   max_simulation_time=100.0):
+    """
+    Closed loop simulation of main() for N vehicles in lockstep.
+
+    :param cx: (np.ndarray) (N, max_len) padded course x, see
+        fleet_simulation.pad_courses
+    :param cy: (np.ndarray) (N, max_len) padded course y
+    :param cyaw: (np.ndarray) (N, max_len) padded course yaw
+    :param n_points: (np.ndarray) number of points of each course
+    :param state: (BatchState object) vehicles, updated in place
+    :param target_speed: (float or np.ndarray) [m/s]
+    :param max_simulation_time: (float) [s]
+    :return: (dict) of (N,) arrays, see fleet_simulation.simulate_fleet;
+        the cross track error is taken at the front axle
+    """
+    target_idx, _ = calc_target_index_batch(state, cx, cy, n_points)
+
+    def step(running, target_idx):
+        ai = pid_control(target_speed, state.v)
+        di, idx, error = stanley_control_batch(
+            state, cx, cy, cyaw, n_points, target_idx)
+        state.update(ai, di, running)
+        return idx, error
+
+    return fleet_simulation.simulate_fleet(
+        step, target_idx, n_points - 1, dt, max_simulation_time)
+
+
 def main():
     """Plot an example of Stanley steering control on a cubic spline."""
     #  target course
@@ -168,11 +326,13 @@ def main():
     yaw = [state.yaw]
     v = [state.v]
     t = [0.0]
-    target_idx, _ = calc_target_index(state, cx, cy)
+    tracker = path_progress_tracker.PathProgressTracker(cx, cy, cyaw)
+    target_idx, _ = calc_target_index(state, cx, cy, tracker)
 
     while max_simulation_time >= time and last_idx > target_idx:
         ai = pid_control(target_speed, state.v)
-        di, target_idx = stanley_control(state, cx, cy, cyaw, target_idx)
+        di, target_idx = stanley_control(state, cx, cy, cyaw, target_idx,
+                                         tracker)
         state.update(ai, di)
 
         time += dt
@@ -1,4 +1,6 @@
 import conftest  # Add root path to sys.path
+import numpy as np
+
 from PathPlanning.LQRPlanner import LQRplanner as m
 
 
@@ -7,5 +9,19 @@ def test_1():
     m.main()
 
 
+def test_batch_matches_planning():
+    planner = m.LQRPlanner()
+    rng = np.random.default_rng(0)
+    goals = rng.uniform(-100.0, 100.0, (20, 2))
+    rx, ry, n_points = planner.lqr_planning_batch(6.0, 6.0,
+                                                  goals[:, 0], goals[:, 1])
+    for i, (gx, gy) in enumerate(goals):
+        wx, wy = planner.lqr_planning(6.0, 6.0, gx, gy, show_animation=False)
+        assert n_points[i] == len(wx)
+        assert np.allclose(rx[i, :n_points[i]], wx)
+        assert np.allclose(ry[i, :n_points[i]], wy)
+    assert len(planner.gain_cache) == 1
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
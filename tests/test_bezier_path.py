@@ -1,3 +1,5 @@
+import numpy as np
+
 import conftest
 from PathPlanning.BezierPath import bezier_path as m
 
@@ -12,5 +14,24 @@ def test_2():
     m.main2()
 
 
+def test_batch_matches_point_evaluation():
+    control_points = np.array([[[10.0, 1.0], [5.0, 1.0], [-2.0, -5.0],
+                                [0.0, -3.0]],
+                               [[5.0, 1.0], [-2.78, 1.0], [-11.5, -4.5],
+                                [-6.0, -8.0]]])
+    path, d, dd = m.calc_bezier_path_batch(control_points, 50, 2)
+    k = m.calc_bezier_curvature_batch(control_points, 50)
+
+    for i, cp in enumerate(control_points):
+        w = m.bezier_derivatives_control_points(cp, 2)
+        for j, t in enumerate(np.linspace(0, 1, 50)):
+            dt, ddt = m.bezier(t, w[1]), m.bezier(t, w[2])
+            assert np.allclose(path[i, j], m.bezier(t, cp))
+            assert np.allclose(d[i, j], dt)
+            assert np.allclose(dd[i, j], ddt)
+            assert np.isclose(k[i, j], m.curvature(dt[0], dt[1],
+                                                   ddt[0], ddt[1]))
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
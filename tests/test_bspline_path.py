@@ -0,0 +1,38 @@
+import numpy as np
+
+import conftest
+from PathPlanning.BSplinePath import bspline_path as m
+
+
+def test_batch_matches_single_paths(tmp_path):
+    points = np.random.default_rng(0).uniform(-5.0, 5.0, (10, 6, 2))
+    for func, batch_func in [
+            (m.approximate_b_spline_path, m.approximate_b_spline_path_batch),
+            (m.interpolate_b_spline_path, m.interpolate_b_spline_path_batch)]:
+        out = np.lib.format.open_memmap(str(tmp_path / "paths.npy"),
+                                        mode="w+", shape=(10, 50, 4))
+        result = batch_func(points, 50, chunk_size=3, out=out)
+        assert result is out
+
+        for path, way_points in zip(np.load(str(tmp_path / "paths.npy")),
+                                    points):
+            rx, ry = func(way_points[:, 0].tolist(),
+                          way_points[:, 1].tolist(), 50)
+            assert np.allclose(path[:, 0], rx)
+            assert np.allclose(path[:, 1], ry)
+
+
+def test_batch_heading_and_curvature():
+    # way points on a circle of radius 2.0
+    theta = np.linspace(0.0, np.pi, 9)
+    points = np.stack([2.0 * np.cos(theta), 2.0 * np.sin(theta)], axis=-1)
+
+    path = m.interpolate_b_spline_path_batch(points[np.newaxis], 51)[0]
+    yaw = np.arctan2(path[:, 1], path[:, 0]) + np.pi / 2.0
+
+    assert np.allclose(path[5:-5, 3], 0.5, atol=0.02)
+    assert np.allclose(np.cos(path[5:-5, 2] - yaw[5:-5]), 1.0, atol=1e-3)
+
+
+if __name__ == '__main__':
+    conftest.run_this_test(__file__)
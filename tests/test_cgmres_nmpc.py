@@ -1,4 +1,6 @@
 import conftest
+import numpy as np
+
 from PathTracking.cgmres_nmpc import cgmres_nmpc as m
 
 
@@ -7,5 +9,36 @@ def test1():
     m.main()
 
 
+def test_batch_sweep_matches_step_by_step():
+    simulator = m.NMPCSimulatorSystem()
+    rng = np.random.default_rng(0)
+    states = rng.uniform(-1.0, 1.0, (5, 4))
+    u_1s = rng.uniform(-1.0, 1.0, (5, 10))
+    u_2s = rng.uniform(-1.0, 1.0, (5, 10))
+
+    batch = simulator.calc_predict_and_adjoint_state_batch(
+        *states.T, u_1s, u_2s, 10, 0.3)
+    for k in range(5):
+        expected = simulator.calc_predict_and_adjoint_state(
+            *states[k], u_1s[k], u_2s[k], 10, 0.3)
+        for e, b in zip(expected, batch):
+            assert np.allclose(e, b[k])
+
+
+def test_batch_jacobian():
+    for batch_jacobian in [False, True]:
+        plant_system = m.TwoWheeledSystem(-4.5, -2.5, np.radians(45.0), -1.0)
+        controller = m.NMPCControllerCGMRES(record_history=False,
+                                            batch_jacobian=batch_jacobian)
+        for i in range(1, 200):
+            u_1s, u_2s = controller.calc_input(
+                plant_system.x, plant_system.y, plant_system.yaw,
+                plant_system.v, i * 0.1)
+            plant_system.update_state(u_1s[0], u_2s[0])
+
+        assert controller.history_u_1 == []
+        assert np.all(np.abs(u_1s) <= m.U_A_MAX + 0.1)
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
@@ -2,6 +2,8 @@ import conftest
 from PathPlanning.ClosedLoopRRTStar import closed_loop_rrt_star_car as m
 import random
 
+import numpy as np
+
 
 def test_1():
     random.seed(12345)
@@ -9,5 +11,31 @@ def test_1():
     m.main(gx=1.0, gy=0.0, gyaw=0.0, max_iter=5)
 
 
+def test_batch_search_matches_sequential_search():
+    random.seed(0)
+    m.show_animation = False
+    obstacle_list = [(5, 5, 1), (4, 6, 1), (4, 8, 1), (6, 5, 1), (7, 5, 1)]
+    planner = m.ClosedLoopRRTStar([0.0, 0.0, 0.0],
+                                  [6.0, 7.0, np.deg2rad(90.0)],
+                                  obstacle_list, [-2.0, 20.0], max_iter=10)
+    m.RRTStarReedsShepp.planning(planner, animation=False)
+    path_indexs = planner.get_goal_indexes()
+    assert path_indexs
+
+    best_time, best_t = float("inf"), None
+    for ind in path_indexs:
+        path = planner.generate_final_course(ind)
+        flag, _, _, _, _, t, _, _ = planner.check_tracking_path_is_feasible(
+            path)
+        if flag and best_time >= t[-1]:
+            best_time, best_t = t[-1], t
+
+    flag, x, y, yaw, v, t, a, d = planner.search_best_feasible_path(
+        path_indexs)
+    assert flag == (best_t is not None)
+    if flag:
+        assert np.allclose(t, best_t)
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
@@ -0,0 +1,54 @@
+import conftest  # Add root path to sys.path
+import json
+import math
+
+import numpy as np
+
+from PathTracking.controller_benchmark import controller_benchmark as m
+
+
+def test_pure_pursuit_and_stanley_reach_the_goal():
+    courses = m.make_courses({"s_curve": m.COURSES["s_curve"]})
+    benchmark = m.run_benchmark([m.PurePursuit(), m.Stanley()], courses)
+
+    json.dumps(benchmark)
+    assert len(benchmark["results"]) == 2
+    for result in benchmark["results"]:
+        assert result["reached"]
+        assert result["steps"] > 0
+        assert result["cross_track_error"]["max"] < 2.0
+        assert result["latency_us"]["p50"] <= result["latency_us"]["p99"]
+        assert result["allocated_bytes"]["max"] > 0
+
+
+def test_all_controllers():
+    controllers, skipped = m.make_controllers()
+    courses = m.make_courses({"lane_change": m.COURSES["lane_change"]})
+    benchmark = m.run_benchmark(controllers, courses, max_time=1.0,
+                                measure_allocations=False)
+
+    assert len(benchmark["results"]) == len(controllers)
+    for result in benchmark["results"]:
+        assert result["steps"] >= 1
+        assert "allocated_bytes" not in result
+
+
+def test_cgmres_carrot_yaw_across_seam():
+    course = m.make_courses({"hairpin": m.COURSES["hairpin"]})[0]
+    seam = int(np.flatnonzero(np.abs(np.diff(course.cyaw)) > math.pi)[0])
+
+    controller = m.CGMRES()
+    controller.reset(course)
+    # on the course before the seam, the carrot just after it
+    ind = seam + 1 - int(round(controller.lookahead / course.ds))
+    controller.state.x = course.cx[ind]
+    controller.state.y = course.cy[ind]
+    controller.state.yaw = course.cyaw[ind]
+
+    x, y, yaw = controller.calc_carrot_pose()
+    assert x < 0.0 and abs(y) < 1.0
+    assert abs(yaw) < 0.5
+
+
+if __name__ == '__main__':
+    conftest.run_this_test(__file__)
@@ -0,0 +1,41 @@
+import numpy as np
+
+import conftest
+from PathPlanning.CubicSpline import cubic_spline_planner as m
+
+X = [-2.5, 0.0, 2.5, 5.0, 7.5, 3.0, -1.0]
+Y = [0.7, -6, 5, 6.5, 0.0, 5.0, -2.0]
+
+
+def test_array_evaluation_matches_scalar_evaluation():
+    sp = m.Spline2D(X, Y)
+    s = np.arange(0.0, sp.s[-1], 0.1)
+
+    x, y = sp.calc_position(s)
+    assert np.allclose(x, [sp.calc_position(i_s)[0] for i_s in s])
+    assert np.allclose(y, [sp.calc_position(i_s)[1] for i_s in s])
+    assert np.allclose(sp.calc_yaw(s), [sp.calc_yaw(i_s) for i_s in s])
+    assert np.allclose(sp.calc_curvature(s),
+                       [sp.calc_curvature(i_s) for i_s in s])
+
+    x, _ = sp.calc_position(np.array([-1.0, sp.s[-1] + 1.0]))
+    assert np.all(np.isnan(x))
+
+
+def test_projector():
+    sp = m.Spline2D(X, Y)
+    projector = m.Spline2DProjector(sp)
+
+    s = np.linspace(1.0, sp.s[-1] - 1.0, 50)
+    x, y = sp.calc_position(s)
+    yaw = sp.calc_yaw(s)
+    offset = 0.05
+    s_est = projector.calc_s(x - offset * np.sin(yaw),
+                             y + offset * np.cos(yaw))
+    assert np.allclose(s_est, s, atol=1e-3)
+
+    assert abs(projector.calc_s(x[0], y[0]) - s[0]) < 1e-6
+
+
+if __name__ == '__main__':
+    conftest.run_this_test(__file__)
@@ -69,5 +69,21 @@ def test_3():
         check_path_length(px, py, lengths)
 
 
+def test_path_length_matches_planning():
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        start = rng.uniform(-5.0, 5.0, 3)
+        end = rng.uniform(-5.0, 5.0, 3)
+        curvature = rng.uniform(0.2, 2.0)
+
+        _, _, _, mode, lengths = dubins_path_planning.dubins_path_planning(
+            *start, *end, curvature)
+        l_mode, l_lengths = dubins_path_planning.dubins_path_length(
+            *start, *end, curvature)
+
+        assert l_mode == mode
+        assert l_lengths == lengths
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
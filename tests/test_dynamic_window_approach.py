@@ -44,5 +44,20 @@ def test_stuck_main():
     m.main(gx=-5.0, gy=-7.0)
 
 
+def test_batch_rollout_matches_loop():
+    for robot_type in [m.RobotType.circle, m.RobotType.rectangle]:
+        config = m.Config()
+        config.robot_type = robot_type
+        x = np.array([0.0, 0.0, np.pi / 8.0, 0.0, 0.0])
+        goal = np.array([10.0, 10.0])
+        for _ in range(5):
+            u, trajectory = m.dwa_control(x, config, goal, config.ob)
+            u_batch, trajectory_batch = m.dwa_control_batch(
+                x, config, goal, config.ob)
+            assert np.allclose(u, u_batch)
+            assert np.allclose(trajectory, trajectory_batch)
+            x = m.motion(x, u, config.dt)
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
@@ -1,3 +1,6 @@
+import numpy as np
+from scipy.integrate import quad
+
 import conftest
 from PathPlanning.Eta3SplinePath import eta3_spline_path as m
 
@@ -7,5 +10,23 @@ def test_1():
     m.main()
 
 
+def test_arc_length_tables():
+    segment = m.Eta3PathSegment(start_pose=[7.4377, 1.8235, 0.6667],
+                                end_pose=[7.8, 4.3, 1.8],
+                                eta=[7, 10, 10, -10, 4, 4],
+                                kappa=[1, 1, 0.5, 0])
+    u = np.linspace(0, 1, 21)
+
+    s = segment.calc_length(u)
+    assert np.allclose(s, [quad(segment.s_dot, 0, ui)[0] for ui in u])
+    assert np.isclose(segment.segment_length, s[-1])
+    assert np.allclose(segment.calc_u(s), u)
+
+    assert np.allclose(segment.calc_points(u).T,
+                       [segment.calc_point(ui) for ui in u])
+    assert np.allclose(segment.calc_derivs(u, order=2).T,
+                       [segment.calc_deriv(ui, order=2) for ui in u])
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
@@ -0,0 +1,27 @@
+import numpy as np
+
+import conftest
+from PathPlanning.Eta3SplineTrajectory import eta3_spline_trajectory as m
+
+
+def test_1():
+    m.show_animation = False
+    m.main()
+
+
+def test_calc_traj_points_matches_calc_traj_point():
+    segment = m.Eta3PathSegment(start_pose=[0, 0, 0], end_pose=[4, 1.5, 0],
+                                eta=[4.27, 4.27, 0, 0, 0, 0],
+                                kappa=[0, 0, 0, 0])
+    traj = m.eta3_trajectory([segment], max_vel=2.0, max_accel=0.5)
+
+    times = np.linspace(0, traj.total_time, 101)
+    expected = np.array([traj.calc_traj_point(t) for t in times]).T
+    states = traj.calc_traj_points(times)
+
+    assert states.shape == (5, times.size)
+    assert np.allclose(states, expected, rtol=0.0, atol=1e-9)
+
+
+if __name__ == '__main__':
+    conftest.run_this_test(__file__)
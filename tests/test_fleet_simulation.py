@@ -0,0 +1,94 @@
+import conftest  # Add root path to sys.path
+import math
+
+import numpy as np
+import pytest
+
+from PathTracking.fleet_simulation import fleet_simulation as m
+from PathTracking.pure_pursuit import pure_pursuit
+from PathTracking.stanley_controller import stanley_controller
+
+
+def test_pad_courses():
+    courses = [([0.0, 1.0, 2.0], [0.0, 0.5, 1.0]), ([3.0], [4.0])]
+    (cx, cy), n_points = m.pad_courses(courses)
+    assert np.array_equal(n_points, [3, 1])
+    assert np.array_equal(cx, [[0.0, 1.0, 2.0], [3.0, 3.0, 3.0]])
+    assert np.array_equal(cy, [[0.0, 0.5, 1.0], [4.0, 4.0, 4.0]])
+
+
+def simulate_pure_pursuit(cx, cy, state, target_speed):
+    target_course = pure_pursuit.TargetCourse(cx, cy)
+    target_ind, _ = target_course.search_target_index(state)
+    time = 0.0
+    while 100.0 >= time and len(cx) - 1 > target_ind:
+        ai = pure_pursuit.proportional_control(target_speed, state.v)
+        di, target_ind = pure_pursuit.pure_pursuit_steer_control(
+            state, target_course, target_ind)
+        state.update(ai, di)
+        time += pure_pursuit.dt
+    return state, time
+
+
+def simulate_stanley(cx, cy, cyaw, state, target_speed):
+    m = stanley_controller
+    target_idx, _ = m.calc_target_index(state, cx, cy)
+    time = 0.0
+    while 100.0 >= time and len(cx) - 1 > target_idx:
+        ai = m.pid_control(target_speed, state.v)
+        di, target_idx = m.stanley_control(state, cx, cy, cyaw, target_idx)
+        state.update(ai, di)
+        time += m.dt
+    return state, time
+
+
+def get_sine_courses(rng):
+    courses, states = [], []
+    for length in [30, 40, 50]:
+        cx = np.arange(0, length, 0.5)
+        cy = np.sin(cx / rng.uniform(4.0, 6.0)) * cx / 2.0
+        courses.append((cx, cy))
+        states.append((0.0, rng.uniform(-4.0, 0.0), 0.0))
+    return courses, states
+
+
+def get_spline_courses(rng):
+    courses, states = [], []
+    for scale in [0.4, 0.6, 0.8]:
+        ax = np.array([0.0, 100.0, 100.0, 50.0, 60.0]) * scale
+        ay = np.array([0.0, 0.0, -30.0, -20.0, 0.0]) * scale
+        cx, cy, cyaw, _, _ = \
+            stanley_controller.cubic_spline_planner.calc_spline_course(
+                ax, ay, ds=0.5)
+        courses.append((cx, cy, cyaw))
+        states.append((0.0, rng.uniform(2.0, 5.0), np.radians(20.0)))
+    return courses, states
+
+
+@pytest.mark.parametrize("controller, get_courses, simulate, target_speed", [
+    (pure_pursuit, get_sine_courses, simulate_pure_pursuit, 10.0 / 3.6),
+    (stanley_controller, get_spline_courses, simulate_stanley, 30.0 / 3.6),
+])
+def test_fleet_matches_single_vehicle(controller, get_courses, simulate,
+                                      target_speed):
+    courses, states = get_courses(np.random.default_rng(0))
+
+    padded, n_points = m.pad_courses(courses)
+    x, y, yaw = np.array(states).T
+    fleet = controller.BatchState(x, y, yaw, np.zeros(len(courses)))
+    result = controller.simulate_fleet(*padded, n_points, fleet, target_speed)
+
+    for i, course in enumerate(courses):
+        state, time = simulate(*course, controller.State(*states[i]),
+                               target_speed)
+        assert result["reached"][i]
+        assert math.isclose(result["completion_time"][i], time)
+        assert math.isclose(fleet.x[i], state.x, abs_tol=1e-9)
+        assert math.isclose(fleet.y[i], state.y, abs_tol=1e-9)
+        assert math.isclose(fleet.yaw[i], state.yaw, abs_tol=1e-9)
+        assert result["cross_track_max"][i] >= \
+            result["cross_track_rms"][i] > 0.0
+
+
+if __name__ == '__main__':
+    conftest.run_this_test(__file__)
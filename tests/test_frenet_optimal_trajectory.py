@@ -1,3 +1,5 @@
+import numpy as np
+
 import conftest
 from PathPlanning.FrenetOptimalTrajectory import frenet_optimal_trajectory as m
 
@@ -8,5 +10,25 @@ def test1():
     m.main()
 
 
+def test_batch_planning_matches_list_planning():
+    ob = np.array([[20.0, 10.0], [30.0, 6.0], [30.0, 8.0]])
+    _, _, _, _, csp = m.generate_target_course(
+        [0.0, 10.0, 20.5, 35.0, 70.5], [0.0, -6.0, 5.0, 6.5, 0.0])
+
+    c_speed, c_d, c_d_d, c_d_dd, s0 = 10.0 / 3.6, 2.0, 0.0, 0.0, 0.0
+    for _ in range(5):
+        expected = m.frenet_optimal_planning(
+            csp, s0, c_speed, c_d, c_d_d, c_d_dd, ob)
+        path = m.frenet_optimal_planning_batch(
+            csp, s0, c_speed, c_d, c_d_d, c_d_dd, ob)
+
+        assert abs(expected.cf - path.cf) < 1e-9
+        for name in ["s", "d", "x", "y", "yaw", "c"]:
+            assert np.allclose(getattr(expected, name), getattr(path, name))
+
+        s0, c_d, c_d_d = path.s[1], path.d[1], path.d_d[1]
+        c_d_dd, c_speed = path.d_dd[1], path.s_d[1]
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
@@ -1,5 +1,8 @@
+import numpy as np
+
 import conftest
 from PathPlanning.HybridAStar import hybrid_a_star as m
+from PathPlanning.HybridAStar import dynamic_programming_heuristic as dph
 
 
 def test1():
@@ -7,5 +10,27 @@ def test1():
     m.main()
 
 
+def test_heuristic_map_matches_node_based_dijkstra(tmp_path):
+    ox = [float(i) for i in range(31)] * 2 + [0.0] * 31 + [30.0] * 31 \
+        + [15.0] * 20
+    oy = [0.0] * 31 + [30.0] * 31 + [float(i) for i in range(31)] * 2 \
+        + [float(i) for i in range(20)]
+
+    closed_set = dph.calc_distance_heuristic(25.0, 5.0, ox, oy, 1.0, 1.0)
+
+    cache = dph.HeuristicCache(cache_dir=str(tmp_path))
+    cost_map, min_x, min_y = cache.get(25.0, 5.0, ox, oy, 1.0, 1.0)
+    assert np.count_nonzero(np.isfinite(cost_map)) == len(closed_set)
+    for node in closed_set.values():
+        assert abs(cost_map[node.x - min_x, node.y - min_y]
+                   - node.cost) < 1e-9
+
+    # a fresh cache has to reuse the map stored on disk
+    cached_map, _, _ = dph.HeuristicCache(cache_dir=str(tmp_path)).get(
+        25.0, 5.0, ox, oy, 1.0, 1.0)
+    assert isinstance(cached_map, np.memmap)
+    assert np.array_equal(cached_map, cost_map)
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
@@ -1,5 +1,7 @@
 import conftest
 import sys
+
+import numpy as np
 if 'cvxpy' in sys.modules:  # pragma: no cover
 
     from InvertedPendulumCart.InvertedPendulumMPCControl \
@@ -9,6 +11,21 @@ if 'cvxpy' in sys.modules:  # pragma: no cover
         m.show_animation = False
         m.main()
 
+    def test_condensed_matches_cvxpy():
+        A, B = m.get_model_matrix()
+        x0 = np.array([[0.1], [0.0], [0.3], [0.0]])
+
+        controller = m.CondensedMPC(A, B, m.Q, m.R, m.T)
+        for expected, actual in zip(m.mpc_control(x0),
+                                    m.mpc_control_condensed(x0, controller)):
+            assert np.allclose(expected, actual, atol=1e-4)
+
+        controller = m.CondensedMPC(A, B, m.Q, m.R, m.T, u_min=-1.0,
+                                    u_max=1.0)
+        u = controller.solve(x0[:, 0]).ravel()
+        assert np.all(np.abs(u) <= 1.0)
+        assert np.allclose(u, m.mpc_control(x0, -1.0, 1.0)[4], atol=1e-4)
+
 
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
@@ -0,0 +1,39 @@
+import numpy as np
+
+import conftest
+from PathPlanning.ModelPredictiveTrajectoryGenerator \
+    import lookuptable_generator as m
+
+STATES = [[10.0, 0.0, 0.0], [10.0, 2.0, 0.0], [15.0, 2.0, 0.5]]
+
+
+def test_parallel_generation(tmp_path):
+    output_path = str(tmp_path / "lookuptable.npy")
+    table = m.generate_lookup_table_parallel(STATES, output_path,
+                                             max_workers=2, wave_size=2)
+
+    assert len(table) == len(STATES) + 1
+    loaded = m.LookupTable.load(output_path)
+    assert np.array_equal(loaded.table, table.table)
+    for state in STATES:
+        assert np.allclose(table.search_nearest(state)[0:3], state,
+                           atol=0.2)
+
+
+def test_resume_from_checkpoint(tmp_path):
+    output_path = str(tmp_path / "lookuptable.npy")
+    checkpoint_path = str(tmp_path / "checkpoint.npz")
+    # pretend that everything but the last state has been processed
+    done = np.array([True, True, False])
+    m._save_checkpoint(checkpoint_path, np.array(STATES), done,
+                       np.array([[1.0, 0.0, 0.0, 1.0, 0.0, 0.0]]))
+
+    table = m.generate_lookup_table_parallel(
+        STATES, output_path, checkpoint_path=checkpoint_path, max_workers=1)
+
+    assert len(table) == 2
+    assert np.allclose(table.table[-1, 0:3], STATES[-1], atol=0.2)
+
+
+if __name__ == '__main__':
+    conftest.run_this_test(__file__)
@@ -2,6 +2,8 @@ import conftest  # Add root path to sys.path
 from PathPlanning.LQRRRTStar import lqr_rrt_star as m
 import random
 
+import numpy as np
+
 random.seed(12345)
 
 
@@ -10,5 +12,21 @@ def test1():
     m.main(maxIter=5)
 
 
+def test_steer_batch_matches_sample_path():
+    planner = m.LQRRRTStar([0.0, 0.0], [6.0, 7.0], [], [-2.0, 15.0])
+    from_node = planner.Node(1.0, 2.0)
+    to_nodes = [planner.Node(x, y) for (x, y) in [(3.0, 4.0), (-1.0, 5.0)]]
+    new_nodes = planner.steer_batch([from_node] * 2, to_nodes)
+    for to_node, new_node in zip(to_nodes, new_nodes):
+        wx, wy = planner.lqr_planner.lqr_planning(
+            from_node.x, from_node.y, to_node.x, to_node.y,
+            show_animation=False)
+        px, py, clen = planner.sample_path(wx, wy, planner.step_size)
+        assert np.allclose(new_node.path_x, px)
+        assert np.allclose(new_node.path_y, py)
+        assert np.isclose(new_node.cost, sum(clen))
+        assert new_node.parent is from_node
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
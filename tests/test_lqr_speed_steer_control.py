@@ -1,5 +1,8 @@
 import conftest  # Add root path to sys.path
+import numpy as np
+
 from PathTracking.lqr_speed_steer_control import lqr_speed_steer_control as m
+from PathTracking.lqr_steer_control import lqr_gain_schedule
 
 
 def test_1():
@@ -7,5 +10,17 @@ def test_1():
     m.main()
 
 
+def test_gain_schedule_accelerates_from_rest(tmp_path):
+    schedule = lqr_gain_schedule.load_gain_schedule(
+        m.calc_model_matrix, m.lqr_Q, m.lqr_R, m.lqr_speeds,
+        cache_dir=str(tmp_path))
+
+    # no steering authority at zero speed, but the speed gain is kept
+    A, B = m.calc_model_matrix(0.0)
+    K = schedule.calc_gain(0.0)
+    assert np.allclose(K, m.dlqr(A, B, m.lqr_Q, m.lqr_R)[0])
+    assert K[1, 4] > 0.0
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
@@ -1,5 +1,8 @@
 import conftest  # Add root path to sys.path
+import numpy as np
+
 from PathTracking.lqr_steer_control import lqr_steer_control as m
+from PathTracking.lqr_steer_control import lqr_gain_schedule
 
 
 def test1():
@@ -7,5 +10,28 @@ def test1():
     m.main()
 
 
+def test_gain_schedule(tmp_path):
+    schedule = lqr_gain_schedule.load_gain_schedule(
+        m.calc_model_matrix, m.Q, m.R, m.lqr_speeds, cache_dir=str(tmp_path))
+
+    for v in [-3.33, 0.51, 1.0, 2.777]:
+        A, B = m.calc_model_matrix(v)
+        K = lqr_gain_schedule.solve_lqr_gain(A, B, m.Q, m.R)
+        assert np.allclose(schedule.calc_gain(v), K, atol=2e-3)
+        if abs(v) >= 0.5:  # the iterative dlqr converges
+            assert np.allclose(K, m.dlqr(A, B, m.Q, m.R)[0], atol=1e-2)
+    assert np.all(schedule.calc_gain(0.0) == 0.0)
+
+    # solved once, loaded from the cache afterwards
+    assert len(list(tmp_path.iterdir())) == 1
+    loaded = lqr_gain_schedule.load_gain_schedule(
+        m.calc_model_matrix, m.Q, m.R, m.lqr_speeds, cache_dir=str(tmp_path))
+    assert np.array_equal(loaded.gains, schedule.gains)
+    lqr_gain_schedule.load_gain_schedule(
+        m.calc_model_matrix, 2.0 * m.Q, m.R, m.lqr_speeds,
+        cache_dir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 2
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
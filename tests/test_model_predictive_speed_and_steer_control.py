@@ -13,5 +13,25 @@ if 'cvxpy' in sys.modules:  # pragma: no cover
         m.show_animation = False
         m.main2()
 
+    def test_linear_mpc_matches_linear_mpc_control():
+        import numpy as np
+
+        cx, cy, cyaw, ck = m.get_straight_course(1.0)
+        sp = m.calc_speed_profile(cx, cy, cyaw, m.TARGET_SPEED)
+        mpc = m.LinearMPC()
+
+        for x0 in [[0.0, 0.5, 1.0, 0.1], [0.5, 0.3, 1.2, 0.05]]:
+            state = m.State(x=x0[0], y=x0[1], yaw=x0[3], v=x0[2])
+            xref, _, dref = m.calc_ref_trajectory(state, cx, cy, cyaw, ck,
+                                                  sp, 1.0, 0)
+            xbar = m.predict_motion(x0, [0.0] * m.T, [0.0] * m.T, xref)
+
+            expected = m.linear_mpc_control(xref, xbar, x0, dref)
+            result = mpc.solve(xref, xbar, x0, dref)
+            for e, r in zip(expected, result):
+                assert np.allclose(e, r, atol=1e-3)
+
+        assert len(mpc.stats) == 2
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
@@ -0,0 +1,42 @@
+import numpy as np
+
+import conftest
+from PathPlanning.ModelPredictiveTrajectoryGenerator import \
+    model_predictive_trajectory_generator as m
+from PathPlanning.ModelPredictiveTrajectoryGenerator import motion_model
+
+
+def generate_last_state_loop(s, km, kf, k0):
+    time = s / motion_model.v
+    n = s / motion_model.ds
+    steer = np.polyfit([0.0, time / 2.0, time], [k0, km, kf], 2)
+    state = motion_model.State()
+    for t in np.arange(0.0, time, time / n):
+        delta = np.polyval(steer, t)
+        motion_model.update(state, motion_model.v, delta, time / n,
+                            motion_model.L)
+    return state.x, state.y, state.yaw
+
+
+def test_batch_last_state_matches_loop():
+    s = np.array([10.0, 10.5, 21.3])
+    km = np.array([0.1, 0.12, 0.05])
+    kf = np.array([-0.2, -0.2, 0.3])
+    x, y, yaw = motion_model.generate_last_state_batch(s, km, kf, 0.1)
+    for i in range(len(s)):
+        expected = generate_last_state_loop(s[i], km[i], kf[i], 0.1)
+        assert np.allclose([x[i], y[i], yaw[i]], expected)
+
+
+def test_optimize_trajectory():
+    m.show_animation = False
+    target = motion_model.State(x=5.0, y=2.0, yaw=np.deg2rad(90.0))
+    init_p = np.array([6.0, 0.0, 0.0]).reshape(3, 1)
+
+    x, y, yaw, p = m.optimize_trajectory(target, 0.0, init_p)
+
+    assert np.linalg.norm(m.calc_diff(target, x, y, yaw)) <= m.cost_th
+
+
+if __name__ == '__main__':
+    conftest.run_this_test(__file__)
@@ -1,4 +1,6 @@
 import conftest  # Add root path to sys.path
+import numpy as np
+
 from PathTracking.move_to_pose import move_to_pose as m
 
 
@@ -7,5 +9,29 @@ def test_1():
     m.main()
 
 
+def test_batch_matches_single_robot():
+    m.show_animation = False
+    rng = np.random.default_rng(0)
+    poses = np.column_stack((20 * rng.random((10, 2)),
+                             2 * np.pi * rng.random(10) - np.pi,
+                             20 * rng.random((10, 2)),
+                             2 * np.pi * rng.random(10) - np.pi))
+    poses[0, 3:5] = poses[0, 0:2]  # already at the goal
+
+    x_traj, y_traj, lengths = m.move_to_pose_batch(*poses.T)
+
+    assert x_traj.shape == (10, lengths.max())
+    for pose, xs, ys, length in zip(poses, x_traj, y_traj, lengths):
+        expected_x, expected_y = m.move_to_pose(*pose)
+        assert length == len(expected_x)
+        assert np.allclose(xs[:length], expected_x)
+        assert np.allclose(ys[:length], expected_y)
+        assert np.all(np.isnan(xs[length:]))
+
+
+def test_benchmark():
+    m.benchmark(n_robots=10)
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
@@ -0,0 +1,60 @@
+import conftest  # Add root path to sys.path
+import math
+
+import numpy as np
+
+from PathTracking.path_progress_tracker import path_progress_tracker as m
+from PathTracking.lqr_steer_control import lqr_steer_control
+
+
+def test_search_matches_global_nearest():
+    s = np.arange(0.0, 30.0, 0.1)
+    cx, cy = s, np.sin(s / 3.0)
+    cyaw = np.arctan2(np.cos(s / 3.0) / 3.0, 1.0)
+    tracker = m.PathProgressTracker(cx, cy, cyaw)
+
+    for i, x in enumerate(np.arange(0.0, 30.0, 0.7)):
+        # alternately on the right and the left of the course
+        y = np.sin(x / 3.0) + 0.4 * (-1) ** i
+        state = lqr_steer_control.State(x=x, y=y)
+        ind, e = tracker.search(state.x, state.y)
+        expected_ind, expected_e = lqr_steer_control.calc_nearest_index(
+            state, cx, cy, cyaw)
+        assert ind == expected_ind
+        assert np.isclose(e, expected_e)
+
+
+def test_search_is_monotone_on_crossing_course():
+    # figure eight, the course crosses itself at the origin
+    t = np.linspace(0.0, 2.0 * math.pi, 600)
+    cx, cy = np.sin(t) * 10.0, np.sin(2.0 * t) * 5.0
+    tracker = m.PathProgressTracker(cx, cy)
+
+    indexes = [tracker.search(x, y)[0] for x, y in zip(cx[::3], cy[::3])]
+    assert indexes == list(range(0, 600, 3))
+
+    # far from the windowed nearest point, relocalized over the whole course
+    assert tracker.search(cx[100], cy[100])[0] == 100
+
+
+def test_search_batch_matches_search():
+    s = np.arange(0.0, 30.0, 0.1)
+    cx, cy = s, np.sin(s / 3.0)
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0.0, 5.0, 20)
+    y = rng.uniform(-1.0, 1.0, 20)
+
+    batch_tracker = m.PathProgressTracker(cx, cy)
+    trackers = [m.PathProgressTracker(cx, cy) for _ in x]
+    for _ in range(30):
+        ind, e = batch_tracker.search_batch(x, y)
+        for i, tracker in enumerate(trackers):
+            expected_ind, expected_e = tracker.search(x[i], y[i])
+            assert ind[i] == expected_ind
+            assert np.isclose(e[i], expected_e)
+        x = x + rng.uniform(0.0, 1.5, len(x))
+        y = y + rng.uniform(-0.2, 0.2, len(y))
+
+
+if __name__ == '__main__':
+    conftest.run_this_test(__file__)
@@ -7,5 +7,16 @@ def test1():
     m.main()
 
 
+def test_search_target_index_at_the_last_point():
+    cx = [0.0, 1.0, 2.0, 3.0]
+    cy = [0.0, 0.0, 0.0, 0.0]
+    target_course = m.TargetCourse(cx, cy)
+    state = m.State(x=cx[-1] + m.WB / 2, y=0.0)
+
+    for _ in range(2):  # the global search, then the walk
+        ind, _ = target_course.search_target_index(state)
+        assert ind == len(cx) - 1
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
@@ -1,4 +1,6 @@
 import conftest  # Add root path to sys.path
+import numpy as np
+
 from PathPlanning.QuinticPolynomialsPlanner import quintic_polynomials_planner as m
 
 
@@ -7,5 +9,26 @@ def test1():
     m.main()
 
 
+def test_batch_matches_planner():
+    m.show_animation = False
+    rng = np.random.default_rng(0)
+    n = 20
+    states = [rng.uniform(0.0, 10.0, n), rng.uniform(0.0, 10.0, n),
+              rng.uniform(-1.0, 1.0, n), rng.uniform(0.0, 2.0, n),
+              rng.uniform(0.0, 0.2, n), rng.uniform(20.0, 40.0, n),
+              rng.uniform(-20.0, 20.0, n), rng.uniform(-1.0, 1.0, n),
+              rng.uniform(0.0, 2.0, n), rng.uniform(0.0, 0.2, n)]
+    for max_accel, max_jerk in [(1.0, 0.5), (0.01, 0.001)]:
+        result = m.quintic_polynomials_planner_batch(
+            *states, max_accel, max_jerk, 0.1)
+        n_points = result[7]
+        for i in range(n):
+            expected = m.quintic_polynomials_planner(
+                *[v[i] for v in states], max_accel, max_jerk, 0.1)
+            assert n_points[i] == len(expected[0])
+            for actual, value in zip(result[:7], expected):
+                assert np.allclose(actual[i, :n_points[i]], value)
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
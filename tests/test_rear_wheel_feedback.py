@@ -1,4 +1,8 @@
 import conftest  # Add root path to sys.path
+import math
+
+import numpy as np
+
 from PathTracking.rear_wheel_feedback import rear_wheel_feedback as m
 
 
@@ -7,5 +11,49 @@ def test1():
     m.main()
 
 
+def test_track_error_matches_dense_search():
+    path = m.CubicSplinePath([0.0, 6.0, 12.5, 5.0, 7.5, 3.0, -1.0],
+                             [0.0, 0.0, 5.0, 6.5, 3.0, 5.0, -2.0])
+    rng = np.random.default_rng(0)
+    s_ref = rng.uniform(0.5, path.length - 0.5, 100)
+    yaw = path.calc_yaw(s_ref)
+    offset = rng.uniform(-0.5, 0.5, 100)
+    x = path.X(s_ref) - offset * np.sin(yaw)
+    y = path.Y(s_ref) + offset * np.cos(yaw)
+    s0 = s_ref + rng.uniform(-0.5, 0.5, 100)
+
+    e, k, yaw, s = path.calc_track_error(x, y, s0)
+    assert np.allclose(yaw, np.arctan2(path.dY(s), path.dX(s)))
+    assert np.allclose(k, path.calc_curvature(s))
+
+    dense = np.linspace(0.0, path.length, 100001)
+    for i in range(100):
+        window = dense[np.abs(dense - s0[i]) <= path.search_offsets[-1] *
+                       path.table_ds]
+        d = np.hypot(path.X(window) - x[i], path.Y(window) - y[i])
+        assert abs(abs(e[i]) - d.min()) < 1e-3
+
+        assert np.allclose(path.calc_track_error(x[i], y[i], s0[i]),
+                           (e[i], k[i], yaw[i], s[i]))
+
+
+def test_path_is_parametrized_by_chord_length():
+    x = [0.0, 6.0, 12.5, 5.0, 7.5, 3.0, -1.0]
+    y = [0.0, 0.0, 5.0, 6.5, 3.0, 5.0, -2.0]
+    path = m.CubicSplinePath(x, y)
+    assert math.isclose(path.length, np.sum(np.hypot(np.diff(x), np.diff(y))))
+    assert np.allclose(path.X(path.breaks), x)
+    assert np.allclose(path.Y(path.breaks), y)
+
+
+def test_control_at_zero_heading_error():
+    state = m.State(yaw=0.3, v=2.0)
+    for e, k in [(0.0, 0.2), (0.5, 0.0), (0.5, 0.2)]:
+        delta = m.rear_wheel_feedback_control(state, e, k, 0.3)
+        expected = m.rear_wheel_feedback_control(state, e, k, 0.3 - 1e-9)
+        assert delta != 0.0
+        assert math.isclose(delta, expected, abs_tol=1e-6)
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
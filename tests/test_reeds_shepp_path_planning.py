@@ -53,5 +53,24 @@ def test2():
         check_path_length(px, py, lengths)
 
 
+def test_path_length_matches_all_paths():
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        start = rng.uniform(-5.0, 5.0, 3)
+        end = rng.uniform(-5.0, 5.0, 3)
+        curvature = rng.uniform(0.2, 2.0)
+
+        paths = m.calc_paths(*start, *end, curvature, 0.2)
+        b_path = paths[paths.index(min(paths, key=lambda p: abs(p.L)))]
+
+        px, py, pyaw, mode, lengths = m.reeds_shepp_path_planning(
+            *start, *end, curvature)
+        assert (px, py, pyaw) == (b_path.x, b_path.y, b_path.yaw)
+        assert (mode, lengths) == (b_path.ctypes, b_path.lengths)
+
+        assert m.reeds_shepp_path_length(*start, *end, curvature) == \
+            (b_path.ctypes, b_path.lengths)
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
@@ -1,4 +1,8 @@
 import conftest  # Add root path to sys.path
+import math
+
+import numpy as np
+
 from ArmNavigation.rrt_star_seven_joint_arm_control \
     import rrt_star_seven_joint_arm_control as m
 
@@ -8,5 +12,32 @@ def test1():
     m.main()
 
 
+def test_batch_forward_kinematics_and_collision():
+    arm = m.RobotArm([[0., math.pi / 2., 0., .333],
+                      [0., -math.pi / 2., 0., 0.],
+                      [0., math.pi / 2., 0.0825, 0.3160],
+                      [0., -math.pi / 2., -0.0825, 0.],
+                      [0., math.pi / 2., 0., 0.3840],
+                      [0., math.pi / 2., 0.088, 0.],
+                      [0., 0., 0., 0.107]])
+    joint_angles = np.random.default_rng(0).uniform(0.0, 2.0, (10, 7))
+
+    points = arm.get_points_batch(joint_angles)
+    for q, q_points in zip(joint_angles, points):
+        assert np.allclose(q_points.T, arm.get_points(q))
+
+    # a sphere on the middle of a link, away from all the link end points
+    mid = (points[0, 4] + points[0, 5]) / 2.0
+    obstacles = [(mid[0], mid[1], mid[2], 0.01)]
+    safe = m.RRTStar.check_collision_batch(joint_angles, arm, obstacles)
+    assert not safe[0]
+
+    nodes = [m.RRTStar.Node(q) for q in joint_angles]
+    for node in nodes:
+        node.path_x = [node.x]
+    assert m.RRTStar.check_collision_nodes(nodes, arm, obstacles) \
+        == safe.tolist()
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)
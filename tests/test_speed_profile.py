@@ -0,0 +1,148 @@
+import conftest  # Add root path to sys.path
+import math
+
+import numpy as np
+import pytest
+
+from PathTracking.speed_profile import speed_profile as m
+from PathTracking.lqr_steer_control import lqr_steer_control
+from PathTracking.lqr_speed_steer_control import lqr_speed_steer_control
+
+
+def switch_direction_loop(cyaw, target_speed):
+    speed_profile = [target_speed] * len(cyaw)
+    direction = 1.0
+    for i in range(len(cyaw) - 1):
+        dyaw = abs(cyaw[i + 1] - cyaw[i])
+        switch = math.pi / 4.0 <= dyaw < math.pi / 2.0
+        if switch:
+            direction *= -1
+        if direction != 1.0:
+            speed_profile[i] = - target_speed
+        else:
+            speed_profile[i] = target_speed
+        if switch:
+            speed_profile[i] = 0.0
+    return speed_profile
+
+
+def acceleration_passes_loop(v2, s, max_accel, max_decel):
+    v2 = list(v2)
+    for i in range(1, len(v2)):
+        v2[i] = min(v2[i], v2[i - 1] + 2.0 * max_accel * (s[i] - s[i - 1]))
+    for i in range(len(v2) - 2, -1, -1):
+        v2[i] = min(v2[i], v2[i + 1] + 2.0 * max_decel * (s[i + 1] - s[i]))
+    return np.sqrt(v2)
+
+
+def get_switch_course():
+    t = np.arange(0.0, 60.0, 0.1)
+    cx, cy = t, 5.0 * np.sin(t / 8.0)
+    cyaw = np.arctan2(np.cos(t / 8.0) * 5.0 / 8.0, 1.0)
+    # switch direction twice
+    cyaw[200:400] += 1.2
+    return cx, cy, cyaw
+
+
+def test_acceleration_passes_match_loop():
+    rng = np.random.default_rng(0)
+    t = np.cumsum(rng.uniform(0.05, 0.5, 500))
+    cx, cy = t, 3.0 * np.sin(t / 5.0)
+    stop = rng.random(500) < 0.02
+    stop[-1] = True
+
+    sp = m.calc_speed_profile(cx, cy, 5.0, stop=stop, max_lateral_accel=1.5,
+                              max_accel=0.8, max_decel=1.2,
+                              initial_speed=0.0)
+
+    s = np.append(0.0, np.cumsum(np.hypot(np.diff(cx), np.diff(cy))))
+    v2 = np.minimum(25.0, 1.5 / np.abs(m.calc_curvature(cx, cy)))
+    v2[stop] = 0.0
+    v2[0] = 0.0
+    assert np.allclose(sp, acceleration_passes_loop(v2, s, 0.8, 1.2))
+    assert sp[0] == 0.0 and sp[-1] == 0.0
+    assert np.all(sp[stop] == 0.0)
+
+
+def test_curvature_limit():
+    # circle of radius 10 m
+    t = np.linspace(0.0, math.pi, 1000)
+    cx, cy = 10.0 * np.cos(t), 10.0 * np.sin(t)
+    sp = m.calc_speed_profile(cx, cy, 5.0, max_lateral_accel=2.0)
+    assert np.allclose(sp, math.sqrt(2.0 * 10.0), rtol=1e-3)
+
+    sp = m.calc_speed_profile(cx, cy, 3.0, max_lateral_accel=2.0)
+    assert np.all(sp == 3.0)
+
+
+def test_lqr_profiles_match_loop():
+    cx, cy, cyaw = get_switch_course()
+    target_speed = 10.0 / 3.6
+
+    expected = switch_direction_loop(cyaw, target_speed)
+    expected[-1] = 0.0
+    sp = lqr_steer_control.calc_speed_profile(cx, cy, cyaw, target_speed)
+    assert np.array_equal(sp, expected)
+    assert np.sum(sp == 0.0) == 3
+
+    expected = switch_direction_loop(cyaw, target_speed)
+    for i in range(40):
+        expected[-i] = max(target_speed / (50 - i), 1.0 / 3.6)
+    sp = lqr_speed_steer_control.calc_speed_profile(
+        cx, cy, cyaw, target_speed)
+    assert np.array_equal(sp, expected)
+
+
+def test_model_predictive_profile_matches_loop():
+    pytest.importorskip("cvxpy")
+    from PathTracking.model_predictive_speed_and_steer_control import \
+        model_predictive_speed_and_steer_control as mpc
+
+    def loop(cx, cy, cyaw, target_speed):
+        speed_profile = [target_speed] * len(cx)
+        direction = 1.0
+        for i in range(len(cx) - 1):
+            dx = cx[i + 1] - cx[i]
+            dy = cy[i + 1] - cy[i]
+            if dx != 0.0 and dy != 0.0:
+                dangle = abs(mpc.pi_2_pi(math.atan2(dy, dx) - cyaw[i]))
+                direction = -1.0 if dangle >= math.pi / 4.0 else 1.0
+            speed_profile[i] = direction * target_speed
+        speed_profile[-1] = 0.0
+        return speed_profile
+
+    for course in [mpc.get_straight_course, mpc.get_straight_course3,
+                   mpc.get_switch_back_course]:
+        cx, cy, cyaw, ck = course(1.0)
+        cyaw = mpc.smooth_yaw(cyaw)
+        sp = mpc.calc_speed_profile(cx, cy, cyaw, mpc.TARGET_SPEED)
+        assert np.array_equal(sp, loop(cx, cy, cyaw, mpc.TARGET_SPEED))
+        assert np.any(sp < 0.0) == (course != mpc.get_straight_course)
+
+    # with acceleration limits the reversals go through a stop
+    cx, cy, cyaw, ck = mpc.get_switch_back_course(1.0)
+    cyaw = mpc.smooth_yaw(cyaw)
+    sp = mpc.calc_speed_profile(cx, cy, cyaw, mpc.TARGET_SPEED,
+                                max_accel=0.5, max_decel=0.5)
+    ds = np.hypot(np.diff(cx), np.diff(cy))
+    assert np.any(sp < 0.0) and np.all(sp[:-1] * sp[1:] >= 0.0)
+    assert np.all(np.abs(np.diff(sp ** 2)) <= 2.0 * 0.5 * ds + 1e-9)
+
+
+def test_long_course():
+    t = np.linspace(0.0, 5000.0, 50000)
+    cx, cy = t, 20.0 * np.sin(t / 30.0)
+    cyaw = np.arctan2(np.cos(t / 30.0) * 20.0 / 30.0, 1.0)
+
+    sp = lqr_steer_control.calc_speed_profile(
+        cx, cy, cyaw, 10.0, max_lateral_accel=1.0, max_accel=0.5,
+        max_decel=1.0)
+
+    ds = np.hypot(np.diff(cx), np.diff(cy))
+    assert np.all(np.diff(sp ** 2) <= 2.0 * 0.5 * ds + 1e-9)
+    assert np.all(-np.diff(sp ** 2) <= 2.0 * 1.0 * ds + 1e-9)
+    assert sp[-1] == 0.0 and np.max(sp) <= 10.0
+
+
+if __name__ == '__main__':
+    conftest.run_this_test(__file__)
@@ -1,5 +1,10 @@
+import os
+
+import numpy as np
+
 import conftest  # Add root path to sys.path
 from PathPlanning.StateLatticePlanner import state_lattice_planner as m
+from PathPlanning.ModelPredictiveTrajectoryGenerator import lookup_table
 
 
 def test1():
@@ -7,5 +12,31 @@ def test1():
     m.main()
 
 
+def test_lookup_table_search_matches_linear_scan(tmp_path):
+    table = lookup_table.LookupTable.load_csv(m.table_path)
+    path = str(tmp_path / "lookuptable.npy")
+    table.save(path)
+    table = lookup_table.LookupTable.load(path)
+
+    states = np.random.default_rng(0).uniform(
+        [-5.0, -20.0, -1.0], [30.0, 20.0, 1.0], (100, 3))
+    rows = table.search_nearest(states)
+    for state, row in zip(states, rows):
+        expected = m.search_nearest_one_from_lookuptable(
+            state[0], state[1], state[2], table.table)
+        assert np.array_equal(row, expected)
+
+
+def test_load_lookup_table_caches_outside_source(tmp_path):
+    table = lookup_table.load_lookup_table(m.table_path,
+                                           cache_dir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+    assert not os.path.exists(os.path.splitext(m.table_path)[0] + ".npy")
+
+    loaded = lookup_table.LookupTable.load(
+        lookup_table.calc_binary_path(m.table_path, str(tmp_path)))
+    assert np.array_equal(loaded.table, table.table)
+
+
 if __name__ == '__main__':
     conftest.run_this_test(__file__)